@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+
+__author__ = 'brianoneill'
+
+__doc__ = """
+Cost and size of logging to a text file, with the
+``time_logger_level_msg`` preset, versus a binary file written by
+``BinaryFileHandler`` -- each with ``locking=True`` and with
+``locking='atomic'``, unbuffered and buffered; the handlers' own share
+of that cost -- formatting and UTF-8-encoding a record, versus encoding it
+in binary; and the cost of decoding and of rendering the binary file as
+text.
+
+Usage:
+    $ ./bench_binary_log.py [RECORDS]
+"""
+
+import logging
+import os
+import sys
+import time
+
+try:
+    import prelogging
+except ImportError:
+    sys.path[0:0] = ['..']
+from prelogging import (LCDict, BinaryFileHandler, read_binary_log,
+                        render_binary_log)
+from prelogging.binary_log import _make_formatter
+
+LOG_PATH = '_log/bench'
+REPEAT = 3
+
+# (variant name, keyword arguments for add_file_handler)
+VARIANTS = [
+    ('text, lock',            dict(locking=True)),
+    ('text, atomic',          dict(locking='atomic')),
+    ('text, buffered 100',    dict(locking=True, buffer_size=100)),
+    ('binary, lock',          dict(locking=True, binary=True)),
+    ('binary, atomic',        dict(locking='atomic', binary=True)),
+    ('binary, buffered 100',  dict(locking=True, binary=True,
+                                   buffer_size=100)),
+]
+
+
+def run(filename, num_records, **kwargs):
+    """Return microseconds per record, best of REPEAT runs, and the size
+    of the logfile."""
+    best = None
+    for _ in range(REPEAT):
+        path = os.path.join(LOG_PATH, filename)
+        if os.path.exists(path):
+            os.remove(path)
+        lcd = LCDict(log_path=LOG_PATH)
+        lcd.add_file_handler('h', filename=filename,
+                             formatter='time_logger_level_msg', **kwargs)
+        lcd.add_logger('bench.binary', handlers='h', level='DEBUG',
+                       propagate=False)
+        lcd.config()
+        logger = logging.getLogger('bench.binary')
+        start = time.perf_counter()
+        for i in range(num_records):
+            logger.debug("record %d of %d: %s", i, num_records, 'value')
+        logger.handlers[0].close()
+        elapsed = time.perf_counter() - start
+        logger.handlers = []
+        best = elapsed if best is None else min(best, elapsed)
+    return best / num_records * 1e6, os.path.getsize(path)
+
+
+def per_record(fn, records):
+    """Return microseconds per record of ``fn``, best of REPEAT runs."""
+    best = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        for record in records:
+            fn(record)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(records) * 1e6
+
+
+def main():
+    num_records = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    if not os.path.isdir(LOG_PATH):
+        os.makedirs(LOG_PATH)
+
+    print("%d records" % num_records)
+    print("%-22s %12s %14s" % ('', 'usec/record', 'bytes/record'))
+    for name, kwargs in VARIANTS:
+        filename = ('bench.binlog' if kwargs.get('binary') else 'bench.log')
+        usec, size = run(filename, num_records, **kwargs)
+        print("%-22s %12.2f %14.1f" % (name, usec, size / num_records))
+
+    records = [logging.LogRecord('bench.binary', logging.DEBUG, __file__, 60,
+                                 "record %d of %d: %s",
+                                 (i, num_records, 'value'), None)
+               for i in range(num_records)]
+    formatter = _make_formatter('time_logger_level_msg')
+    handler = BinaryFileHandler(os.path.join(LOG_PATH, 'unused.binlog'),
+                                delay=True)
+    print("%-22s %12.2f" % ('format + encode text',
+                            per_record(lambda r: (formatter.format(r) +
+                                                  '\n').encode('utf-8'),
+                                       records)))
+    print("%-22s %12.2f" % ('encode binary', per_record(handler.encode,
+                                                        records)))
+
+    binlog = os.path.join(LOG_PATH, 'bench.binlog')
+    start = time.perf_counter()
+    count = sum(1 for _ in read_binary_log(binlog))
+    decode = time.perf_counter() - start
+    with open(os.devnull, 'w') as devnull:
+        start = time.perf_counter()
+        render_binary_log(binlog, devnull, 'time_logger_level_msg')
+        render = time.perf_counter() - start
+    print("%-22s %12.2f" % ('decode', decode / count * 1e6))
+    print("%-22s %12.2f" % ('decode + render', render / count * 1e6))
+
+
+if __name__ == '__main__':
+    main()
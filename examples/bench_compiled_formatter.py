@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+
+__author__ = 'brianoneill'
+
+__doc__ = """
+Cost of formatting a record with each formatter preset, using
+``logging.Formatter``, ``CachedTimeFormatter`` (which renders ``asctime``
+once per second) and ``CompiledFormatter``. ``logging.Formatter`` can't
+format the presets that use ``epoch_ms`` or ``epoch_ns``.
+
+Usage:
+    $ ./bench_compiled_formatter.py [RECORDS]
+"""
+
+import logging
+import sys
+import time
+
+try:
+    import prelogging
+except ImportError:
+    sys.path[0:0] = ['..']
+import prelogging.lcdict             # loads the presets
+from prelogging import CachedTimeFormatter, CompiledFormatter
+from prelogging.formatter_presets import _formatter_presets
+
+REPEAT = 3
+
+
+def run(formatter, records):
+    """Return microseconds per record, best of REPEAT runs."""
+    fmt = formatter.format
+    best = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        for record in records:
+            fmt(record)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(records) * 1e6
+
+
+def main():
+    num_records = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    records = [logging.LogRecord('bench.compiled', logging.INFO, __file__, i,
+                                 "record %d of %d", (i, num_records), None)
+               for i in range(num_records)]
+    print("%d records; usec/record" % num_records)
+    print("%-34s %10s %11s %10s" % ('preset', 'Formatter', 'CachedTime',
+                                     'Compiled'))
+    for name, spec in sorted(_formatter_presets.items()):
+        kwargs = dict(fmt=spec.format, datefmt=spec.dateformat,
+                      style=spec.style)
+        try:
+            stock = '%10.2f' % run(logging.Formatter(**kwargs), records)
+        except ValueError:              # epoch_ms, epoch_ns
+            stock = '%10s' % 'n/a'
+        cached = run(CachedTimeFormatter(**kwargs), records)
+        compiled = run(CompiledFormatter(**kwargs), records)
+        print("%-34s %s %11.2f %10.2f" % (name, stock, cached, compiled))
+
+
+if __name__ == '__main__':
+    main()
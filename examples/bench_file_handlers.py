@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+
+__author__ = 'brianoneill'
+
+__doc__ = """
+Throughput comparison of the multiprocessing-safe file handlers that
+``LCDict.add_file_handler`` and ``LCDict.add_rotating_file_handler``
+can create. For each variant, several processes log the same number of
+records to one shared logfile (and its backups); we report elapsed time and
+records per second, and check the logfiles for completeness and NUL bytes.
+
+Usage:
+    $ ./bench_file_handlers.py [NUM_PROCESSES [RECORDS_PER_PROCESS]]
+"""
+
+import glob
+import logging
+import os
+import sys
+import time
+from multiprocessing import Process
+
+try:
+    import prelogging
+except ImportError:
+    sys.path[0:0] = ['..']
+from prelogging import LCDict
+
+from examples.check_for_NUL import check_for_NUL
+
+LOG_PATH = '_log/bench'
+LOGFILENAME = 'bench.log'
+
+_ROTATING = dict(max_bytes=4 * 1024 * 1024, backup_count=1000)
+
+# (variant name, LCDict method, keyword arguments for that method)
+VARIANTS = [
+    ('per-record lock',     'add_file_handler', dict(locking=True)),
+    ('atomic append',       'add_file_handler', dict(locking='atomic')),
+    ('flock',               'add_file_handler', dict(locking='flock')),
+    ('buffered, 50',        'add_file_handler', dict(locking=True, buffer_size=50)),
+    ('buffered, 500',       'add_file_handler', dict(locking=True, buffer_size=500)),
+    ('rotating, close',     'add_rotating_file_handler',
+                            dict(locking=True, **_ROTATING)),
+    ('rotating, keep_open', 'add_rotating_file_handler',
+                            dict(locking=True, keep_open=True, **_ROTATING)),
+]
+
+
+def config_logging(method, **handler_kwargs):
+    lcd = LCDict(log_path=LOG_PATH,
+                 attach_handlers_to_root=True,
+                 root_level='DEBUG')
+    getattr(lcd, method)('bench_file',
+                         filename=LOGFILENAME,
+                         mode='a',
+                         formatter='process_logger_level_msg',
+                         **handler_kwargs)
+    lcd.config()
+
+
+def worker(num_records):
+    logger = logging.getLogger('bench')
+    for i in range(num_records):
+        logger.info("Message no. %d of %d", i + 1, num_records)
+    logging.shutdown()
+
+
+def run_variant(method, handler_kwargs, num_processes, num_records):
+    """Return elapsed seconds."""
+    filename = os.path.join(LOG_PATH, LOGFILENAME)
+    for fn in glob.glob(filename + '*'):
+        os.remove(fn)
+    config_logging(method, **handler_kwargs)
+
+    t0 = time.perf_counter()
+    workers = [Process(target=worker, name='worker %d' % (i + 1),
+                       args=(num_records,))
+               for i in range(num_processes)]
+    for wp in workers:
+        wp.start()
+    for wp in workers:
+        wp.join()
+    elapsed = time.perf_counter() - t0
+
+    num_lines = 0
+    for fn in glob.glob(filename + '*'):
+        with open(fn) as f:
+            num_lines += sum(1 for _ in f)
+        if check_for_NUL(fn):
+            print("    *** %s contains NUL bytes" % fn)
+    if num_lines != num_processes * num_records:
+        print("    *** expected %d lines, found %d"
+              % (num_processes * num_records, num_lines))
+    return elapsed
+
+
+def main(num_processes=None, num_records=10000):
+    if num_processes is None:
+        num_processes = os.cpu_count()
+    if not os.path.isdir(LOG_PATH):
+        os.makedirs(LOG_PATH)
+
+    print("%d processes x %d records" % (num_processes, num_records))
+    total = num_processes * num_records
+    for name, method, handler_kwargs in VARIANTS:
+        elapsed = run_variant(method, handler_kwargs,
+                              num_processes, num_records)
+        print("%-24s %8.3f s  %10.0f records/s" % (name, elapsed, total / elapsed))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]])
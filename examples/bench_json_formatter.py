@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+
+__author__ = 'brianoneill'
+
+__doc__ = """
+Cost of rendering a record as a JSON line: a formatter that builds a dict
+per record and passes it to ``json.dumps``, versus ``JSONFormatter`` with
+each installed encoder (which matters only for values other than strings
+and integers -- here, a dict added with ``extra``).
+
+Usage:
+    $ ./bench_json_formatter.py [RECORDS]
+"""
+
+import json
+import logging
+import sys
+import time
+
+try:
+    import prelogging
+except ImportError:
+    sys.path[0:0] = ['..']
+from prelogging import JSONFormatter
+from prelogging.json_formatter import orjson, ujson
+
+REPEAT = 3
+FIELDS = ('asctime', 'name', 'levelname', 'process', 'message')
+
+
+class DictFormatter(logging.Formatter):
+    """The usual approach."""
+    def __init__(self, fields, static=None):
+        super(DictFormatter, self).__init__('%(asctime)s')
+        self.fields = fields
+        self.static = static or {}
+
+    def format(self, record):
+        record.message = record.getMessage()
+        record.asctime = self.formatTime(record)
+        d = dict(self.static)
+        for field in self.fields:
+            d[field] = getattr(record, field)
+        return json.dumps(d)
+
+
+def run(formatter, records):
+    """Return microseconds per record, best of REPEAT runs."""
+    fmt = formatter.format
+    best = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        for record in records:
+            fmt(record)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(records) * 1e6
+
+
+def main():
+    num_records = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    records = [logging.LogRecord('bench.json', logging.INFO, __file__, i,
+                                 "record %d of %d", (i, num_records), None)
+               for i in range(num_records)]
+    with_extra = []
+    for record in records:
+        record = logging.makeLogRecord(record.__dict__)
+        record.user = {'id': 7, 'roles': ['admin']}
+        with_extra.append(record)
+    static = {'app': 'bench'}
+
+    variants = [('dict + json.dumps', DictFormatter(FIELDS, static),
+                 DictFormatter(FIELDS + ('user',), static))]
+    for encoder, module in (('json', json), ('orjson', orjson),
+                            ('ujson', ujson)):
+        if module is not None:
+            variants.append(
+                ('JSONFormatter, %s' % encoder,
+                 JSONFormatter(fields=FIELDS, static=static, encoder=encoder),
+                 JSONFormatter(fields=FIELDS + ('user',), static=static,
+                               encoder=encoder)))
+
+    print("%d records; usec/record" % num_records)
+    print("%-26s %10s %12s" % ('', 'plain', 'with extra'))
+    baseline = None
+    for name, plain, extra in variants:
+        usec = run(plain, records)
+        baseline = baseline or usec
+        print("%-26s %10.2f %12.2f  (%.2fx)"
+              % (name, usec, run(extra, with_extra), baseline / usec))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+
+__author__ = 'brianoneill'
+
+__doc__ = """
+Cost of an uncontended acquire/release pair for the two kinds of lock that
+locking handlers can use: ``multiprocessing.Lock`` (a semaphore) and
+``prelogging.FileLock`` (``fcntl.flock`` on a lock file). For the cost under
+contention, see ``bench_file_handlers.py``.
+
+Usage:
+    $ ./bench_locks.py [ITERATIONS]
+"""
+
+import os
+import sys
+import timeit
+from multiprocessing import Lock
+
+try:
+    import prelogging
+except ImportError:
+    sys.path[0:0] = ['..']
+from prelogging import FileLock
+
+LOG_PATH = '_log/bench'
+
+
+def time_lock(lock, iterations):
+    """Return mean seconds per acquire/release pair."""
+    def acquire_release():
+        lock.acquire()
+        lock.release()
+    return timeit.timeit(acquire_release, number=iterations) / iterations
+
+
+def main(iterations=200000):
+    if not os.path.isdir(LOG_PATH):
+        os.makedirs(LOG_PATH)
+    locks = [
+        ('multiprocessing.Lock', Lock()),
+        ('FileLock',             FileLock(os.path.join(LOG_PATH, 'bench.lock'))),
+    ]
+    for name, lock in locks:
+        print("%-22s %8.3f us per acquire/release"
+              % (name, time_lock(lock, iterations) * 1e6))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+
+__author__ = 'brianoneill'
+
+__doc__ = """
+Speed of parsing a logfile written with the ``time_logger_level_msg``
+preset into columns (timestamp, level number, logger name, message):
+an ad-hoc loop that matches a regular expression against each line and
+converts the fields one record at a time, versus ``LogParser``, for all
+four columns and for just the timestamp and level number.
+
+Usage:
+    $ ./bench_log_parsing.py [RECORDS]
+"""
+
+import logging
+import os
+import re
+import sys
+import time
+
+try:
+    import prelogging
+except ImportError:
+    sys.path[0:0] = ['..']
+from prelogging import LogParser
+from prelogging.binary_log import _make_formatter
+
+LOG_PATH = '_log/bench'
+LOGFILENAME = 'bench_parsing.log'
+REPEAT = 3
+
+_line_re = re.compile(r'(\S+ \S+): (\S+) *: (\S+) *: (.*)')
+
+
+def ad_hoc(filename):
+    """The usual approach."""
+    timestamps, levels, names, messages = [], [], [], []
+    with open(filename) as f:
+        for line in f:
+            m = _line_re.match(line)
+            if m:
+                asctime, name, levelname, message = m.groups()
+                timestamps.append(
+                    time.mktime(time.strptime(asctime[:19],
+                                              '%Y-%m-%d %H:%M:%S')) +
+                    int(asctime[20:]) / 1000)
+                levels.append(logging.getLevelName(levelname))
+                names.append(name)
+                messages.append(message)
+    return {'timestamp': timestamps, 'levelno': levels, 'name': names,
+            'message': messages}
+
+
+def best_time(fn, *args):
+    best = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    num_records = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    if not os.path.isdir(LOG_PATH):
+        os.makedirs(LOG_PATH)
+    filename = os.path.join(LOG_PATH, LOGFILENAME)
+
+    formatter = _make_formatter('time_logger_level_msg')
+    start = time.time()
+    with open(filename, 'w') as f:
+        for i in range(num_records):
+            record = logging.LogRecord(
+                'bench.parsing.%d' % (i % 7), (i % 5 + 1) * 10, __file__, 1,
+                "record %d of %d: %s", (i, num_records, 'value'), None)
+            record.created = start + i * 0.0005
+            record.msecs = int((record.created % 1) * 1000)
+            f.write(formatter.format(record) + '\n')
+    megabytes = os.path.getsize(filename) / 1e6
+
+    print("%d records, %.1f MB" % (num_records, megabytes))
+    print("%-36s %8s %8s" % ('', 'seconds', 'MB/s'))
+    columns = ('timestamp', 'levelno', 'name', 'message')
+    variants = [
+        ('ad hoc regex per line', ad_hoc, filename),
+        ('LogParser, 4 columns',
+         LogParser('time_logger_level_msg', columns).parse, filename),
+        ('LogParser, timestamp + levelno',
+         LogParser('time_logger_level_msg',
+                   ('timestamp', 'levelno')).parse, filename),
+    ]
+    for name, fn, arg in variants:
+        seconds, result = best_time(fn, arg)
+        assert len(result['levelno']) == num_records
+        print("%-36s %8.2f %8.1f" % (name, seconds, megabytes / seconds))
+
+
+if __name__ == '__main__':
+    main()
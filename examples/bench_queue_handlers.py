@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+
+__author__ = 'brianoneill'
+
+__doc__ = """
+Throughput of the queue-based approach to multiprocess logging, with the
+variants of ``LCDict.add_queue_handler``: worker processes log to a queue
+handler configured by ``listener.worker_lcdict(...)``, and a ``LogListener``
+thread hands the records to a handler that just counts them, so the timings
+measure the transport.
+
+Usage:
+    $ ./bench_queue_handlers.py [PROCESSES [RECORDS_PER_PROCESS]]
+"""
+
+import logging
+import logging.handlers
+import pickle
+import sys
+import time
+import timeit
+from multiprocessing import Process
+
+try:
+    import prelogging
+except ImportError:
+    sys.path[0:0] = ['..']
+from prelogging import LCDict, LogListener, CompactQueueHandler
+
+LOGGER_NAME = 'bench_queue_handlers'
+
+# (name, keyword arguments for worker_lcdict, i.e. add_queue_handler)
+VARIANTS = [
+    ('QueueHandler',                {}),
+    ('BatchingQueueHandler (100)',  {'batch_size': 100}),
+    ('CompactQueueHandler',         {'compact': True}),
+    ('Batching (100) + compact',    {'batch_size': 100, 'compact': True}),
+]
+
+
+class CountingHandler(logging.Handler):
+    count = 0
+
+    def emit(self, record):
+        CountingHandler.count += 1
+
+
+def worker(listener, worker_kwargs, num_records):
+    listener.worker_lcdict(**worker_kwargs).config()
+    logger = logging.getLogger(LOGGER_NAME)
+    for i in range(num_records):
+        logger.info("record %d of %d from a worker", i, num_records)
+
+
+def run(worker_kwargs, num_procs, num_records):
+    """Return elapsed seconds until the listener has handled every record."""
+    lcd = LCDict(root_level='DEBUG')
+    lcd.add_handler('count', class_='__main__.CountingHandler',
+                    formatter='process_time_logger_level_msg',
+                    attach_to_root=True)
+    listener = LogListener(lcd, process=False).start()
+    CountingHandler.count = 0
+    start = time.perf_counter()
+    procs = [Process(target=worker,
+                     args=(listener, worker_kwargs, num_records))
+             for _ in range(num_procs)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    listener.stop()
+    elapsed = time.perf_counter() - start
+    assert CountingHandler.count == num_procs * num_records, \
+        CountingHandler.count
+    return elapsed
+
+
+def encoding_costs(fields, iterations=20000):
+    """Print pickled size, and time to prepare and pickle, of one record
+    as QueueHandler and CompactQueueHandler send it."""
+    record = logging.getLogger(LOGGER_NAME).makeRecord(
+        LOGGER_NAME, logging.INFO, __file__, 1,
+        "record %d of %d from a worker", (1, 2), None)
+    for name, handler in [
+            ('QueueHandler', logging.handlers.QueueHandler(None)),
+            ('CompactQueueHandler', CompactQueueHandler(None, fields=fields))]:
+        size = len(pickle.dumps(handler.prepare(record)))
+        secs = timeit.timeit(lambda: pickle.dumps(handler.prepare(record)),
+                             number=iterations) / iterations
+        print("%-32s %5d bytes  %8.2f us to prepare+pickle"
+              % (name, size, secs * 1e6))
+
+
+def main(num_procs=4, num_records=20000):
+    total = num_procs * num_records
+    lcd = LCDict()
+    lcd.add_null_handler('null', formatter='process_time_logger_level_msg')
+    encoding_costs(LogListener(lcd).fields)
+    print()
+    for name, worker_kwargs in VARIANTS:
+        elapsed = run(worker_kwargs, num_procs, num_records)
+        print("%-32s %8.3f s  %10.0f records/s"
+              % (name, elapsed, total / elapsed))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]])
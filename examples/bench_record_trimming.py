@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+
+__author__ = 'brianoneill'
+
+__doc__ = """
+Cost of a logging call whose formatter uses only the level and message,
+with ``LCDict.config()``, ``config(trim_records=True)`` -- which turns off
+the collection of caller, thread and process information that the formatter
+doesn't use -- and ``config(trim_records='ERROR')``, which does so only for
+records below ERROR.
+
+Usage:
+    $ ./bench_record_trimming.py [RECORDS]
+"""
+
+import logging
+import os
+import sys
+import time
+
+try:
+    import prelogging
+except ImportError:
+    sys.path[0:0] = ['..']
+from prelogging import LCDict, restore_record_collection
+
+LOGGER_NAME = 'bench_record_trimming'
+
+VARIANTS = [
+    ('config()',                    False),
+    ("config(trim_records='ERROR')", 'ERROR'),
+    ('config(trim_records=True)',   True),
+]
+
+
+def run(trim_records, num_records):
+    """Return microseconds per logging call."""
+    restore_record_collection()
+    with open(os.devnull, 'w') as devnull:
+        lcd = LCDict(root_level='DEBUG')
+        lcd.add_stream_handler('devnull', stream=devnull,
+                               formatter='level_msg', attach_to_root=True)
+        lcd.config(trim_records=trim_records)
+        logger = logging.getLogger(LOGGER_NAME)
+        start = time.perf_counter()
+        for i in range(num_records):
+            logger.info("record %d of %d", i, num_records)
+        elapsed = time.perf_counter() - start
+        logging.getLogger().handlers[0].flush()
+    restore_record_collection()
+    return elapsed / num_records * 1e6
+
+
+def main():
+    num_records = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print("%d records" % num_records)
+    baseline = None
+    for name, trim_records in VARIANTS:
+        usec = run(trim_records, num_records)
+        baseline = baseline or usec
+        print("%-32s %6.2f usec/call  (%.2fx)" % (name, usec, baseline / usec))
+
+
+if __name__ == '__main__':
+    main()
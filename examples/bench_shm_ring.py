@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+
+__author__ = 'brianoneill'
+
+__doc__ = """
+Throughput of two ways to funnel the records of several worker processes to
+one consuming process: ``QueueHandler`` with a ``multiprocessing.Queue`` and a
+``QueueListener``, versus ``ShmRingHandler`` with a ``ShmRing`` and a
+``ShmRingListener``. The consumer's handler just counts records, so the
+timings measure the transport.
+
+Usage:
+    $ ./bench_shm_ring.py [PROCESSES [RECORDS_PER_PROCESS]]
+"""
+
+import logging
+import logging.handlers
+import sys
+import time
+from multiprocessing import Process, Queue
+
+try:
+    import prelogging
+except ImportError:
+    sys.path[0:0] = ['..']
+from prelogging import LCDict, ShmRing, ShmRingListener
+
+LOGGER_NAME = 'bench_shm_ring'
+
+
+class CountingHandler(logging.Handler):
+    def __init__(self):
+        super(CountingHandler, self).__init__()
+        self.count = 0
+
+    def emit(self, record):
+        self.count += 1
+
+
+def worker(add_handler, num_records):
+    lcd = LCDict()
+    add_handler(lcd)
+    lcd.add_logger(LOGGER_NAME, handlers='transport', level='DEBUG',
+                   propagate=False)
+    lcd.config()
+    logger = logging.getLogger(LOGGER_NAME)
+    for i in range(num_records):
+        logger.info("record %d of %d from a worker", i, num_records)
+
+
+def run(add_handler, listener, num_procs, num_records):
+    """Return elapsed seconds until ``listener`` has received every record."""
+    counter = listener.handlers[0]
+    listener.start()
+    start = time.perf_counter()
+    procs = [Process(target=worker, args=(add_handler, num_records))
+             for _ in range(num_procs)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    listener.stop()
+    elapsed = time.perf_counter() - start
+    assert counter.count == num_procs * num_records, counter.count
+    return elapsed
+
+
+def main(num_procs=4, num_records=20000):
+    total = num_procs * num_records
+
+    queue = Queue()
+    elapsed = run(
+        lambda lcd: lcd.add_queue_handler('transport', queue=queue),
+        logging.handlers.QueueListener(queue, CountingHandler()),
+        num_procs, num_records)
+    print("%-32s %8.3f s  %10.0f records/s"
+          % ("QueueHandler + mp.Queue", elapsed, total / elapsed))
+
+    ring = ShmRing(slots=8192, slot_size=512, policy='block')
+    try:
+        elapsed = run(
+            lambda lcd: lcd.add_shm_ring_handler('transport', ring=ring),
+            ShmRingListener(ring, CountingHandler()),
+            num_procs, num_records)
+        print("%-32s %8.3f s  %10.0f records/s"
+              % ("ShmRingHandler + ShmRing", elapsed, total / elapsed))
+        print("ring stats:", ring.stats())
+    finally:
+        ring.close()
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]])
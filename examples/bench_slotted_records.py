@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+
+__author__ = 'brianoneill'
+
+__doc__ = """
+Allocation and throughput of ``logging.LogRecord`` and of
+``SlottedLogRecord`` (``LCDict.config(slotted_records=True)``):
+
+* bytes allocated per record, measured with tracemalloc while creating
+  and formatting records with the installed record factory and keeping
+  them alive;
+* the cost of creating a record with the installed factory;
+* the cost of a logging call whose formatter uses only the level and
+  message, with and without ``trim_records=True``.
+
+Usage:
+    $ ./bench_slotted_records.py [RECORDS]
+"""
+
+import logging
+import os
+import sys
+import time
+import tracemalloc
+
+try:
+    import prelogging
+except ImportError:
+    sys.path[0:0] = ['..']
+from prelogging import LCDict, restore_record_collection
+
+LOGGER_NAME = 'bench_slotted_records'
+REPEAT = 3
+
+VARIANTS = [
+    ('LogRecord',                   {}),
+    ('slotted',                     dict(slotted_records=True)),
+    ('LogRecord, trimmed',          dict(trim_records=True)),
+    ('slotted, trimmed',            dict(slotted_records=True,
+                                         trim_records=True)),
+]
+
+
+def configure(stream, config_kwargs):
+    restore_record_collection()
+    logging.setLogRecordFactory(logging.LogRecord)
+    lcd = LCDict(root_level='DEBUG')
+    lcd.add_stream_handler('stream', stream=stream,
+                           formatter='level_msg', attach_to_root=True)
+    lcd.config(**config_kwargs)
+
+
+def unconfigure():
+    restore_record_collection()
+    logging.setLogRecordFactory(logging.LogRecord)
+
+
+def allocation(num_records):
+    """Return bytes allocated per record created by the installed
+    factory, including what formatting adds to it."""
+    factory = logging.getLogRecordFactory()
+    formatter = logging.Formatter('%(levelname)s: %(message)s')
+    records = []
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(num_records):
+        record = factory(LOGGER_NAME, logging.INFO, __file__, 1,
+                         "record %d", (i,), None, 'allocation')
+        formatter.format(record)
+        records.append(record)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / num_records
+
+
+def creation(num_records):
+    """Return microseconds per record created by the installed factory."""
+    factory = logging.getLogRecordFactory()
+    start = time.perf_counter()
+    for i in range(num_records):
+        factory(LOGGER_NAME, logging.INFO, __file__, 1,
+                "record %d", (i,), None, 'creation')
+    return (time.perf_counter() - start) / num_records * 1e6
+
+
+def throughput(num_records):
+    """Return microseconds per logging call."""
+    logger = logging.getLogger(LOGGER_NAME)
+    start = time.perf_counter()
+    for i in range(num_records):
+        logger.info("record %d of %d", i, num_records)
+    return (time.perf_counter() - start) / num_records * 1e6
+
+
+def main():
+    num_records = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print("%d records" % num_records)
+    print("%-20s %14s %14s %20s" % ('', 'bytes/record', 'usec/create',
+                                     'usec/logging call'))
+    baseline = None
+    with open(os.devnull, 'w') as devnull:
+        for name, config_kwargs in VARIANTS:
+            configure(devnull, config_kwargs)
+            nbytes = allocation(min(num_records, 20000))
+            # Best of REPEAT runs
+            create_usec = min(creation(num_records) for _ in range(REPEAT))
+            usec = min(throughput(num_records) for _ in range(REPEAT))
+            unconfigure()
+            baseline = baseline or usec
+            print("%-20s %14d %14.2f %12.2f (%.2fx)"
+                  % (name, nbytes, create_usec, usec, baseline / usec))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+
+__author__ = 'brianoneill'
+
+__doc__ = """
+The queue-based approach of ``mproc_approach__queue_handler_logging_thread.py``,
+using ``LCDict.start_listener``: the handlers configured by the main process's
+``LCDict`` run in a dedicated listener process, and workers configure logging
+with the ``LCDict`` supplied by ``listener.worker_lcdict()``.
+"""
+
+try:
+    import prelogging
+except ImportError:
+    import sys
+    sys.path[0:0] = ['..']          # , '../..'
+
+from prelogging import LCDict
+from prelogging.six import PY2
+if PY2:
+    exit("%s: logging.handlers.QueueHandler doesn't exist in Python 2"
+         % __file__)
+
+import logging
+from multiprocessing import Process
+
+import random
+import time
+import os
+
+
+def worker_process(listener, chunksize):
+    listener.worker_lcdict().config()
+
+    levels = [logging.DEBUG, logging.INFO, logging.WARNING, logging.ERROR,
+              logging.CRITICAL]
+    loggers = ['foo', 'foo.bar', 'foo.bar.baz',
+               'spam', 'spam.ham', 'spam.ham.eggs']
+
+    for i in range(chunksize):
+        lvl = random.choice(levels)
+        logger = logging.getLogger(random.choice(loggers))
+        logger.log(lvl, 'Message no. %d', i+1)
+        time.sleep(random.random() / 8)
+
+
+def listener_lcdict():
+    # DON'T call config() -- the listener does, in its own process
+    lcd = LCDict(log_path='_log/mproc_LL', root_level='DEBUG')
+
+    lcd.add_formatter('detailed',
+                      format='%(asctime)s %(name)-15s %(levelname)-8s '
+                             '%(processName)-10s %(message)s',
+    )
+    lcd.add_file_handler('file', filename='mplog.log',
+                                 mode='w',
+                                 formatter='detailed'
+    ).add_file_handler('errors', level='ERROR',
+                                 filename='mplog-errors.log',
+                                 mode='w',
+                                 formatter='detailed'
+    ).attach_root_handlers('file', 'errors')
+
+    lcd.add_file_handler('foofile', filename='mplog-foo.log',
+                                    mode='w',
+                                    formatter='detailed'
+    ).add_logger('foo', handlers='foofile')
+    return lcd
+
+
+def main():
+    CHUNKSIZE = 10
+
+    t_start = time.time()
+
+    listener = listener_lcdict().start_listener()
+
+    workers = []
+    for i in range(os.cpu_count()):
+        wp = Process(target=worker_process,
+                     name='worker %d' % (i + 1),
+                     args=(listener, CHUNKSIZE))
+        workers.append(wp)
+        wp.start()
+
+    for wp in workers:
+        wp.join()
+
+    listener.stop()
+
+    t_elapsed = time.time() - t_start
+    print("\nElapsed time: %.3f" % t_elapsed)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,8 +3,24 @@ __author__ = "Brian O'Neill"
 from ._version import __version_sans_release__, __version__
 from .lcdictbasic import LCDictBasic
 from .lcdict import LCDict
-from . import (locking_handlers, lcdict_builder_abc, formatter_presets)
+from .six import PY2
+from . import (locking_handlers, lcdict_builder_abc, formatter_presets,
+               shards, record_codec, shm_ring, tcp_syslog,
+               format_parsing,
+               record_trimming, slotted_records, compiled_formatter,
+               json_formatter, binary_log, log_parsing)
 from .locking_handlers import *
+from .shards import *
+from .record_codec import *
+from .shm_ring import *
+from .tcp_syslog import *
+from .format_parsing import *
+from .record_trimming import *
+from .slotted_records import *
+from .compiled_formatter import *
+from .json_formatter import *
+from .binary_log import *
+from .log_parsing import *
 from .formatter_presets import *
 from .lcdict_builder_abc import *
 
@@ -16,6 +32,25 @@ __all__ = (
      'LCDict',
     ] +
     locking_handlers.__all__   +
+    shards.__all__             +
+    record_codec.__all__       +
+    shm_ring.__all__           +
+    tcp_syslog.__all__         +
+    format_parsing.__all__     +
+    record_trimming.__all__    +
+    slotted_records.__all__    +
+    compiled_formatter.__all__ +
+    json_formatter.__all__     +
+    binary_log.__all__         +
+    log_parsing.__all__        +
     lcdict_builder_abc.__all__ +
     formatter_presets.__all__
 )
+
+# logging.handlers.QueueHandler, and the queue and socketserver modules,
+# are Python 3 only
+if not PY2:
+    from . import queue_handlers, socket_handlers
+    from .queue_handlers import *
+    from .socket_handlers import *
+    __all__ += queue_handlers.__all__ + socket_handlers.__all__
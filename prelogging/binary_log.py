@@ -0,0 +1,646 @@
+# coding=utf-8
+
+__author__ = "Brian O'Neill"
+
+__doc__ = """ \
+.. _binary-log-module:
+
+A compact binary logfile format: a handler that writes it, and a streaming
+decoder that renders it as text through any formatter -- in particular,
+any formatter preset::
+
+    $ python -m prelogging.binary_log _log/app.binlog --preset time_logger_level_msg
+
+A ``BinaryFileHandler`` doesn't format records. It writes each one as a
+length-prefixed *frame* of varint-encoded fields: the id of its *call site*
+-- logger name, level, pathname, line number, function, thread and
+process -- the id of its message template, the difference between its
+timestamp and the previous one, and its arguments, ``marshal``\\led. A site
+or template is written out in full, in a frame that defines its id, only
+the first time a process logs it. So a typical record takes a third of
+the space it would as text, and encoding it costs less than formatting it.
+
+The ids are scoped to the writing process, and each process begins with a
+*session* frame that resets them, so that any number of processes can
+append to the same file, with any of the locking modes of
+``LCDict.add_file_handler(binary=True)``: the frames that a record needs
+are always written together.
+
+``read_binary_log`` yields the ``LogRecord``\\s of a binary logfile, reading
+it a chunk at a time. Decoded records have the same message, arguments,
+timestamp (exactly), call-site, thread and process attributes, and exception
+and stack text as those that were logged, so formatting them gives the
+output that formatting the originals would have given.
+"""
+
+import logging
+import logging.config
+import marshal
+import operator
+import os
+import struct
+import sys
+import time
+
+from .locking_handlers import LockingBufferedFileHandler, PIPE_BUF
+from .slotted_records import _start_time
+
+__all__ = ['BinaryFileHandler', 'read_binary_log', 'render_binary_log']
+
+#############################################################################
+# The format
+#
+# A file is a sequence of frames, each a varint byte count followed by
+# that many bytes, the first of which is the frame's kind:
+#
+#   SESSION  MAGIC, pid, logging._startTime in seconds (double), and from
+#            Python 3.13, when it's time.time_ns(), that integer.
+#            Starts (or restarts) the session of a writer: forget its ids.
+#   STRING   pid, id, UTF-8 text -- defines a message template
+#   SITE     pid, id, name, levelno, levelname, pathname, lineno, funcName,
+#            thread, threadName, process, processName, taskName
+#            Strings and optional integers are stored as varint n + 1,
+#            0 meaning None; strings are then followed by n bytes.
+#   RECORD   pid, site id, template id, zigzag delta of the bits of
+#            ``created``, flags; then per the flags, a zigzag correction
+#            in nanoseconds (see below); if the template id is 0, the merged
+#            message; then per the flags, exc_text and stack_info, each
+#            preceded by its length, and the marshalled args, which take
+#            the rest of the frame.
+#
+# All frames after a writer's SESSION frame carry its pid. The bits of
+# the double ``created`` are compared as integers: records logged close
+# together have close bit patterns, so the delta usually takes a byte or two.
+#
+# From Python 3.13, a record's relativeCreated and msecs are computed from
+# time.time_ns(), more precisely than the double ``created`` can say. The
+# writer then sets _NS, and writes the difference between the nanoseconds
+# since the start that relativeCreated gives and those that ``created``
+# gives, from which the reader recovers both exactly.
+#############################################################################
+
+MAGIC = b'PLB1'
+
+_SESSION, _STRING, _SITE, _RECORD = b'\x01', b'\x02', b'\x03', b'\x04'
+
+# RECORD flags
+_ARGS, _EXC, _STACK, _NS = 1, 2, 4, 8
+
+_DOUBLE = struct.Struct('<d')
+_INT64 = struct.Struct('<q')
+
+_BYTE = [bytes((i,)) for i in range(256)]
+
+# Whether LogRecords' times come from time.time_ns() (Python 3.13+)
+_NS_TIMES = isinstance(logging._startTime, int)
+
+_dumps = marshal.dumps
+_getpid = os.getpid
+_pack_double = _DOUBLE.pack
+_unpack_bits = _INT64.unpack
+
+# The attributes that identify a site, and the message template
+_site_key = operator.attrgetter(
+    'name', 'levelno', 'levelname', 'pathname', 'lineno', 'funcName',
+    'thread', 'threadName', 'process', 'processName', 'msg')
+
+# Default: start a new session after this many sites and templates
+INTERN_LIMIT = 4096
+
+
+def _varint(n):
+    """Return the non-negative integer ``n`` as a varint: 7 bits per byte,
+    least significant first, the high bit set on all but the last."""
+    if n < 0x80:
+        return _BYTE[n]
+    out = bytearray()
+    while n >= 0x80:
+        out.append((n & 0x7f) | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+
+def _read_varint(buf, pos):
+    """Return the varint in ``buf`` at ``pos``, and the position after it.
+    Raise ``IndexError`` if it runs off the end of ``buf``."""
+    b = buf[pos]
+    if b < 0x80:
+        return b, pos + 1
+    n = b & 0x7f
+    shift = 7
+    while True:
+        pos += 1
+        b = buf[pos]
+        n |= (b & 0x7f) << shift
+        if b < 0x80:
+            return n, pos + 1
+        shift += 7
+
+
+def _frame(body):
+    return _varint(len(body)) + body
+
+
+def _bits(x):
+    """The bits of the double ``x``, as an integer."""
+    return _INT64.unpack(_DOUBLE.pack(x))[0]
+
+
+def _text(s):
+    return s.encode('utf-8', 'surrogatepass')
+
+
+def _opt_str(s):
+    if s is None:
+        return b'\x00'
+    if s.__class__ is not str:
+        s = str(s)
+    b = _text(s)
+    return _varint(len(b) + 1) + b
+
+
+def _opt_int(n):
+    return b'\x00' if n is None else _varint(n + 1)
+
+
+#############################################################################
+# BinaryFileHandler
+#############################################################################
+
+_formatter = logging.Formatter()
+
+
+class BinaryFileHandler(LockingBufferedFileHandler):
+    """
+    .. _BinaryFileHandler:
+
+    A handler that writes records to a file in `prelogging`'s compact binary
+    format, unformatted. Its formatter, if any, is used only to render
+    exception and stack information. Read the file with
+    ``read_binary_log``, or render it as text with ``render_binary_log``
+    or ``python -m prelogging.binary_log``.
+
+    By default each record is written as it's logged; with ``buffer_size``
+    greater than 1, records are written in groups, as by a
+    ``LockingBufferedFileHandler``.
+
+    A record's arguments are written with ``marshal`` if they're all of
+    types it handles exactly -- ``str``, ``int``, ``float``, ``bytes``,
+    ``None``, ``bool``, and containers of these; otherwise the message is
+    merged with them and written instead. The handlers of one process must
+    not write to the same file: the ids of sites and templates are scoped
+    to the writing process.
+    """
+    def __init__(self, filename,
+                 create_lock=False,
+                 buffer_size=1,
+                 intern_limit=INTERN_LIMIT,
+                 **kwargs):
+        """
+        :param filename: the logfile
+        :param create_lock: as for ``LockingFileHandler``
+        :param buffer_size: number of records to accumulate before writing
+        :param intern_limit: start a new session, forgetting the sites and
+            templates defined so far, when this many combinations of them
+            have been seen -- which bounds the memory used by a process
+            that logs messages already formatted, each a "template" of
+            its own.
+        :param kwargs: ``flush_interval`` and ``flush_level``, as for
+            ``LockingBufferedFileHandler``;
+            ``lock_file``, ``lock_stats`` and ``atomic``, as for
+            ``LockingFileHandler``;
+            and as for ``logging.FileHandler``: ``mode`` (``'a'`` or
+            ``'w'``; the file is always opened in binary mode),
+            ``delay``.
+        """
+        mode = kwargs.pop('mode', 'a')
+        if 'b' not in mode:
+            mode += 'b'
+        kwargs.pop('encoding', None)
+        self.intern_limit = intern_limit
+        self._session_pid = None
+        super(BinaryFileHandler, self).__init__(
+            filename,
+            create_lock=create_lock,
+            buffer_size=buffer_size,
+            mode=mode,
+            **kwargs)
+
+    def _start_session(self, pid):
+        """Forget all ids; return a SESSION frame."""
+        self._session_pid = pid
+        self._templates = {}
+        self._sites = {}
+        self._prefixes = {}
+        self._last_bits = _bits(_start_time)
+        self._pid_bytes = _varint(pid)
+        return _frame(_SESSION + MAGIC + self._pid_bytes +
+                      _DOUBLE.pack(_start_time) +
+                      (_varint(logging._startTime) if _NS_TIMES else b''))
+
+    def _define(self, key, taskName, head):
+        """Return the start of the RECORD frames of records with ``key``,
+        a tuple of ``_site_key`` values (with ``None`` as ``msg`` if the
+        message will be written merged), and ``head`` followed by the
+        frames that define the site and template ids it refers to.
+        """
+        if len(self._prefixes) >= self.intern_limit:
+            head += self._start_session(self._session_pid)
+        pid_bytes = self._pid_bytes
+        site = key[:-1] + (taskName,)
+        site_id = self._sites.get(site)
+        if site_id is None:
+            site_id = self._sites[site] = len(self._sites) + 1
+            (name, levelno, levelname, pathname, lineno, funcName,
+             thread, threadName, process, processName, taskName) = site
+            head += _frame(b''.join((
+                _SITE, pid_bytes, _varint(site_id),
+                _opt_str(name), _varint(levelno), _opt_str(levelname),
+                _opt_str(pathname), _opt_int(lineno), _opt_str(funcName),
+                _opt_int(thread), _opt_str(threadName),
+                _opt_int(process), _opt_str(processName),
+                _opt_str(taskName))))
+        msg = key[-1]
+        template_id = 0
+        if msg is not None:
+            template_id = self._templates.get(msg)
+            if template_id is None:
+                template_id = self._templates[msg] = len(self._templates) + 1
+                head += _frame(_STRING + pid_bytes + _varint(template_id) +
+                               _text(msg))
+        prefix = self._prefixes[key] = (
+            _RECORD + pid_bytes + _varint(site_id) + _varint(template_id))
+        return prefix, head
+
+    def _exception_fields(self, record, flags, tail):
+        """Return ``flags`` and ``tail`` with the exception and stack text
+        of ``record`` added, rendering its exception first if need be."""
+        if record.stack_info:
+            flags |= _STACK
+            b = _text(record.stack_info)
+            tail = _varint(len(b)) + b + tail
+        exc_text = record.exc_text
+        if record.exc_info and not exc_text:
+            exc_text = record.exc_text = (
+                self.formatter or _formatter).formatException(record.exc_info)
+        if exc_text:
+            flags |= _EXC
+            b = _text(exc_text)
+            tail = _varint(len(b)) + b + tail
+        return flags, tail
+
+    def encode(self, record):
+        """Return ``record`` as ``bytes``: its RECORD frame, preceded by
+        any frames that define what it refers to.
+        """
+        pid = _getpid()
+        head = b'' if pid == self._session_pid else self._start_session(pid)
+
+        key = _site_key(record)
+        args = record.args
+        flags = 0
+        tail = b''
+        if key[-1].__class__ is not str:
+            key = key[:-1] + (None,)
+        elif args:
+            try:
+                tail = _dumps(args)
+                flags = _ARGS
+            except ValueError:
+                key = key[:-1] + (None,)
+        prefix = self._prefixes.get(key)
+        if prefix is None:
+            prefix, head = self._define(key, getattr(record, 'taskName', None),
+                                        head)
+
+        bits = _unpack_bits(_pack_double(record.created))[0]
+        delta = bits - self._last_bits
+        self._last_bits = bits
+        delta = delta << 1 if delta >= 0 else ((-delta) << 1) - 1
+
+        if record.exc_info or record.exc_text or record.stack_info:
+            flags, tail = self._exception_fields(record, flags, tail)
+        if key[-1] is None:
+            b = _text(record.getMessage())
+            tail = _varint(len(b)) + b + tail
+        if _NS_TIMES:
+            flags |= _NS
+            ns = (round(record.relativeCreated * 1e6) -
+                  round((record.created - _start_time) * 1e9))
+            tail = _varint(ns << 1 if ns >= 0 else ((-ns) << 1) - 1) + tail
+
+        body = (prefix + (_BYTE[delta] if delta < 0x80 else _varint(delta)) +
+                _BYTE[flags] + tail)
+        n = len(body)
+        return head + (_BYTE[n] if n < 0x80 else _varint(n)) + body
+
+    def _write_buffer(self):
+        """Write the buffered frames to the file -- with one unlocked write
+        if ``atomic`` is true and they fit in ``PIPE_BUF`` bytes, otherwise
+        under the lock -- then empty the buffer.
+        """
+        self._check_pid()
+        if self._buffer:
+            if self._ensure_stream_():
+                data = b''.join(self._buffer)
+                fd = self.stream.fileno()
+                if self.atomic and len(data) <= PIPE_BUF:
+                    os.write(fd, data)
+                else:
+                    self._acquire_()
+                    try:
+                        while data:
+                            data = data[os.write(fd, data):]
+                    finally:
+                        self._release_()
+            self._buffer = []
+        self._last_write = time.time()
+
+    def emit(self, record):
+        """Buffer an encoded logging record, writing the buffer if it's
+        time to. Called by `logging`.
+        """
+        try:
+            self._check_pid()
+            self._buffer.append(self.encode(record))
+            if (len(self._buffer) >= self.buffer_size
+                or record.levelno >= self.flush_level
+                or (self.flush_interval is not None and
+                    record.created - self._last_write >= self.flush_interval)
+               ):
+                self._write_buffer()
+        except Exception:
+            # What was written is uncertain: define everything anew
+            self._session_pid = None
+            self.handleError(record)
+
+
+#############################################################################
+# Decoding
+#############################################################################
+
+class _Session():
+    __slots__ = ('start', 'start_ns', 'last_bits', 'templates', 'sites')
+
+    def __init__(self, start, start_ns=None):
+        self.start = start
+        self.start_ns = start_ns
+        self.last_bits = _bits(start)
+        self.templates = {}
+        self.sites = {}
+
+
+def _read_opt_str(buf, pos):
+    n, pos = _read_varint(buf, pos)
+    if not n:
+        return None, pos
+    end = pos + n - 1
+    return buf[pos:end].decode('utf-8', 'surrogatepass'), end
+
+
+def _read_opt_int(buf, pos):
+    n, pos = _read_varint(buf, pos)
+    return (n - 1 if n else None), pos
+
+
+def _read_str(buf, pos):
+    n, pos = _read_varint(buf, pos)
+    end = pos + n
+    return buf[pos:end].decode('utf-8', 'surrogatepass'), end
+
+
+def _site_attributes(buf, pos):
+    """Return a dict of the attributes defined by a SITE frame."""
+    name, pos = _read_opt_str(buf, pos)
+    levelno, pos = _read_varint(buf, pos)
+    levelname, pos = _read_opt_str(buf, pos)
+    pathname, pos = _read_opt_str(buf, pos)
+    lineno, pos = _read_opt_int(buf, pos)
+    funcName, pos = _read_opt_str(buf, pos)
+    thread, pos = _read_opt_int(buf, pos)
+    threadName, pos = _read_opt_str(buf, pos)
+    process, pos = _read_opt_int(buf, pos)
+    processName, pos = _read_opt_str(buf, pos)
+    taskName, pos = _read_opt_str(buf, pos)
+    # As LogRecord.__init__ computes them
+    try:
+        filename = os.path.basename(pathname)
+        module = os.path.splitext(filename)[0]
+    except (TypeError, ValueError, AttributeError):
+        filename = pathname
+        module = "Unknown module"
+    return {'name': name, 'levelno': levelno, 'levelname': levelname,
+            'pathname': pathname, 'filename': filename, 'module': module,
+            'lineno': lineno, 'funcName': funcName,
+            'thread': thread, 'threadName': threadName,
+            'process': process, 'processName': processName,
+            'taskName': taskName,
+            'exc_info': None}
+
+
+def _frames(f, chunk_size):
+    """Yield ``(buf, start, end)`` for each complete frame in the binary
+    file ``f``; ``buf[start:end]`` is the frame, without its length.
+    An incomplete frame at the end of the file -- one being written --
+    is ignored."""
+    buf = b''
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            return
+        buf += chunk
+        pos = 0
+        size = len(buf)
+        while pos < size:
+            try:
+                length, start = _read_varint(buf, pos)
+            except IndexError:
+                break
+            end = start + length
+            if end > size:
+                break
+            yield buf, start, end
+            pos = end
+        buf = buf[pos:]
+
+
+def read_binary_log(source, chunk_size=1 << 16):
+    """Yield the ``LogRecord``\\s in a file written by a
+    ``BinaryFileHandler``, in the order in which they were written,
+    reading ``chunk_size`` bytes at a time.
+
+    :param source: a filename, or a file opened in binary mode
+    :param chunk_size: number of bytes to read at a time
+    """
+    f = open(source, 'rb') if isinstance(source, str) else source
+    new_record = logging.LogRecord.__new__
+    LogRecord = logging.LogRecord
+    sessions = {}
+    first = True
+    try:
+        for buf, pos, end in _frames(f, chunk_size):
+            kind = buf[pos]
+            if first:
+                if kind != _SESSION[0] or buf[pos + 1:pos + 5] != MAGIC:
+                    raise ValueError("Not a prelogging binary log: %r"
+                                     % getattr(f, 'name', f))       # | raise
+                first = False
+            pid, pos = _read_varint(buf, pos + (5 if kind == 1 else 1))
+            if kind == 4:
+                session = sessions[pid]
+                site_id, pos = _read_varint(buf, pos)
+                template_id, pos = _read_varint(buf, pos)
+                delta, pos = _read_varint(buf, pos)
+                bits = session.last_bits + (
+                    -((delta + 1) >> 1) if delta & 1 else delta >> 1)
+                session.last_bits = bits
+                created = _DOUBLE.unpack(_INT64.pack(bits))[0]
+                flags = buf[pos]
+                pos += 1
+                if flags & _NS:
+                    ns, pos = _read_varint(buf, pos)
+                    ns = -((ns + 1) >> 1) if ns & 1 else ns >> 1
+                if template_id:
+                    msg = session.templates[template_id]
+                else:
+                    msg, pos = _read_str(buf, pos)
+                exc_text = stack_info = None
+                if flags & _EXC:
+                    exc_text, pos = _read_str(buf, pos)
+                if flags & _STACK:
+                    stack_info, pos = _read_str(buf, pos)
+                args = marshal.loads(buf[pos:end]) if flags & _ARGS else ()
+
+                record = new_record(LogRecord)
+                d = record.__dict__
+                d.update(session.sites[site_id])
+                d['msg'] = msg
+                d['args'] = args
+                d['created'] = created
+                if flags & _NS:
+                    # As LogRecord computes them from time.time_ns()
+                    ns += round((created - session.start) * 1e9)
+                    d['relativeCreated'] = ns / 1e6
+                    ns += session.start_ns
+                    msecs = (ns % 1000000000) // 1000000 + 0.0
+                    if msecs == 999.0 and int(created) != ns // 1000000000:
+                        msecs = 0.0
+                    d['msecs'] = msecs
+                else:
+                    d['msecs'] = int((created - int(created)) * 1000) + 0.0
+                    d['relativeCreated'] = (created - session.start) * 1000
+                d['exc_text'] = exc_text
+                d['stack_info'] = stack_info
+                yield record
+            elif kind == 2:
+                template_id, pos = _read_varint(buf, pos)
+                sessions[pid].templates[template_id] = (
+                    buf[pos:end].decode('utf-8', 'surrogatepass'))
+            elif kind == 3:
+                site_id, pos = _read_varint(buf, pos)
+                sessions[pid].sites[site_id] = _site_attributes(buf, pos)
+            elif kind == 1:
+                start = _DOUBLE.unpack_from(buf, pos)[0]
+                pos += _DOUBLE.size
+                start_ns = _read_varint(buf, pos)[0] if pos < end else None
+                sessions[pid] = _Session(start, start_ns)
+            else:
+                raise ValueError("Unknown frame kind %d" % kind)    # | raise
+    finally:
+        if f is not source:
+            f.close()
+
+
+#############################################################################
+# Rendering
+#############################################################################
+
+def _make_formatter(preset=None, format=None, dateformat=None, style='%'):
+    """Return the formatter that the formatter preset named ``preset``
+    describes, or else one with the given format."""
+    from .formatter_presets import FormatterSpec, _formatter_presets
+    from .lcdictbasic import LCDictBasic
+    if format is None:
+        if preset not in _formatter_presets:
+            raise KeyError("No formatter preset named '%s'" % preset)  # | raise
+        spec = _formatter_presets[preset]
+    else:
+        spec = FormatterSpec(format, dateformat=dateformat, style=style)
+    lcd = LCDictBasic()
+    lcd.add_formatter('binary_log', **spec.to_dict())
+    return logging.config.DictConfigurator({}).configure_formatter(
+        dict(lcd.formatters['binary_log']))
+
+
+def render_binary_log(source, output, formatter='time_logger_level_msg',
+                      level=None):
+    """Write the records of a binary logfile as text, one after another,
+    each formatted and followed by a newline.
+
+    :param source: a filename, or a file opened in binary mode
+    :param output: a filename, or a writable text stream
+    :param formatter: a ``logging.Formatter``, or the name of a formatter
+        preset
+    :param level: if given, a level name or number: write only records
+        at or above this level
+    :return: the number of records written
+    """
+    if not isinstance(formatter, logging.Formatter):
+        formatter = _make_formatter(formatter)
+    levelno = logging._checkLevel(level) if level is not None else None
+    out = open(output, 'w') if isinstance(output, str) else output
+    count = 0
+    try:
+        format = formatter.format
+        write = out.write
+        for record in read_binary_log(source):
+            if levelno is None or record.levelno >= levelno:
+                write(format(record) + '\n')
+                count += 1
+    finally:
+        if out is not output:
+            out.close()
+    return count
+
+
+def main(argv=None):
+    """Command-line interface to ``render_binary_log``."""
+    import argparse
+    parser = argparse.ArgumentParser(
+        prog='python -m prelogging.binary_log',
+        description="Render binary logfiles written by BinaryFileHandler "
+                    "as text.")
+    parser.add_argument('logfiles', nargs='+', help="binary logfiles")
+    parser.add_argument('--preset', default='time_logger_level_msg',
+                        help="name of the formatter preset to render "
+                             "records with [default: %(default)s]")
+    parser.add_argument('--format', default=None,
+                        help="a format string, used instead of a preset")
+    parser.add_argument('--style', default='%', choices=['%', '{', '$'],
+                        help="style of --format [default: %%]")
+    parser.add_argument('--datefmt', default=None,
+                        help="date format for --format")
+    parser.add_argument('--level', default=None,
+                        help="render only records at or above this level")
+    parser.add_argument('-o', '--output', default='-',
+                        help="text file to write, or - for stdout "
+                             "[default: -]")
+    args = parser.parse_args(argv)
+
+    try:
+        formatter = _make_formatter(args.preset, args.format,
+                                    args.datefmt, args.style)
+    except KeyError as e:
+        parser.error(e.args[0])
+    out = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        for logfile in args.logfiles:
+            render_binary_log(logfile, out, formatter, level=args.level)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == '__main__':
+    main()
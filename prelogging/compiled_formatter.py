@@ -0,0 +1,352 @@
+# coding=utf-8
+
+__author__ = "Brian O'Neill"
+
+__doc__ = """ \
+.. _compiled-formatter-module:
+
+A ``logging.Formatter`` that compiles its format string, once, into a
+function that renders records.
+
+For each record, ``logging.Formatter.format`` calls several methods to find
+out what the format needs, then interpolates the record's ``__dict__`` into
+the format string, looking up every attribute by name and re-parsing every
+padding spec. A ``CompiledFormatter`` analyzes the format string, in any of
+the three styles, when it's created, and generates a function that reads
+just the attributes the format refers to, in order, and renders them with
+positional format strings whose padding is already resolved.
+
+Attributes that take few distinct values -- the logger name, level, file,
+module, function, thread and process, whose values are effectively
+constant in a process -- are rendered together with the literal text
+around them, and the result is cached, keyed by their values. So, for the
+preset ``'process_logger_level_msg'``, the rendering of everything before
+the message is usually one ``dict`` lookup.
+
+The output is the same as that of ``logging.Formatter``. Use it in an
+``LCDict`` with ``add_formatter(..., class_='prelogging.CompiledFormatter')``,
+or in a formatter preset with the key ``class``.
+
+Its base class, ``CachedTimeFormatter``, which can be used the same way,
+renders ``asctime`` with one ``time.strftime`` per second, and offers
+integer ``epoch_ms`` and ``epoch_ns`` timestamps.
+"""
+
+import keyword
+import logging
+import re
+import string
+import time
+
+from .format_parsing import format_attributes
+
+__all__ = ['CachedTimeFormatter', 'CompiledFormatter']
+
+
+# Record attributes whose renderings are cached, keyed by their values
+FOLDED_ATTRIBUTES = frozenset(('name', 'levelname', 'levelno',
+                               'pathname', 'filename', 'module', 'funcName',
+                               'thread', 'threadName',
+                               'process', 'processName', 'taskName'))
+
+# Maximum number of renderings cached for each run of folded attributes;
+# when a cache is full it's cleared.
+FOLD_CACHE_SIZE = 1024
+
+# %-style field, or '%%'
+_percent_re = re.compile(
+    r'%(?:\((?P<name>[^)]*)\)(?P<spec>[#0+ -]*\d*(?:\.\d+)?[diouxXeEfFgGcrsa])'
+    r'|%)')
+
+_field_split_re = re.compile(r'[.\[]')
+
+
+def _fold(cache, key, rendered):
+    if len(cache) >= FOLD_CACHE_SIZE:
+        cache.clear()
+    cache[key] = rendered
+    return rendered
+
+
+def _parse(fmt, style):
+    """Return a list of the parts of ``fmt``: strings of literal text, and
+    tuples ``(attribute, spec)`` for fields. A ``spec`` is a positional
+    field, for ``%`` formatting if ``style`` is ``'%'`` or ``'$'``, and for
+    ``str.format`` if it's ``'{'``, in which ``{}`` stands for the index.
+    Raise ``ValueError`` if ``fmt`` can't be compiled.
+    """
+    parts = []
+    if style == '%':
+        pos = 0
+        for m in _percent_re.finditer(fmt):
+            parts.append(fmt[pos:m.start()])
+            if m.group('name') is None:
+                parts.append('%')
+            else:
+                parts.append((m.group('name'), '%' + m.group('spec')))
+            pos = m.end()
+        parts.append(fmt[pos:])
+    elif style == '{':
+        for literal, field, spec, conversion in string.Formatter().parse(fmt):
+            parts.append(literal)
+            if field is None:
+                continue
+            if not field or field.isdigit() or '{' in spec:
+                raise ValueError("can't compile field {%s}" % field)  # | raise
+            name = _field_split_re.split(field, 1)[0]
+            parts.append(
+                (name, '{}' + field[len(name):] +
+                       ('!' + conversion if conversion else '') +
+                       (':' + spec if spec else '') + '}'))
+    elif style == '$':
+        pos = 0
+        for m in string.Template.pattern.finditer(fmt):
+            parts.append(fmt[pos:m.start()])
+            if m.group('escaped') is not None:
+                parts.append('$')
+            elif m.group('invalid') is not None:
+                raise ValueError("invalid placeholder in format "
+                                 "string: %r" % fmt)                # | raise
+            else:
+                parts.append((m.group('named') or m.group('braced'), '%s'))
+            pos = m.end()
+        parts.append(fmt[pos:])
+    else:
+        raise ValueError("style must be one of '%%', '{', '$', not '%s'"
+                         % style)                                   # | raise
+    return [part for part in parts if part != '']
+
+
+def _runs(parts):
+    """Group ``parts`` into runs: lists of consecutive parts whose fields are
+    all folded, or all not folded. Literal text joins the run of the field
+    before it, or, at the start, of the field after it.
+    Return a list of pairs ``(folded, parts)``.
+    """
+    runs = []
+    pending = []                # literal text not yet in a run
+    for part in parts:
+        if isinstance(part, str):
+            if runs:
+                runs[-1][1].append(part)
+            else:
+                pending.append(part)
+            continue
+        folded = part[0] in FOLDED_ATTRIBUTES
+        if runs and runs[-1][0] == folded:
+            runs[-1][1].append(part)
+        else:
+            runs.append((folded, pending + [part]))
+            pending = []
+    if pending:                 # no fields
+        runs.append((True, pending))
+    return runs
+
+
+def _template(run, style):
+    """Return a positional format string for the parts in ``run``, and the
+    list of its attributes."""
+    pieces = []
+    attributes = []
+    for part in run:
+        if isinstance(part, str):
+            if style == '{':
+                part = part.replace('{', '{{').replace('}', '}}')
+            else:
+                part = part.replace('%', '%%')
+            pieces.append(part)
+        else:
+            name, spec = part
+            if style == '{':
+                spec = spec.replace('{}', '{%d' % len(attributes), 1)[:-1]
+                spec += '}'
+            pieces.append(spec)
+            attributes.append(name)
+    return ''.join(pieces), attributes
+
+
+def _compile(fmt, style, defaults):
+    """Return the source of a function ``render(record)``, and the
+    namespace in which to execute it."""
+    parts = _parse(fmt, style)
+    namespace = {'_fold': _fold}
+    lines = ['def render(record):',
+             '    message = record.message = record.getMessage()']
+    names = set(part[0] for part in parts if not isinstance(part, str))
+    if 'asctime' in names:
+        lines.append('    asctime = record.asctime = '
+                     '_format_time(record, _datefmt)')
+    if 'epoch_ms' in names:
+        lines.append('    epoch_ms = record.epoch_ms = '
+                     'int(record.created * 1000)')
+    if 'epoch_ns' in names:
+        lines.append('    epoch_ns = record.epoch_ns = '
+                     'int(record.created * 1000000000)')
+
+    def value(name):
+        if name in ('message', 'asctime', 'epoch_ms', 'epoch_ns'):
+            return name
+        if name in defaults:
+            return 'getattr(record, %r, _defaults[%r])' % (name, name)
+        if re.match(r'[A-Za-z_]\w*$', name) and not keyword.iskeyword(name):
+            return 'record.' + name
+        return 'getattr(record, %r)' % name
+
+    results = []
+    for i, (folded, run) in enumerate(_runs(parts)):
+        template, attributes = _template(run, style)
+        if not attributes:             # literal text only
+            namespace['_t%d' % i] = ''.join(run)
+            results.append('_t%d' % i)
+            continue
+        namespace['_t%d' % i] = template
+        args = '(%s,)' % ', '.join(value(name) for name in attributes)
+        if style == '{':
+            render = '_t%d.format(*%%s)' % i
+        else:
+            render = '_t%d %%%% %%s' % i
+        if folded:
+            namespace['_cache%d' % i] = {}
+            key = (value(attributes[0]) if len(attributes) == 1 else args)
+            lines += ['    k%d = %s' % (i, key),
+                      '    s%d = _cache%d.get(k%d)' % (i, i, i),
+                      '    if s%d is None:' % i,
+                      '        s%d = _fold(_cache%d, k%d, %s)'
+                      % (i, i, i, render % ('(k%d,)' % i
+                                            if len(attributes) == 1
+                                            else 'k%d' % i))]
+        else:
+            lines.append('    s%d = %s' % (i, render % args))
+        results.append('s%d' % i)
+    lines.append('    return ' + (' + '.join(results) or "''"))
+    return '\n'.join(lines) + '\n', namespace
+
+
+class CachedTimeFormatter(logging.Formatter):
+    """
+    .. _CachedTimeFormatter:
+
+    A ``logging.Formatter`` that renders ``asctime`` with one call to
+    ``time.strftime`` per second rather than per record: it caches the
+    rendering of the date and time (by ``datefmt``, or the default format)
+    for the most recent second, and appends milliseconds when
+    ``logging.Formatter`` would. The output is the same.
+
+    The format can also use the integer attributes ``epoch_ms`` and
+    ``epoch_ns``, the time a record was created in milliseconds and
+    nanoseconds since the epoch, for programs that read logs. They're
+    computed from the record's ``created``, so ``epoch_ns`` is only as
+    precise as a float (a fraction of a microsecond).
+    """
+    def __init__(self, fmt=None, datefmt=None, style='%', *args, **kwargs):
+        """
+        :param fmt: a format string, as for ``logging.Formatter``
+        :param datefmt: a date-format string, as for ``logging.Formatter``
+        :param style: ``'%'``, ``'{'`` or ``'$'``
+        :param args: other arguments for ``logging.Formatter``
+        :param kwargs: other keyword arguments for ``logging.Formatter``
+        """
+        super(CachedTimeFormatter, self).__init__(
+            fmt, datefmt, style, *args, **kwargs)
+        # (second, converter, datefmt, rendering)
+        self._time_cache = (None, None, None, None)
+        names = format_attributes(self._style._fmt, style)
+        self._epoch_ms = 'epoch_ms' in names
+        self._epoch_ns = 'epoch_ns' in names
+
+    def formatTime(self, record, datefmt=None):
+        """Return ``record.created`` formatted as by
+        ``logging.Formatter.formatTime``, reusing the rendering of the date
+        and time when the second, ``datefmt`` and ``converter`` are as for
+        the previous call."""
+        created = record.created
+        second = created // 1
+        converter = self.converter
+        cached_second, cached_converter, cached_datefmt, s = self._time_cache
+        if (second != cached_second or datefmt != cached_datefmt or
+                converter != cached_converter):
+            s = time.strftime(datefmt or self.default_time_format,
+                              converter(created))
+            # One assignment, so threads see a consistent tuple
+            self._time_cache = (second, converter, datefmt, s)
+        if not datefmt and self.default_msec_format:
+            s = self.default_msec_format % (s, record.msecs)
+        return s
+
+    def format(self, record):
+        if self._epoch_ms:
+            record.epoch_ms = int(record.created * 1000)
+        if self._epoch_ns:
+            record.epoch_ns = int(record.created * 1000000000)
+        return super(CachedTimeFormatter, self).format(record)
+
+
+class CompiledFormatter(CachedTimeFormatter):
+    """
+    .. _CompiledFormatter:
+
+    A ``logging.Formatter`` whose format string is compiled into a
+    function when the formatter is created. It produces the same output
+    as ``logging.Formatter``; formats it can't compile (``{}``-style
+    fields with nested replacement fields, or positional ones) are
+    formatted by ``logging.Formatter``. As a ``CachedTimeFormatter``, it
+    renders ``asctime`` once per second, and supports ``epoch_ms`` and
+    ``epoch_ns``.
+    """
+    def __init__(self, fmt=None, datefmt=None, style='%', *args, **kwargs):
+        """
+        :param fmt: a format string, as for ``logging.Formatter``
+        :param datefmt: a date-format string, as for ``logging.Formatter``
+        :param style: ``'%'``, ``'{'`` or ``'$'``
+        :param args: other arguments for ``logging.Formatter``
+            (``validate``, in Python 3.8+)
+        :param kwargs: other keyword arguments for ``logging.Formatter``
+            (``validate``; ``defaults``, in Python 3.10+)
+        """
+        super(CompiledFormatter, self).__init__(
+            fmt, datefmt, style, *args, **kwargs)
+        self._render = None
+        try:
+            source, namespace = _compile(self._style._fmt, style,
+                                         kwargs.get('defaults') or {})
+        except ValueError:
+            return
+        namespace.update(_format_time=self.formatTime,
+                         _datefmt=self.datefmt,
+                         _defaults=kwargs.get('defaults'))
+        exec(source, namespace)
+        self._source = source
+        self._render = namespace['render']
+
+    def format(self, record):
+        """Format ``record`` as ``logging.Formatter.format`` does."""
+        render = self._render
+        if render is None:
+            return super(CompiledFormatter, self).format(record)
+        try:
+            s = render(record)
+        except AttributeError as e:
+            # AttributeError.name is new in Python 3.10; before, the name
+            # ends the message: "'LogRecord' object has no attribute 'x'"
+            name = (getattr(e, 'name', None) or
+                    str(e).rsplit(' ', 1)[-1].strip("'"))
+            raise ValueError('Formatting field not found in record: %r'
+                             % name)                                # | raise
+        if record.exc_info or record.exc_text or record.stack_info:
+            s = self._append_exception(record, s)
+        return s
+
+    def _append_exception(self, record, s):
+        # As in logging.Formatter.format
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            if s[-1:] != "\n":
+                s = s + "\n"
+            s = s + record.exc_text
+        if record.stack_info:
+            if s[-1:] != "\n":
+                s = s + "\n"
+            s = s + self.formatStack(record.stack_info)
+        return s
@@ -0,0 +1,206 @@
+# coding=utf-8
+
+__author__ = "Brian O'Neill"
+
+__doc__ = """ \
+.. _format-parsing-module:
+
+Find out which ``LogRecord`` attributes format strings, and the formatters
+of an ``LCDict``, refer to -- so that records can be trimmed to just those
+before they're sent elsewhere, or so that `logging` needn't collect the
+others at all.
+"""
+
+import re
+import string
+
+from .record_codec import RECORD_FIELDS
+
+__all__ = ['format_attributes', 'record_fields', 'attributes_needed']
+
+_percent_re = re.compile(r'%\((\w+)\)')
+_dollar_re = re.compile(r'\$(?:(\w+)|\{(\w+)\})')
+
+# Attributes that formatters compute from others
+_DERIVED = {
+    'message': ('msg',),
+    'asctime': ('created', 'msecs'),
+    'epoch_ms': ('created',),         # CachedTimeFormatter
+    'epoch_ns': ('created',),
+}
+
+# Attributes that every formatter may use: ``Formatter.format`` appends
+# exception and stack text if there is any.
+_ALWAYS = ('name', 'msg', 'levelno', 'exc_text', 'stack_info')
+
+
+def format_attributes(fmt, style='%'):
+    """Return a list of the names of the record attributes that the format
+    string ``fmt`` refers to, in order of first appearance.
+
+    :param fmt: a format string, as for ``logging.Formatter``
+    :param style: ``'%'``, ``'{'`` or ``'$'``
+
+    >>> format_attributes('%(asctime)s %(name)-20s %(message)s %(name)s')
+    ['asctime', 'name', 'message']
+    >>> format_attributes('{levelname:8} {process!r} {message}', style='{')
+    ['levelname', 'process', 'message']
+    >>> format_attributes('$levelname: ${message}', style='$')
+    ['levelname', 'message']
+    """
+    if style == '%':
+        names = _percent_re.findall(fmt)
+    elif style == '{':
+        names = []
+        for _, field_name, _, _ in string.Formatter().parse(fmt):
+            if field_name:
+                names.append(re.split(r'[.\[]', field_name, 1)[0])
+    elif style == '$':
+        names = [a or b for a, b in _dollar_re.findall(fmt)]
+    else:
+        raise ValueError("style must be one of '%%', '{', '$', not '%s'"
+                         % style)                                   # | raise
+    result = []
+    for name in names:
+        if name not in result:
+            result.append(name)
+    return result
+
+
+def record_fields(lcdict, extra=()):
+    """Return a tuple of the ``LogRecord`` attributes that the formatters
+    used by the handlers of ``lcdict`` need, plus those that `logging`
+    needs to dispatch records (``name``, ``levelno``) -- the ``fields``
+    with which a ``RecordCodec`` can encode records to be handled as
+    ``lcdict`` configures.
+
+    If a formatter is of a class other than ``logging.Formatter`` or one
+    of `prelogging`'s formatters, or is created by some other factory
+    (``'()'`` key), so that what it uses can't be determined, return all
+    of ``RECORD_FIELDS``.
+
+    :param lcdict: an ``LCDict`` or ``LCDictBasic``
+    :param extra: other attributes to include -- for example, those that
+        filters examine.
+
+    >>> from prelogging import LCDict
+    >>> lcd = LCDict()
+    >>> _ = lcd.add_file_handler('h', filename='x.log',
+    ...                          formatter='process_time_logger_level_msg')
+    >>> record_fields(lcd)
+    ('name', 'msg', 'levelno', 'exc_text', 'stack_info', 'processName', 'created', 'msecs', 'levelname')
+    """
+    fields = list(_ALWAYS)
+
+    def add(name):
+        for field in _DERIVED.get(name, (name,)):
+            if field not in fields:
+                fields.append(field)
+
+    formatters = lcdict.formatters
+    for handler_dict in lcdict.handlers.values():
+        formatter_name = handler_dict.get('formatter')
+        if formatter_name is None:
+            continue                    # default format: '%(message)s'
+        formatter_dict = formatters.get(formatter_name, {})
+        if not _analyzable(formatter_dict):
+            return RECORD_FIELDS
+        names = formatter_dict.get('fields')         # JSONFormatter
+        if names is None:
+            names = format_attributes(
+                formatter_dict.get('format') or
+                formatter_dict.get('fmt') or '%(message)s',
+                style=formatter_dict.get('style', '%'))
+        for name in names:
+            add(name)
+    for name in extra:
+        add(name)
+    return tuple(fields)
+
+
+# prelogging's formatter classes, which use just the attributes their
+# format (or, for JSONFormatter, ``fields``) refers to
+_PRELOGGING_FORMATTERS = frozenset([
+    'prelogging.CompiledFormatter',
+    'prelogging.compiled_formatter.CompiledFormatter',
+    'prelogging.CachedTimeFormatter',
+    'prelogging.compiled_formatter.CachedTimeFormatter',
+    'prelogging.JSONFormatter',
+    'prelogging.json_formatter.JSONFormatter',
+])
+
+
+def _analyzable(formatter_dict):
+    """Return true if the formatter that ``formatter_dict`` specifies uses
+    just the attributes its format or ``fields`` refers to: if it's a
+    ``logging.Formatter``, or one of `prelogging`'s formatters, created
+    by a ``'class'`` key or (for `prelogging`'s) a ``'()'`` key."""
+    factory = formatter_dict.get('()')
+    if factory is None:
+        return (formatter_dict.get('class', 'logging.Formatter') in
+                _PRELOGGING_FORMATTERS | set(['logging.Formatter']))
+    if not isinstance(factory, str):
+        factory = '%s.%s' % (getattr(factory, '__module__', ''),
+                             getattr(factory, '__name__', ''))
+    elif factory.startswith('ext://'):
+        factory = factory[len('ext://'):]
+    return factory in _PRELOGGING_FORMATTERS
+
+
+# Handlers that send whole records elsewhere, to be formatted by
+# formatters we can't see -- unless they're given ``fields``.
+_FORWARDING_CLASSES = frozenset([
+    'logging.handlers.QueueHandler',
+    'logging.handlers.SocketHandler',
+    'logging.handlers.DatagramHandler',
+    'logging.handlers.HTTPHandler',
+    'prelogging.BatchingQueueHandler',
+    'prelogging.CompactQueueHandler',
+    'prelogging.BoundedQueueHandler',
+    'prelogging.PriorityQueueHandler',
+    'prelogging.BatchingSocketHandler',
+    'prelogging.ShmRingHandler',
+])
+
+
+# Factories ('()' values) that LCDict uses for prelogging's own handlers
+# which only format records, so need just what their formatters use.
+# (BinaryFileHandler writes records' attributes itself.)
+_FORMATTING_FACTORIES = frozenset([
+    'ext://prelogging.LockingStreamHandler',
+    'ext://prelogging.LockingFileHandler',
+    'ext://prelogging.LockingBufferedFileHandler',
+    'ext://prelogging.LockingRotatingFileHandler',
+    'ext://prelogging.LockingTimedRotatingFileHandler',
+    'ext://prelogging.LockingSysLogHandler',
+])
+
+
+def attributes_needed(lcdict, extra=()):
+    """Return a tuple of the ``LogRecord`` attributes that the handlers of
+    ``lcdict`` need: those that their formatters use (as for
+    ``record_fields``), and the ``fields`` of handlers that send compactly
+    encoded records elsewhere.
+
+    Return all of ``RECORD_FIELDS`` if the needs of some handler can't be
+    determined: one that sends whole records elsewhere (a queue or socket
+    handler without ``fields``), or one created by a factory (``'()'``
+    key), which might use any attribute -- other than the locking
+    handlers that ``LCDict`` creates, which only format records.
+
+    :param lcdict: an ``LCDict`` or ``LCDictBasic``
+    :param extra: other attributes to include -- for example, those that
+        filters examine.
+    """
+    fields = list(record_fields(lcdict, extra))
+    for handler_dict in lcdict.handlers.values():
+        if ('()' in handler_dict and
+                handler_dict['()'] not in _FORMATTING_FACTORIES):
+            return RECORD_FIELDS
+        if 'fields' in handler_dict:
+            for field in handler_dict['fields']:
+                if field not in fields:
+                    fields.append(field)
+        elif handler_dict.get('class') in _FORWARDING_CLASSES:
+            return RECORD_FIELDS
+    return tuple(fields)
@@ -11,7 +11,7 @@ __all__ = ['update_formatter_presets_from_file', 'update_formatter_presets']
 #                  of formatter specifications
 # -----------------------------------------------------------------------
 
-_formatter_spec_fields = ('format', 'dateformat', 'style')
+_formatter_spec_fields = ('format', 'dateformat', 'style', 'class_', 'static')
 
 
 class FormatterSpec( namedtuple('_FormatterSpec_', _formatter_spec_fields) ):
@@ -24,26 +24,36 @@ class FormatterSpec( namedtuple('_FormatterSpec_', _formatter_spec_fields) ):
     def __new__(cls, format,
                 datefmt=None,
                 dateformat=None,
-                style='%'):
+                style='%',
+                class_=None,
+                static=None):
         """
         :param format: a (logging) format string
         :param datefmt: a date-format string; mutually exclusive with dateformat
         :param dateformat: a date-format string; mutually exclusive with datefmt
         :param style: one of "%{$"
+        :param class_: the name of a ``logging.Formatter`` subclass, e.g.
+            ``'prelogging.CompiledFormatter'``; ``None`` means
+            ``logging.Formatter``
+        :param static: for a ``prelogging.JSONFormatter``, the members
+            written first in every object: a dict, or a string containing
+            a JSON object
         """
         dateformat = datefmt or dateformat
-        return super(FormatterSpec, cls).__new__(cls, format, dateformat, style)
+        return super(FormatterSpec, cls).__new__(cls, format, dateformat, style,
+                                                 class_, static)
 
     def to_dict(self):
         """
         Return a dict representation, whose keys are ``_formatter_spec_fields``
         except that 'dateformat' is changed to 'datefmt'),
-        and which omits items with ``None`` values.
+        and 'class_' to 'class', and which omits items with ``None`` values.
 
         :return: a dict
         """
         d = {k: getattr(self, k) for k in _formatter_spec_fields}
         d['datefmt'] = d.pop('dateformat', None)
+        d['class'] = d.pop('class_', None)
         return {k: v for k, v in d.items() if v}
 
 
@@ -158,7 +168,7 @@ def _parse_line(line):   # -> Tuple[LineType, (str or Tuple[str, str] or None)]
 
 
 def _make_formatter_specs(lines):             # -> Dict[str, FormatterSpec]
-    keys = ('format', 'dateformat', 'style')
+    keys = ('format', 'dateformat', 'style', 'class', 'static')
 
     name = ''
     new_formatter_specs = {}
@@ -172,6 +182,8 @@ def _make_formatter_specs(lines):             # -> Dict[str, FormatterSpec]
         if 'format' not in fields:
             raise ValueError("'format' key:value missing in '%s'" % name)    # | raise
         fmt = fields.pop('format')
+        if 'class' in fields:
+            fields['class_'] = fields.pop('class')
         new_formatter_specs[name] = FormatterSpec(fmt, **fields)
 
     # Run state machine
@@ -194,7 +206,8 @@ def _make_formatter_specs(lines):             # -> Dict[str, FormatterSpec]
                     key, value = data
                     if key not in keys:
                         raise ValueError("bad key '%s' -- must be one of "
-                                         "'format', 'dateformat', 'style'" % key)          # | raise
+                                         "'format', 'dateformat', 'style', 'class', "
+                                         "'static'" % key)                  # | raise
                     fields[key] = value
                     # expecting = KEY_VAL
                 elif linetype == BLANK:
@@ -0,0 +1,273 @@
+# coding=utf-8
+
+__author__ = "Brian O'Neill"
+
+__doc__ = """ \
+.. _json-formatter-module:
+
+A formatter that renders records as JSON objects, one per line.
+
+A ``JSONFormatter`` writes the record attributes that its format string
+refers to, in order, as the members of a JSON object, after any static
+members given to it; the format string names the attributes, and its
+padding and conversions are ignored. So the preset::
+
+    json_time_logger_level_msg
+        format: '%(asctime)s %(name)s %(levelname)s %(message)s'
+        class: prelogging.JSONFormatter
+
+produces lines like::
+
+    {"asctime":"2017-01-01 12:00:00,123","name":"app","levelname":"INFO","message":"Hi"}
+
+If the record has exception or stack information, its text is the value of
+``"exc_info"`` or ``"stack_info"``.
+
+The formatter doesn't build a ``dict`` per record and encode it. It
+generates a function that concatenates pre-encoded key fragments with
+the values: strings are escaped by the `json` module's C escaper, integers
+are rendered with ``repr``, and the rendering of runs of low-cardinality
+attributes (logger name, level, ...) is cached, as by
+:ref:`CompiledFormatter`. Other values -- ``None``, floats, and whatever
+filters or ``extra`` add -- are encoded with `orjson` or `ujson` if either
+is installed, and otherwise with a cached ``json.JSONEncoder``; values
+they can't encode are written as strings.
+"""
+
+import json
+from json.encoder import encode_basestring
+import keyword
+import re
+
+from .compiled_formatter import (CachedTimeFormatter, FOLDED_ATTRIBUTES,
+                                 _fold)
+from .format_parsing import format_attributes
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+__all__ = ['JSONFormatter']
+
+
+# Attributes whose values are almost always strings, or integers
+_STR_ATTRIBUTES = frozenset(('message', 'asctime', 'name', 'levelname',
+                             'pathname', 'filename', 'module', 'funcName',
+                             'threadName', 'processName', 'taskName',
+                             'msg'))
+_INT_ATTRIBUTES = frozenset(('levelno', 'lineno', 'thread', 'process',
+                             'epoch_ms', 'epoch_ns'))
+
+ENCODERS = ('json', 'orjson', 'ujson')
+
+
+def _make_encoder(name=None):
+    """Return a function that encodes a value as JSON, compactly, writing
+    values that can't be encoded as strings.
+
+    :param name: one of ``ENCODERS``; if ``None``, the first of
+        ``'orjson'``, ``'ujson'``, ``'json'`` that's installed
+    """
+    if name is None:
+        name = 'orjson' if orjson else 'ujson' if ujson else 'json'
+    if name == 'orjson':
+        if orjson is None:
+            raise ValueError("orjson is not installed")             # | raise
+        dumps = orjson.dumps
+        option = orjson.OPT_NON_STR_KEYS
+
+        def encode(value):
+            return dumps(value, default=str, option=option).decode('utf-8')
+    elif name == 'ujson':
+        if ujson is None:
+            raise ValueError("ujson is not installed")              # | raise
+        dumps = ujson.dumps
+
+        def encode(value):
+            try:
+                return dumps(value, ensure_ascii=False,
+                             escape_forward_slashes=False)
+            except (TypeError, OverflowError):
+                return encode_basestring(str(value))
+    elif name == 'json':
+        # allow_nan=False: NaN and Infinity aren't JSON
+        dumps = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'),
+                                 default=str, allow_nan=False).encode
+
+        def encode(value):
+            try:
+                return dumps(value)
+            except ValueError:
+                return encode_basestring(str(value))
+    else:
+        raise ValueError("encoder must be one of %s, not '%s'"
+                         % (', '.join(ENCODERS), name))             # | raise
+    return encode
+
+
+def _compile(fields, static):
+    """Return the source of a function ``render(record)`` that returns the
+    JSON object, without the closing brace, and the namespace in which to
+    execute it."""
+    namespace = {'_fold': _fold, '_esc': encode_basestring, '_str': str,
+                 '_int': int, '_repr': int.__repr__}
+    lines = ['def render(record):',
+             '    message = record.message = record.getMessage()']
+    if 'asctime' in fields:
+        lines.append('    asctime = record.asctime = '
+                     '_format_time(record, _datefmt)')
+    if 'epoch_ms' in fields:
+        lines.append('    epoch_ms = record.epoch_ms = '
+                     'int(record.created * 1000)')
+    if 'epoch_ns' in fields:
+        lines.append('    epoch_ns = record.epoch_ns = '
+                     'int(record.created * 1000000000)')
+
+    def value(name):
+        if name in ('message', 'asctime', 'epoch_ms', 'epoch_ns'):
+            return name
+        if re.match(r'[A-Za-z_]\w*$', name) and not keyword.iskeyword(name):
+            return 'record.' + name
+        return 'getattr(record, %r)' % name
+
+    def encoded(name, var):
+        if name in _STR_ATTRIBUTES:
+            return ('(_esc(%s) if %s.__class__ is _str else _encode(%s))'
+                    % (var, var, var))
+        if name in _INT_ATTRIBUTES:
+            return ('(_repr(%s) if %s.__class__ is _int else _encode(%s))'
+                    % (var, var, var))
+        return '_encode(%s)' % var
+
+    # Group fields into runs of folded or unfolded attributes
+    runs = []
+    for name in fields:
+        folded = name in FOLDED_ATTRIBUTES
+        if runs and runs[-1][0] == folded:
+            runs[-1][1].append(name)
+        else:
+            runs.append((folded, [name]))
+
+    first = not static
+    pieces = ['_head']
+    namespace['_head'] = '{' + ','.join(
+        json.dumps(key, ensure_ascii=False) + ':' +
+        json.dumps(val, ensure_ascii=False, separators=(',', ':'),
+                   default=str)
+        for key, val in static.items())
+    n = 0
+    for i, (folded, names) in enumerate(runs):
+        exprs = []
+        for name in names:
+            key = ('' if first else ',') + json.dumps(name) + ':'
+            first = False
+            namespace['_k%d' % n] = key
+            var = 'v%d' % n
+            lines.append('    %s = %s' % (var, value(name)))
+            exprs.append('_k%d + %s' % (n, encoded(name, var)))
+            n += 1
+        rendering = ' + '.join(exprs)
+        if folded:
+            namespace['_cache%d' % i] = {}
+            key = ('(%s,)' % ', '.join('v%d' % j for j in
+                                       range(n - len(names), n)))
+            lines += ['    s%d = _cache%d.get(%s)' % (i, i, key),
+                      '    if s%d is None:' % i,
+                      '        s%d = _fold(_cache%d, %s, %s)'
+                      % (i, i, key, rendering)]
+            pieces.append('s%d' % i)
+        else:
+            pieces.append('(%s)' % rendering)
+    lines.append('    return ' + ' + '.join(pieces))
+    return '\n'.join(lines) + '\n', namespace
+
+
+class JSONFormatter(CachedTimeFormatter):
+    """
+    .. _JSONFormatter:
+
+    A formatter that renders each record as a JSON object on one line:
+    the ``static`` members, then the record attributes named by
+    ``fields`` or by the format string, then exception and stack
+    information, if any.
+
+    Use it as the ``class`` of a formatter preset or of ``add_formatter``;
+    to pass ``fields``, ``static`` or ``encoder`` too, pass them to
+    ``add_formatter`` (which then specifies the formatter with a ``'()'``
+    key, as `logging` requires).
+    """
+    def __init__(self, fmt=None, datefmt=None, style='%', *args, **kwargs):
+        """
+        :param fmt: a format string, in any style, naming the attributes
+            to write; ignored if ``fields`` is given. Default:
+            ``'%(message)s'``
+        :param datefmt: the date-format string for ``asctime``, as for
+            ``logging.Formatter``
+        :param style: the style of ``fmt``: ``'%'``, ``'{'`` or ``'$'``
+        :param args: other arguments for ``logging.Formatter``
+        :param kwargs: keyword arguments:
+
+            ``fields``: a sequence of the names of the record attributes
+            to write, in order -- including ``message``, ``asctime``,
+            ``epoch_ms`` and ``epoch_ns``, which the formatter computes,
+            and attributes added by ``extra`` or filters.
+
+            ``static``: a dict of members to write first, or a string
+            containing a JSON object.
+
+            ``encoder``: one of ``'orjson'``, ``'ujson'``, ``'json'``,
+            the encoder of values other than strings and integers.
+            Default: ``'orjson'`` or ``'ujson'`` if installed, else
+            ``'json'``.
+
+            Other keyword arguments are passed to ``logging.Formatter``.
+        """
+        fields = kwargs.pop('fields', None)
+        static = kwargs.pop('static', None) or {}
+        encoder = kwargs.pop('encoder', None)
+        super(JSONFormatter, self).__init__(
+            fmt, datefmt, style, *args, **kwargs)
+        if isinstance(static, str):
+            static = json.loads(static)
+        if fields is None:
+            fields = format_attributes(self._style._fmt, style)
+        self.fields = tuple(fields)
+        self.static = dict(static)
+        source, namespace = _compile(self.fields, self.static)
+        namespace.update(_format_time=self.formatTime,
+                         _datefmt=self.datefmt,
+                         _encode=_make_encoder(encoder))
+        exec(source, namespace)
+        self._source = source
+        self._render = namespace['render']
+        self._separator = '' if not (self.static or self.fields) else ','
+
+    def format(self, record):
+        """Return ``record`` as a JSON object on one line."""
+        try:
+            s = self._render(record)
+        except AttributeError as e:
+            raise ValueError('Formatting field not found in record: %r'
+                             % (getattr(e, 'name', None) or str(e)))  # | raise
+        if record.exc_info or record.exc_text or record.stack_info:
+            s += self._exception_members(record)
+        return s + '}'
+
+    def _exception_members(self, record):
+        members = ''
+        separator = self._separator
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            members += (separator + '"exc_info":' +
+                        encode_basestring(record.exc_text))
+            separator = ','
+        if record.stack_info:
+            members += (separator + '"stack_info":' +
+                        encode_basestring(self.formatStack(record.stack_info)))
+        return members
@@ -1,13 +1,21 @@
 # coding=utf-8
 
 from copy import deepcopy
+import logging
 
 from .lcdictbasic import LCDictBasic
 from .formatter_presets import update_formatter_presets_from_file, _formatter_presets
+from . import shm_ring
+from . import format_parsing, record_trimming
+from .slotted_records import slotted_record_factory
 import socket
-from logging.handlers import SysLogHandler, SYSLOG_UDP_PORT
+from logging.handlers import (SysLogHandler, SYSLOG_UDP_PORT,
+                              DEFAULT_TCP_LOGGING_PORT)
 import os
+import tempfile
 from .six import PY2
+if not PY2:
+    from . import queue_handlers, socket_handlers
 
 
 __author__ = "Brian O'Neill"
@@ -43,7 +51,7 @@ class LCDict(LCDictBasic):
 
             log_path                (str)
             attach_handlers_to_root (bool)
-            locking                 (bool)
+            locking                 (bool or str)
 
     ``log_path`` is a directory in which log files will be created by
     ``add_file_handler`` and ``add_rotating_file_handler``. If the filename
@@ -62,9 +70,26 @@ class LCDict(LCDictBasic):
     methods of this class that can do so add :ref:`locking handlers <locking-handlers>`;
     if it's false, handlers instantiate the "usual" classes defined by `logging`.
     (See the :ref:`class inheritance diagram <prelogging-all-classes>`.)
+    ``locking`` can also be the string ``'atomic'``: stream and file handlers
+    then write each record of at most ``PIPE_BUF`` bytes with a single
+    unlocked ``os.write``, taking the lock only for longer records (see
+    ``AtomicWrite_Mixin``); other handlers treat ``'atomic'`` like ``True``.
+    If ``locking`` is ``'flock'``, locking handlers lock with a
+    :ref:`FileLock <FileLock>` rather than a ``multiprocessing.Lock``, so
+    that they exclude *all* processes writing to the same destination --
+    including processes started with the ``spawn`` or ``forkserver`` methods,
+    and unrelated programs. The lock file of a file handler is the logfile's
+    name with ``.lock`` appended; other handlers use
+    ``prelogging-<handler_name>.lock`` in the system's temporary directory,
+    unless a ``lock_file`` keyword argument is passed to ``add_*_handler``.
     Each instance saves the value passed to its constructor, and exposes it as
     the read-only property ``locking``.
 
+    Pass ``lock_stats=True`` to the ``add_*_handler`` method of a locking
+    handler to have it keep :ref:`LockStats <LockStats>` -- counts, and wait-
+    and hold-time histograms, of its lock acquisitions -- which you can read
+    with ``handler_lock_stats(handler_name)`` after calling ``config()``.
+
     All of the methods that add a handler take parameters ``attach_to_root``
     and ``locking``, each a ``bool`` or ``None``; these allow overriding of
     the values passed to the constructor. Thus, for example, callers can
@@ -73,6 +98,13 @@ class LCDict(LCDictBasic):
     value of these parameters in handler-adding methods is ``None``, meaning:
     use the corresponding value passed to the constructor.
     """
+    # Values other than bools accepted for ``locking`` parameters.
+    #   'atomic': write each short record to files & streams with a single
+    #             unlocked write, falling back to the lock for long ones.
+    #   'flock':  lock with a FileLock (fcntl.flock on a lock file),
+    #             which excludes unrelated & spawned processes too.
+    _locking_modes = ('atomic', 'flock')
+
     def __init__(self,                  # *,
                  root_level='WARNING',       # == logging default level
                  log_path='',
@@ -113,6 +145,7 @@ class LCDict(LCDictBasic):
         self.log_path = log_path
         self._locking = locking
         self._attach_handlers_to_root = attach_handlers_to_root
+        self._offloaded = {}            # handler name => offload value
 
     @property
     def attach_handlers_to_root(self):
@@ -147,10 +180,47 @@ class LCDict(LCDictBasic):
 
     def _locking__adjust(self, locking):
         """
-        :param locking: Any; but really, ``bool`` or None.
-        :return: self.locking if attach is None else bool(locking)
+        :param locking: Any; but really, ``bool``, one of
+            ``self._locking_modes``, or None.
+        :return: self.locking if locking is None; locking itself if it's
+            one of ``self._locking_modes``; else bool(locking).
+            Raise ``ValueError`` if locking is some other ``str``.
         """
-        return self._locking if locking is None else bool(locking)
+        if locking is None:
+            return self._locking
+        if isinstance(locking, str):
+            if locking not in self._locking_modes:
+                raise ValueError(
+                    "locking must be a bool or one of %s, not '%s'"
+                    % (', '.join("'%s'" % mode for mode in self._locking_modes),
+                       locking))                                    # | raise
+            return locking
+        return bool(locking)
+
+    @staticmethod
+    def _set_locking_kwargs(locking, kwargs, lock_file, atomic=False):
+        """Set the keyword arguments of a locking handler that make it
+        lock as ``locking`` says.
+
+        :param locking: ``True``, or one of ``_locking_modes``.
+        :param kwargs: keyword arguments for ``add_handler``; updated.
+        :param lock_file: the default lock file, for ``'flock'`` locking.
+            A ``lock_file`` already in ``kwargs`` takes precedence.
+        :param atomic: whether the handler class supports ``'atomic'``
+            writes; if not, ``'atomic'`` means ``True``.
+        """
+        kwargs['create_lock'] = True
+        if locking == 'atomic' and atomic:
+            kwargs['atomic'] = True
+        elif locking == 'flock':
+            kwargs.setdefault('lock_file', lock_file)
+
+    @staticmethod
+    def _default_lock_file(handler_name):
+        """The lock file for ``'flock'`` locking by a handler that doesn't
+        write to a file."""
+        return os.path.join(tempfile.gettempdir(),
+                            'prelogging-%s.lock' % handler_name)
 
     def clone_handler(self,     # *,
                       clone,
@@ -204,21 +274,32 @@ class LCDict(LCDictBasic):
     def add_handler(self, handler_name,     # *,
                     formatter=None,
                     attach_to_root=None,
+                    offload=False,
                     ** handler_dict):
         """
-        (Virtual) Adds the ``attach_to_root`` parameter to
+        (Virtual) Adds the ``attach_to_root`` and ``offload`` parameters to
         ``LCDictBasic.add_handler()``.
 
         :param formatter: name of formatter (-spec), or name of formatter preset
         :param attach_to_root: If true, add the handler to the root logger;
             if ``None``, do what ``self.attach_handlers_to_root`` says;
             if false, don't add to root.
+        :param offload: (*Python 3 only*) If true, ``config()`` puts the
+            handler behind an :ref:`OffloadHandler <OffloadHandler>`, which
+            passes records to it on a thread of its own, so that threads
+            which log don't wait for its I/O. ``logging.shutdown()`` waits
+            for that thread to handle the records queued for it.
+            If ``offload`` is a string, all the handlers offloaded with that
+            string share one thread, which handles their records in turn.
+            Every ``add_*_handler`` method accepts this parameter.
 
         :param handler_dict: Other keyword args as for LCDictBasic.add_handler,
             e.g. ``level``, ``filters``
 
         :return: ``self``
         """
+        if offload and PY2:
+            raise NotImplementedError("offload requires Python 3")
         # Don't add all the predefined formatters to every LCDict.
         # Every LCDict handler-adding method ultimately funnels
         # through here, so we check whether ``formatter`` is
@@ -230,6 +311,8 @@ class LCDict(LCDictBasic):
         super(LCDict, self).add_handler(handler_name,
                                         formatter=formatter,
                                         ** handler_dict)
+        if offload:
+            self._offloaded[handler_name] = offload
         if self._attach_to_root__adjust(attach_to_root):
             super(LCDict, self).attach_root_handlers(handler_name)
         return self
@@ -244,6 +327,10 @@ class LCDict(LCDictBasic):
             or ``'ext://sys.stderr'``
         :param locking: If true, this handler will be a
             :ref:`LockingStreamHandler <LockingStreamHandler>`;
+            if ``'atomic'``, a ``LockingStreamHandler`` that writes short
+            records without taking the lock;
+            if ``'flock'``, a ``LockingStreamHandler`` that locks with a
+            ``FileLock``;
             if ``None``, do what ``self.locking`` says;
             if false, the handler will be a ``logging.StreamHandler``.
         :param kwargs: Other keyword args as for LCDict.add_handler,
@@ -256,7 +343,9 @@ class LCDict(LCDictBasic):
         locking = self._locking__adjust(locking)
         if locking:
             kwargs['()'] = 'ext://prelogging.LockingStreamHandler'
-            kwargs['create_lock'] = True
+            self._set_locking_kwargs(locking, kwargs,
+                                     self._default_lock_file(handler_name),
+                                     atomic=True)
         else:
             kwargs['class_'] = 'logging.StreamHandler'
 
@@ -300,11 +389,44 @@ class LCDict(LCDictBasic):
                          encoding=None,
                          delay=False,       # `logging` default
                          locking=None,
+                         buffer_size=0,
+                         flush_interval=None,
+                         flush_level=None,
+                         binary=False,
                          **kwargs):
         """
         (Virtual) Adds keyword parameters ``locking`` and ``attach_to_root``
         to the parameters of ``LCDictBasic.add_file_handler()``.
 
+        :param locking: If true, this handler will be a
+            :ref:`LockingFileHandler <LockingFileHandler>`;
+            if ``'atomic'``, a ``LockingFileHandler`` that appends short
+            records without taking the lock;
+            if ``'flock'``, a ``LockingFileHandler`` that locks with a
+            ``FileLock`` on the logfile's name + ``'.lock'``;
+            if ``None``, do what ``self.locking`` says;
+            if false, the handler will be a ``logging.FileHandler``.
+
+        :param buffer_size: If positive, the handler will be a
+            :ref:`LockingBufferedFileHandler <LockingBufferedFileHandler>`,
+            which accumulates up to this many records in each process and
+            writes them to the file as a group, under a single acquisition
+            of the lock (if ``locking`` is true). If 0 (the default),
+            each record is written as it's logged.
+        :param flush_interval: (Only if ``buffer_size`` is positive)
+            seconds; write the buffer when a record is logged at least this
+            long after the previous write. [handler default: 1.0]
+        :param flush_level: (Only if ``buffer_size`` is positive)
+            name of a level; records at or above this level are written
+            immediately, together with any buffered records.
+            [handler default: ``'ERROR'``]
+        :param binary: If true, the handler will be a
+            :ref:`BinaryFileHandler <BinaryFileHandler>`, which writes
+            records unformatted, in a compact binary format, with
+            any of the locking modes above; ``buffer_size``,
+            ``flush_interval`` and ``flush_level`` apply as to a
+            ``LockingBufferedFileHandler``. Render the file as text with
+            ``python -m prelogging.binary_log``.
         :param kwargs: Keyword args for
             LCDict.add_handler, LCDictBasic.add_handler,
             e.g. ``attach_to_root``, ``level``, ``filters``
@@ -319,18 +441,37 @@ class LCDict(LCDictBasic):
         #     formatter = ('process_time_logger_level_msg'
         #                  if locking else
         #                  'time_logger_level_msg')
+        filename = os.path.join(self.log_path, filename)
+        if binary:
+            kwargs['()'] = 'ext://prelogging.BinaryFileHandler'
+            if buffer_size:
+                kwargs['buffer_size'] = buffer_size
+                kwargs['flush_interval'] = flush_interval
+                kwargs['flush_level'] = flush_level
+            if locking:
+                self._set_locking_kwargs(locking, kwargs, filename + '.lock',
+                                         atomic=True)
+        elif buffer_size:
+            kwargs['()'] = 'ext://prelogging.LockingBufferedFileHandler'
+            kwargs['buffer_size'] = buffer_size
+            kwargs['flush_interval'] = flush_interval
+            kwargs['flush_level'] = flush_level
+            if locking:
+                self._set_locking_kwargs(locking, kwargs, filename + '.lock')
+        elif locking:
+            kwargs['()'] = 'ext://prelogging.LockingFileHandler'
+            self._set_locking_kwargs(locking, kwargs, filename + '.lock',
+                                     atomic=True)
+        else:
+            kwargs['class_'] = 'logging.FileHandler'
+
         self.add_handler(handler_name,
-                         class_='logging.FileHandler',
-                         filename=os.path.join(self.log_path, filename),
+                         filename=filename,
                          mode=mode,
                          encoding=encoding,
                          delay=delay,
                          formatter=formatter,
                          **kwargs)
-        if locking:
-            del self.handlers[handler_name]['class']
-            self.handlers[handler_name]['()'] = 'ext://prelogging.LockingFileHandler'
-            self.handlers[handler_name]['create_lock'] = True
         return self
 
     def add_rotating_file_handler(self, handler_name,   # *,
@@ -342,6 +483,8 @@ class LCDict(LCDictBasic):
                          encoding=None,
                          delay=False,       # `logging` default
                          locking=None,
+                         keep_open=False,
+                         compress=None,
                          **kwargs):
         """
         :param handler_name: just that
@@ -367,6 +510,15 @@ class LCDict(LCDictBasic):
             actually written to
         :param locking: Mandatory if multiprocessing -- things won't even work,
             logfile can't be found: FileNotFoundError: [Errno 2]...
+        :param keep_open: (Only if ``locking`` is true) If true, the locking
+            handler keeps the logfile open between records, and reopens it
+            only when another process has rotated it, instead of closing it
+            after every record (the default).
+        :param compress: ``'gzip'``, ``'bz2'`` or ``'xz'`` to compress
+            backups, named ``lf.log.1.gz`` etc., on a background thread,
+            so that rollover doesn't wait for compression. Uses a
+            :ref:`LockingRotatingFileHandler <LockingRotatingFileHandler>`
+            even if ``locking`` is false (but then without a lock).
         :param kwargs: Keyword args for
             LCDict.add_handler, LCDictBasic.add_handler,
             e.g. ``level``, ``attach_to_root``, ``filters``
@@ -378,9 +530,23 @@ class LCDict(LCDictBasic):
             formatter = ('process_time_logger_level_msg'
                          if locking else
                          'time_logger_level_msg')
+        filename = os.path.join(self.log_path, filename)
+        if locking:
+            kwargs['()'] = 'ext://prelogging.LockingRotatingFileHandler'
+            self._set_locking_kwargs(locking, kwargs, filename + '.lock')
+            if keep_open:
+                kwargs['keep_open'] = True
+            if compress:
+                kwargs['compress'] = compress
+        elif compress:
+            kwargs['()'] = 'ext://prelogging.LockingRotatingFileHandler'
+            kwargs['keep_open'] = True
+            kwargs['compress'] = compress
+        else:
+            kwargs['class_'] = 'logging.handlers.RotatingFileHandler'
+
         self.add_handler(handler_name,
-                         class_='logging.handlers.RotatingFileHandler',
-                         filename=os.path.join(self.log_path, filename),
+                         filename=filename,
                          mode=mode,
                          encoding=encoding,
                          delay=delay,
@@ -388,13 +554,119 @@ class LCDict(LCDictBasic):
                          maxBytes=max_bytes,
                          backupCount=backup_count,
                          **kwargs)
+        return self
+
+    def add_timed_rotating_file_handler(self, handler_name,   # *,
+                         filename,
+                         when='h',          # logging default
+                         interval=1,        # logging default
+                         backup_count=0,    # logging default
+                         utc=False,
+                         at_time=None,
+                         formatter=None,
+                         encoding=None,
+                         delay=False,       # `logging` default
+                         locking=None,
+                         **kwargs):
+        """
+        :param handler_name: just that
+        :param filename: just that
+        :param when: the unit of ``interval``: ``'S'``, ``'M'``, ``'H'``,
+            ``'D'``, ``'midnight'``, or ``'W0'`` - ``'W6'`` (weekday,
+            0 = Monday), as for ``logging.handlers.TimedRotatingFileHandler``.
+        :param interval: rollover interval, in units of ``when``.
+            Given logfile name ``lf.log``, at each rollover ``lf.log`` is
+            renamed to ``lf.log.``\\ `suffix`, where `suffix` is the date and
+            time of the start of the interval, and a new ``lf.log`` is created.
+        :param backup_count: max number of backup files to keep. The `logging`
+            package calls this parameter ``backupCount``, where it also
+            defaults to 0 (keep all backups).
+        :param utc: if true, use UTC times rather than local times.
+        :param at_time: a ``datetime.time``: for ``when='midnight'`` or
+            weekly rollover, the time of day at which to roll over. The
+            `logging` package calls this parameter ``atTime``.
+        :param formatter: the name of the formatter that this handler will use
+        :param encoding: if encoding is not None, the file is opened with that
+            encoding
+        :param delay: if True, the log file won't be created until it's
+            actually written to
+        :param locking: If true, use a
+            :ref:`LockingTimedRotatingFileHandler <LockingTimedRotatingFileHandler>`,
+            which ensures that exactly one process performs each rollover.
+            Mandatory if multiprocessing.
+        :param kwargs: Keyword args for
+            LCDict.add_handler, LCDictBasic.add_handler,
+            e.g. ``level``, ``attach_to_root``, ``filters``
+        :return: ``self``
+        """
+        locking = self._locking__adjust(locking)
+
+        if not formatter:
+            formatter = ('process_time_logger_level_msg'
+                         if locking else
+                         'time_logger_level_msg')
+        filename = os.path.join(self.log_path, filename)
         if locking:
-            del self.handlers[handler_name]['class']
-            self.handlers[handler_name]['()'] = \
-                'ext://prelogging.LockingRotatingFileHandler'
-            self.handlers[handler_name]['create_lock'] = True
+            kwargs['()'] = 'ext://prelogging.LockingTimedRotatingFileHandler'
+            self._set_locking_kwargs(locking, kwargs, filename + '.lock')
+        else:
+            kwargs['class_'] = 'logging.handlers.TimedRotatingFileHandler'
+
+        self.add_handler(handler_name,
+                         filename=filename,
+                         when=when,
+                         interval=interval,
+                         backupCount=backup_count,
+                         utc=utc,
+                         atTime=at_time,
+                         encoding=encoding,
+                         delay=delay,
+                         formatter=formatter,
+                         **kwargs)
         return self
 
+    def add_sharded_file_handler(self, handler_name,   # *,
+                                 filename,
+                                 shard_by='pid',
+                                 formatter=None,
+                                 mode='a',
+                                 encoding=None,
+                                 **kwargs):
+        """Add a :ref:`ShardedFileHandler <ShardedFileHandler>`, which writes
+        the records of each process to a separate file, without locking.
+        Use ``merge_shards``, or ``python -m prelogging.shards``, to merge
+        the shards into a single logfile ordered by time.
+
+        :param handler_name: just that
+        :param filename: the logfile name from which the shard names are
+            derived, by inserting each process's pid (or name) before the
+            extension: e.g. ``app.log`` becomes ``app.1234.log``.
+            As with ``add_file_handler``, it's relative to ``log_path``.
+        :param shard_by: ``'pid'`` (the default) or ``'process_name'``
+        :param formatter: the name of the formatter that this handler will
+            use. By default, ``'process_time_logger_level_msg'``:
+            ``merge_shards`` requires a timestamp in every record, by
+            default one rendered by ``asctime``.
+        :param mode: the mode in which shards are opened
+        :param encoding: if encoding is not None, shards are opened with that
+            encoding
+        :param kwargs: Keyword args for
+            LCDict.add_handler, LCDictBasic.add_handler,
+            e.g. ``level``, ``attach_to_root``, ``filters``
+        :return: ``self``
+        """
+        if not formatter:
+            formatter = 'process_time_logger_level_msg'
+        return self.add_handler(
+            handler_name,
+            class_='prelogging.ShardedFileHandler',
+            filename=os.path.join(self.log_path, filename),
+            shard_by=shard_by,
+            mode=mode,
+            encoding=encoding,
+            formatter=formatter,
+            **kwargs)
+
     def add_null_handler(self, handler_name,  # *
                          **kwargs):
         """Add a ``logging.NullHandler``.
@@ -419,6 +691,7 @@ class LCDict(LCDictBasic):
                          facility=SysLogHandler.LOG_USER,
                          socktype=socket.SOCK_DGRAM,
                          locking=None,
+                         batching=False,
                          **kwargs):
         """
         :param handler_name: just that
@@ -437,26 +710,81 @@ class LCDict(LCDictBasic):
         :param locking: if false, use ``logging.handlers.SysLogHandler``;
             if ``None``, do what ``self.locking`` says;
             if true, use the multiprocessing-safe version of that handler.
+            Ignored if ``batching`` is true.
+        :param batching: if true, use a
+            :ref:`BatchingSysLogHandler <BatchingSysLogHandler>`, which
+            sends RFC 5424 messages with RFC 6587 octet-counting framing,
+            in batches, over a persistent TCP connection (or a Unix stream
+            socket, if ``address`` is a ``str``) that it reopens with
+            backoff when it fails. Each process has its own connection, so
+            no lock is needed. ``socktype`` is ignored. Pass that class's
+            other parameters in ``kwargs`` -- e.g. ``app_name``,
+            ``batch_size``, ``flush_interval``, ``flush_level``,
+            ``retry_delay``.
         :param kwargs: Keyword args for
             LCDict.add_handler, LCDictBasic.add_handler,
             e.g. ``formatter``, ``attach_to_root``, ``level``, ``filters``
         :return: ``self``
         """
+        if batching:
+            return self.add_handler(
+                handler_name,
+                class_='prelogging.BatchingSysLogHandler',
+                address=address,
+                facility=facility,
+                **kwargs)
+
         locking = self._locking__adjust(locking)
 
+        if locking:
+            kwargs['()'] = 'ext://prelogging.LockingSysLogHandler'
+            self._set_locking_kwargs(locking, kwargs,
+                                     self._default_lock_file(handler_name))
+        else:
+            kwargs['class_'] = 'logging.handlers.SysLogHandler'
+
         self.add_handler(handler_name,
-                         class_='logging.handlers.SysLogHandler',
                          address=address,
                          facility=facility,
                          socktype=socktype,
                          **kwargs)
-        if locking:
-            del self.handlers[handler_name]['class']
-            self.handlers[handler_name]['()'] = \
-                'ext://prelogging.LockingSysLogHandler'
-            self.handlers[handler_name]['create_lock'] = True
         return self
 
+    def add_socket_handler(self, handler_name,   # *,
+                           address=('localhost', DEFAULT_TCP_LOGGING_PORT),
+                           fields=None,
+                           **kwargs):
+        """(*Python 3 only*) Add a
+        :ref:`BatchingSocketHandler <BatchingSocketHandler>`,
+        which sends records in batches over a persistent TCP connection
+        (or a Unix stream socket, if ``address`` is a ``str``) to a
+        :ref:`LogServer <LogServer>`. Each process has its own connection,
+        which it reopens with backoff when it fails, so no lock is needed.
+
+        :param handler_name: just that
+        :param address: the server's ``(host, port)``, or the path of its
+            Unix domain socket
+        :param fields: if not ``None``, send each record as a tuple of the
+            values of these attributes, rather than as a pickled dict.
+            ``LogServer.fields`` gives those that the server's formatters
+            use.
+        :param kwargs: Keyword args for
+            LCDict.add_handler, LCDictBasic.add_handler,
+            e.g. ``formatter``, ``attach_to_root``, ``level``, ``filters``;
+            and for ``BatchingSocketHandler``, e.g. ``batch_size``,
+            ``flush_interval``, ``flush_level``, ``retry_delay``.
+        :return: ``self``
+        """
+        if PY2:
+            raise NotImplementedError("socketserver"
+                                      " doesn't exist in Python 2")
+        return self.add_handler(
+            handler_name,
+            class_='prelogging.BatchingSocketHandler',
+            address=address,
+            fields=fields,
+            **kwargs)
+
     def add_email_handler(self,
                           handler_name,  # *
                           # filters=None,
@@ -527,6 +855,15 @@ class LCDict(LCDictBasic):
                           handler_name,
                           # QueueHandler-specific:
                           queue=None,
+                          batch_size=0,
+                          flush_interval=None,
+                          flush_level=None,
+                          fields=None,
+                          policy=None,
+                          timeout=None,
+                          drop_level=None,
+                          express_queue=None,
+                          express_level=None,
                           **kwargs):
         """(*Python 3 only*)
 
@@ -534,6 +871,43 @@ class LCDict(LCDictBasic):
         :param level: the loglevel of this handler (best left at its default)
         :param queue: an actual queue object (``multiproccessing.Queue``).
             Thus, **don't** use ``clone_handler`` on a queue handler!
+        :param batch_size: if positive, use a
+            :ref:`BatchingQueueHandler <BatchingQueueHandler>`, which puts
+            records on the queue in lists of up to this many. The listener
+            must accept batches: use a ``LogListener`` or a
+            ``BatchingQueueListener``.
+        :param flush_interval: (Only if ``batch_size`` is positive) seconds;
+            put a partial batch on the queue when a record is logged at least
+            this long after the previous put. [``BatchingQueueHandler``
+            default: 1.0]
+        :param flush_level: (Only if ``batch_size`` is positive) records at
+            or above this level are put on the queue at once, with any
+            buffered before them. [``BatchingQueueHandler`` default:
+            ``'ERROR'``]
+        :param fields: if not ``None``, a sequence of record attribute names:
+            send each record as a compact tuple of just these, using a
+            :ref:`CompactQueueHandler <CompactQueueHandler>` (or a
+            ``BatchingQueueHandler`` that does the same). The listener must
+            decode them with the same ``fields``. ``LogListener.fields``
+            gives those that its ``LCDict``'s formatters use.
+        :param policy: for a bounded queue, what to do when it's full:
+            ``'block'``, ``'drop_newest'``, ``'drop_oldest'`` or
+            ``'drop_below'``. If given, use a
+            :ref:`BoundedQueueHandler <BoundedQueueHandler>`, which counts
+            dropped records and the queue's high-water mark.
+            Not available with ``batch_size``.
+        :param timeout: (Only with ``policy``) the most seconds to block
+            waiting for room in the queue before dropping a record.
+        :param drop_level: (Only with ``policy='drop_below'``) records below
+            this level are dropped when the queue is full; others block.
+        :param express_queue: if given, use a
+            :ref:`PriorityQueueHandler <PriorityQueueHandler>`, which puts
+            records at or above ``express_level`` on this queue instead,
+            for a listener that empties it first (see
+            ``LogListener(express_level=...)``).
+            Not available with ``batch_size`` or ``policy``.
+        :param express_level: (Only with ``express_queue``) a level name or
+            number; by default, ``'ERROR'``.
 
         :param kwargs: Keyword args for
             LCDict.add_handler, LCDictBasic.add_handler,
@@ -543,12 +917,206 @@ class LCDict(LCDictBasic):
         if PY2:
             raise NotImplementedError("logging.handlers.QueueHandler"
                                       " doesn't exist in Python 2")
+        if express_queue is not None:
+            if batch_size > 0 or policy:
+                raise ValueError(
+                    "express_queue can't be combined with batch_size"
+                    " or policy")                                   # | raise
+            kwargs['class_'] = 'prelogging.PriorityQueueHandler'
+            kwargs['express_queue'] = express_queue
+            kwargs['express_level'] = express_level
+            kwargs['fields'] = fields
+        elif policy:
+            if batch_size > 0:
+                raise ValueError(
+                    "policy can't be combined with batch_size")     # | raise
+            kwargs['class_'] = 'prelogging.BoundedQueueHandler'
+            kwargs['policy'] = policy
+            kwargs['timeout'] = timeout
+            kwargs['drop_level'] = drop_level
+            kwargs['fields'] = fields
+        elif batch_size > 0:
+            kwargs['class_'] = 'prelogging.BatchingQueueHandler'
+            kwargs['batch_size'] = batch_size
+            kwargs['flush_interval'] = flush_interval
+            kwargs['flush_level'] = flush_level
+            kwargs['fields'] = fields
+        elif fields is not None:
+            kwargs['class_'] = 'prelogging.CompactQueueHandler'
+            kwargs['fields'] = fields
+        else:
+            kwargs['class_'] = 'logging.handlers.QueueHandler'
         return self.add_handler(
             handler_name,
-            class_='logging.handlers.QueueHandler',
             queue=queue,
             **kwargs)
 
+    def add_shm_ring_handler(self,
+                             handler_name,
+                             ring=None,
+                             **kwargs):
+        """(*Python 3.8+*) Add a :ref:`ShmRingHandler <ShmRingHandler>`,
+        which puts compactly encoded records into a shared-memory
+        :ref:`ShmRing <ShmRing>`. A ``ShmRingListener`` in the consuming
+        process takes them out and passes them to its handlers.
+
+        :param handler_name: the name of this handler
+        :param ring: an actual ``ShmRing`` object.
+            Thus, **don't** use ``clone_handler`` on a ring handler!
+        :param kwargs: Keyword args for
+            LCDict.add_handler, LCDictBasic.add_handler,
+            e.g. ``attach_to_root``, ``level``, ``filters``
+        :return: ``self``
+        """
+        if shm_ring.shared_memory is None:
+            raise NotImplementedError("multiprocessing.shared_memory"
+                                      " requires Python 3.8+")
+        return self.add_handler(
+            handler_name,
+            class_='prelogging.ShmRingHandler',
+            ring=ring,
+            **kwargs)
+
+    def start_listener(self, process=True, queue=None, queue_size=0,
+                       express_level=None, shards=0):
+        """(*Python 3 only*) Start a :ref:`LogListener <LogListener>` that
+        configures logging from this ``LCDict`` and handles the records that
+        other processes put on its queue. Don't call ``config()`` yourself.
+
+        Worker processes configure logging with the ``LCDict`` returned by
+        the listener's ``worker_lcdict()`` method, whose queue handler sends
+        records to ``listener.queue``. When the workers are done, call
+        ``listener.stop()``, which waits until every record has been handled.
+
+        :param process: if true, the listener runs in a dedicated process,
+            so that all the I/O of this ``LCDict``'s handlers happens there;
+            otherwise, on a thread of this process.
+        :param queue: the queue to use; by default,
+            a new ``multiprocessing.Queue``.
+        :param queue_size: if positive (and ``queue`` isn't given), bound
+            the new queue to this many items. Workers block when it's
+            full, unless ``worker_lcdict`` is given another ``policy``.
+        :param express_level: if not ``None``, records at or above this
+            level travel on an express queue that the listener always
+            empties first; ``listener.lane_stats`` has the latencies of
+            each lane.
+        :param shards: if positive, the listener's handlers are spread
+            across this many threads, each with its own queue, so that
+            a slow handler holds up only those in its shard.
+        :return: the started ``LogListener``
+        """
+        if PY2:
+            raise NotImplementedError("logging.handlers.QueueHandler"
+                                      " doesn't exist in Python 2")
+        return queue_handlers.LogListener(self,
+                                          queue=queue,
+                                          process=process,
+                                          queue_size=queue_size,
+                                          express_level=express_level,
+                                          shards=shards).start()
+
+    def start_log_server(self,
+                         address=('localhost', DEFAULT_TCP_LOGGING_PORT)):
+        """(*Python 3 only*) Start a :ref:`LogServer <LogServer>`, on a
+        thread of this process, that configures logging from this ``LCDict``
+        and handles the records that clients send it with
+        ``BatchingSocketHandler``\\s. Don't call ``config()`` yourself.
+
+        Clients -- other processes, possibly on other hosts -- can configure
+        logging with the ``LCDict`` returned by the server's
+        ``client_lcdict()`` method. Call ``server.stop()`` to stop.
+
+        :param address: a ``(host, port)`` to listen on (port ``0`` picks a
+            free one; ``server.address`` is then the actual address), or
+            the path of a Unix domain socket.
+        :return: the started ``LogServer``
+        """
+        if PY2:
+            raise NotImplementedError("socketserver"
+                                      " doesn't exist in Python 2")
+        return socket_handlers.LogServer(self, address=address).start()
+
+    def config(self,    # *,
+               disable_existing_loggers=None,
+               trim_records=False,
+               slotted_records=False):
+        """Call ``LCDictBasic.config()``; then put each handler added with
+        ``offload=True`` behind an ``OffloadHandler``, which replaces it
+        on the loggers it's attached to.
+
+        :param disable_existing_loggers: as for ``LCDictBasic.config()``
+        :param trim_records: if true, stop `logging` from collecting the
+            ``LogRecord`` attributes that no handler needs, as determined
+            from the format strings of the formatters (including presets)
+            that handlers use -- the caller's file, line and function,
+            which takes a walk up the stack; the thread; the process; the
+            ``multiprocessing`` process name. (See
+            :ref:`attributes_needed <format-parsing-module>` and
+            :ref:`record_trimming <record-trimming-module>`.) If it's a
+            level name or number, trim only records below that level.
+            The `logging` switches involved are global: this undoes the
+            trimming of any earlier ``config(trim_records=...)``. Filters
+            that examine those attributes won't see them.
+        :param slotted_records: if true, install a record factory that
+            creates :ref:`SlottedLogRecord`\\s, which collect the thread
+            and process attributes only if handlers need them (see
+            ``attributes_needed``), and compute the other derived ones only
+            when they're read. If it's a sequence of attribute names --
+            for example, those that filters examine -- they're collected
+            too. This undoes the trimming of any earlier
+            ``config(trim_records=...)``; the `logging` record factory is
+            global, so restore the default with
+            ``logging.setLogRecordFactory(logging.LogRecord)``.
+        """
+        super(LCDict, self).config(
+            disable_existing_loggers=disable_existing_loggers)
+        if self._offloaded:
+            self._offload_handlers(self._offloaded)
+        if slotted_records:
+            extra = () if slotted_records is True else slotted_records
+            record_trimming.restore_record_collection()
+            logging.setLogRecordFactory(
+                slotted_record_factory(
+                    format_parsing.attributes_needed(self, extra)))
+        if trim_records:
+            record_trimming.trim_record_collection(
+                record_trimming.unused_switches(
+                    format_parsing.attributes_needed(self)),
+                below_level=None if trim_records is True else trim_records)
+
+    def _offload_handlers(self, offloaded):
+        """After ``config()``, put configured handlers behind
+        ``OffloadHandler``\\s, which replace them on the root and on the
+        loggers of this ``LCDict``.
+
+        :param offloaded: a dict mapping handler names to ``offload``
+            values: a string names a thread shared by all the handlers
+            with that value; anything else gets a thread of its own.
+        :return: a list of the ``OffloadHandler``\\s
+        """
+        loggers = ([logging.getLogger()] +
+                   [logging.getLogger(name) for name in self.loggers])
+        threads = {}
+        offloaders = []
+        for handler_name, offload in offloaded.items():
+            target = logging._handlers.get(handler_name)
+            users = [logger for logger in loggers
+                     if target is not None and target in logger.handlers]
+            if not users:
+                continue
+            thread = None
+            if isinstance(offload, str):
+                thread = threads.get(offload)
+                if thread is None:
+                    thread = threads[offload] = queue_handlers.OffloadThread(
+                        name='OffloadThread(%s)' % offload)
+            offloader = queue_handlers.OffloadHandler(target, thread=thread)
+            for logger in users:
+                logger.handlers = [offloader if h is target else h
+                                   for h in logger.handlers]
+            offloaders.append(offloader)
+        return offloaders
+
     # add_*_filter methods
 
     def add_class_filter(self, filter_name, filter_class, **filter_init_kwargs):
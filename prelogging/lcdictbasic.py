@@ -260,6 +260,7 @@ class LCDictBasic(dict):
                       format=None,
                       dateformat=None,
                       style='%',
+                      class_=None,
                       ** format_dict):
         """\
         .. _LCDB_add_formatter-docstring:
@@ -298,6 +299,17 @@ class LCDictBasic(dict):
             |    ``'{'``     new-style formatting, using ``str.format``
             |    ``'$'``     template-based formatting
 
+        :param class_: (*Python 3 only*) the name of a subclass of
+            ``logging.Formatter`` to create instead, with the same
+            arguments -- for example, ``'prelogging.CompiledFormatter'``.
+            Added as the ``class`` key only if given. (A formatter created
+            by a factory is specified with the ``'()'`` key instead.)
+            `logging` passes a formatter ``class`` only the format, date
+            format, style and ``validate``; if ``format_dict`` contains
+            other keys -- e.g. ``static`` for a
+            :ref:`JSONFormatter <JSONFormatter>` -- ``class_`` is added as
+            the ``'()'`` key, so that they're passed too.
+
         :param format_dict: Any other key/value pairs (for a custom
             formatters)
 
@@ -315,10 +327,19 @@ class LCDictBasic(dict):
             format_dict['datefmt'] = dfmt
         if style != '%':
             format_dict['style'] = style
+        class_ = class_ or format_dict.pop('class', None)
+        if class_:
+            if set(format_dict) - self._formatter_class_keys:
+                format_dict['()'] = class_
+            else:
+                format_dict['class'] = class_
 
         self.formatters[formatter_name] = format_dict.copy()
         return self
 
+    # The keys of a formatter dict that dictConfig passes to a 'class'
+    _formatter_class_keys = frozenset(['format', 'datefmt', 'style', 'validate'])
+
     def add_filter(self, filter_name,
                    ** filter_dict):
         """Add a filter to the ``filters`` subdictionary.
@@ -5,14 +5,36 @@ __author__ = 'brianoneill'
 __doc__ = """ \
 """
 
+import ctypes
+import importlib
 import logging
+import multiprocessing.util
+import os
+import shutil
+import threading
+import time
+import traceback
 from multiprocessing import Lock
+from multiprocessing.sharedctypes import RawArray
+
+try:
+    import fcntl
+    from select import PIPE_BUF
+except ImportError:         # not POSIX: every "atomic" write takes the lock
+    fcntl = None
+    PIPE_BUF = 0
 
 __all__ = [
+    'FileLock',
+    'LockStats',
     'MPLock_Mixin',
+    'handler_lock_stats',
+    'AtomicWrite_Mixin',
     'LockingStreamHandler',
     'LockingFileHandler',
+    'LockingBufferedFileHandler',
     'LockingRotatingFileHandler',
+    'LockingTimedRotatingFileHandler',
     'LockingSysLogHandler',
 ]
 
@@ -22,14 +44,187 @@ __all__ = [
 # locking subclasses of logging package's
 #       StreamHandler, FileHandler, RotatingFileHandler, SysLogHandler
 #
+# LockingBufferedFileHandler -- a LockingFileHandler that writes
+#       groups of records under one acquisition of the lock
+#
 # MPLock_Mixin -- a helper class mixed in to the Locking*Handler classes
+# FileLock -- an flock-based alternative to multiprocessing.Lock
+# LockStats -- shared-memory wait/hold-time statistics for MPLock_Mixin
+# AtomicWrite_Mixin -- lock-free single-write emit, mixed in to
+#       LockingStreamHandler and LockingFileHandler
 #############################################################################
 
+class FileLock():
+    """
+    .. _FileLock:
+
+    An exclusive lock, held with ``fcntl.flock`` on a lock file, that has
+    the ``acquire``/``release`` interface of ``multiprocessing.Lock``.
+
+    A ``multiprocessing.Lock`` excludes only processes that inherit it
+    through ``fork``. A ``FileLock`` excludes every process that locks the
+    same lock file: processes created with the ``spawn`` or ``forkserver``
+    start methods, and separately launched programs, as well as forked
+    children.
+
+    Each process opens the lock file itself, the first time it acquires the
+    lock (flock locks belong to open file descriptions, which forked children
+    would otherwise share). Threads within a process are serialized by
+    an ordinary ``threading.Lock``. Uncontended, ``acquire`` and ``release``
+    each cost one system call.
+
+    A ``FileLock`` can be pickled: the copy refers to the same lock file.
+    """
+    def __init__(self, path):
+        """
+        :param path: the lock file, created if it doesn't exist.
+            Its contents are never read or written.
+        """
+        if not fcntl:
+            raise NotImplementedError("FileLock requires fcntl.flock")  # | raise
+        self.path = os.path.abspath(path)
+        self._thread_lock = threading.Lock()
+        self._fd = None
+        self._fd_pid = None
+
+    def __getstate__(self):
+        return {'path': self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'])
+
+    def _get_fd(self):
+        pid = os.getpid()
+        if self._fd_pid != pid:
+            if self._fd is not None:        # inherited through fork
+                try:
+                    os.close(self._fd)
+                except OSError:
+                    pass
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o666)
+            self._fd_pid = pid
+        return self._fd
+
+    def acquire(self):
+        self._thread_lock.acquire()
+        try:
+            fcntl.flock(self._get_fd(), fcntl.LOCK_EX)
+        except Exception:
+            self._thread_lock.release()
+            raise
+
+    def release(self):
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        finally:
+            self._thread_lock.release()
+
+
+try:
+    _now_ns = time.perf_counter_ns
+except AttributeError:      # Python < 3.7
+    def _now_ns():
+        return int(time.perf_counter() * 1e9)
+
+
+class LockStats():
+    """
+    .. _LockStats:
+
+    Counts of acquisitions of a locking handler's lock, and histograms of
+    the time spent waiting for it and holding it, kept in shared memory.
+
+    Each histogram has ``NUM_BUCKETS`` buckets: bucket 0 counts durations
+    under 1 microsecond, and bucket `i` > 0 counts durations of at least
+    ``2**(i-1)`` and less than ``2**i`` microseconds; the last bucket
+    also counts all longer durations.
+
+    The statistics are updated only while the lock is held, so no further
+    synchronization is needed. The shared memory is inherited by processes
+    created with ``fork``, whose statistics are therefore aggregated with
+    those of their parent, which can read them with ``snapshot()``.
+    Processes that configure their own handlers (e.g. those started with
+    ``spawn``) keep their own statistics.
+    """
+    NUM_BUCKETS = 32
+
+    # Indexes into self._data
+    _ACQUISITIONS = 0
+    _WAIT_TOTAL = 1
+    _WAIT_MAX = 2
+    _HOLD_TOTAL = 3
+    _HOLD_MAX = 4
+    _WAIT_HIST = 5
+    _HOLD_HIST = _WAIT_HIST + NUM_BUCKETS
+
+    def __init__(self):
+        self._data = RawArray(ctypes.c_longlong,
+                              self._HOLD_HIST + self.NUM_BUCKETS)
+
+    def _record(self, total_i, max_i, hist_i, ns):
+        data = self._data
+        data[total_i] += ns
+        if ns > data[max_i]:
+            data[max_i] = ns
+        data[hist_i + min((ns // 1000).bit_length(), self.NUM_BUCKETS - 1)] += 1
+
+    def record_wait(self, ns):
+        """Record one acquisition, after waiting ``ns`` nanoseconds."""
+        self._data[self._ACQUISITIONS] += 1
+        self._record(self._WAIT_TOTAL, self._WAIT_MAX, self._WAIT_HIST, ns)
+
+    def record_hold(self, ns):
+        """Record one release, after holding the lock ``ns`` nanoseconds."""
+        self._record(self._HOLD_TOTAL, self._HOLD_MAX, self._HOLD_HIST, ns)
+
+    def snapshot(self):
+        """Return the statistics as a dict::
+
+            {'acquisitions': int,
+             'wait': {'total': float, 'max': float, 'mean': float,
+                      'histogram': [int, ...]},
+             'hold': {...same keys as 'wait'...}}
+
+        Times are in seconds; ``'histogram'`` is a list of ``NUM_BUCKETS``
+        counts.
+        """
+        data = list(self._data)
+        acquisitions = data[self._ACQUISITIONS]
+
+        def summary(total_i, max_i, hist_i):
+            return {'total': data[total_i] / 1e9,
+                    'max': data[max_i] / 1e9,
+                    'mean': (data[total_i] / 1e9 / acquisitions
+                             if acquisitions else 0.0),
+                    'histogram': data[hist_i: hist_i + self.NUM_BUCKETS]}
+
+        return {'acquisitions': acquisitions,
+                'wait': summary(self._WAIT_TOTAL, self._WAIT_MAX, self._WAIT_HIST),
+                'hold': summary(self._HOLD_TOTAL, self._HOLD_MAX, self._HOLD_HIST)}
+
+    def reset(self):
+        """Zero all the statistics."""
+        for i in range(len(self._data)):
+            self._data[i] = 0
+
+
+def handler_lock_stats(handler_name):
+    """Return ``LockStats.snapshot()`` for the configured locking handler
+    named ``handler_name``, or ``None`` if it doesn't exist or doesn't
+    keep statistics.
+
+    :param handler_name: the name of a handler in a logging config dict.
+    """
+    handler = logging._handlers.get(handler_name)
+    stats = getattr(handler, 'lock_stats', None)
+    return stats.snapshot() if stats else None
+
+
 class MPLock_Mixin():
     """Mix in to a class with an instance attribute ``_mp_lock_``.
     That class should
 
-        * initialize ``_mp_lock_``
+        * initialize ``_mp_lock_``, e.g. by calling ``_init_mp_lock_``
         * call _acquire_ and _release_
 
     as appropriate.
@@ -37,6 +232,31 @@ class MPLock_Mixin():
     Each ``Locking*Handler`` class subclasses both this and a `logging` Handler
     class.
     """
+    def _init_mp_lock_(self, create_lock, lock_file=None, lock_stats=False):
+        """Set ``self._mp_lock_``: ``None`` if ``create_lock`` is false,
+        otherwise a ``FileLock`` on ``lock_file`` if that's given,
+        otherwise a ``multiprocessing.Lock``.
+
+        If ``lock_stats`` is true and there's a lock, set ``self.lock_stats``
+        to a new ``LockStats`` and time every acquisition and release;
+        otherwise set it to ``None``: ``_acquire_`` and ``_release_`` are then
+        exactly as fast as without instrumentation.
+        """
+        if not create_lock:
+            self._mp_lock_ = None
+        elif lock_file:
+            self._mp_lock_ = FileLock(lock_file)
+        else:
+            self._mp_lock_ = Lock()
+
+        self.lock_stats = None
+        if lock_stats and self._mp_lock_:
+            self.lock_stats = LockStats()
+            self._acquired_at_ = 0
+            # Shadow the class's methods with the timing versions
+            self._acquire_ = self._acquire_timed_
+            self._release_ = self._release_timed_
+
     def _acquire_(self):
         if self._mp_lock_:
             self._mp_lock_.acquire()
@@ -45,8 +265,49 @@ class MPLock_Mixin():
         if self._mp_lock_:
             self._mp_lock_.release()
 
-
-class LockingStreamHandler(logging.StreamHandler, MPLock_Mixin):
+    def _acquire_timed_(self):
+        t0 = _now_ns()
+        self._mp_lock_.acquire()
+        self._acquired_at_ = _now_ns()
+        self.lock_stats.record_wait(self._acquired_at_ - t0)
+
+    def _release_timed_(self):
+        self.lock_stats.record_hold(_now_ns() - self._acquired_at_)
+        self._mp_lock_.release()
+
+
+class AtomicWrite_Mixin():
+    """Mix in to a ``StreamHandler`` subclass that also subclasses
+    ``MPLock_Mixin``. Provides ``_emit_atomic_``, which encodes a formatted
+    record and writes it to the underlying file descriptor with a single
+    ``os.write``, without taking the multiprocessing lock, if it's at most
+    ``PIPE_BUF`` bytes long. On POSIX systems such a write to a pipe, or to
+    a file opened for appending (``O_APPEND``), is never interleaved with
+    writes by other processes. Longer records are written under the lock.
+    """
+    def _emit_atomic_(self, record):
+        """Emit a logging record with one unlocked write if possible."""
+        try:
+            stream = self.stream
+            data = (self.format(record) + self.terminator).encode(
+                            getattr(stream, 'encoding', None) or 'utf-8',
+                            getattr(stream, 'errors', None) or 'strict')
+            stream.flush()      # write anything already buffered, first
+            fd = stream.fileno()
+            if len(data) <= PIPE_BUF:
+                os.write(fd, data)
+            else:
+                self._acquire_()
+                try:
+                    while data:
+                        data = data[os.write(fd, data):]
+                finally:
+                    self._release_()
+        except Exception:
+            self.handleError(record)
+
+
+class LockingStreamHandler(logging.StreamHandler, MPLock_Mixin, AtomicWrite_Mixin):
     """
     .. _LockingStreamHandler:
 
@@ -60,11 +321,24 @@ class LockingStreamHandler(logging.StreamHandler, MPLock_Mixin):
     def __init__(self,
                  stream=None,
                  create_lock=False,
+                 lock_file=None,
+                 lock_stats=False,
+                 atomic=False,
                  **kwargs):
         """Initialize the handler.
         If stream is not specified, sys.stderr is used.
+
+        :param lock_file: if given (and ``create_lock`` is true), lock with
+            a ``FileLock`` on this file rather than a ``multiprocessing.Lock``.
+        :param lock_stats: if true (and ``create_lock`` is true), keep
+            ``LockStats`` for the lock in the attribute ``lock_stats``.
+        :param atomic: if true, write each record that fits in ``PIPE_BUF``
+            bytes with a single unlocked ``os.write`` -- see
+            ``AtomicWrite_Mixin``. The stream must be a pipe, a terminal,
+            or a file opened for appending (e.g. redirected with ``>>``).
         """
-        self._mp_lock_ = Lock() if create_lock else None
+        self._init_mp_lock_(create_lock, lock_file, lock_stats)
+        self.atomic = atomic
         super(LockingStreamHandler, self).__init__(stream=stream, **kwargs)
 
     # def flush(self):
@@ -75,12 +349,15 @@ class LockingStreamHandler(logging.StreamHandler, MPLock_Mixin):
     def emit(self, record):
         """Emit a logging record. Called by `logging`.
         """
+        if self.atomic:
+            self._emit_atomic_(record)
+            return
         self._acquire_()
         super(LockingStreamHandler, self).emit(record)      # this calls flush()
         self._release_()
 
 
-class LockingFileHandler(logging.FileHandler, MPLock_Mixin):
+class LockingFileHandler(logging.FileHandler, MPLock_Mixin, AtomicWrite_Mixin):
     """
     .. _LockingFileHandler:
 
@@ -93,23 +370,183 @@ class LockingFileHandler(logging.FileHandler, MPLock_Mixin):
     def __init__(self, filename,
                  # mode='a', encoding=None, delay=False,
                  create_lock=False,
+                 lock_file=None,
+                 lock_stats=False,
+                 atomic=False,
                  **kwargs):
         """Open the specified file and use it as the stream for logging.
+
+        :param lock_file: if given (and ``create_lock`` is true), lock with
+            a ``FileLock`` on this file rather than a ``multiprocessing.Lock``.
+        :param lock_stats: if true (and ``create_lock`` is true), keep
+            ``LockStats`` for the lock in the attribute ``lock_stats``.
+        :param atomic: if true, the file is always opened for appending
+            (after being truncated, if ``mode`` is ``'w'``), and each
+            record that fits in ``PIPE_BUF`` bytes is written with a single
+            unlocked ``os.write`` -- see ``AtomicWrite_Mixin``.
         """
-        self._mp_lock_ = Lock() if create_lock else None
+        self._init_mp_lock_(create_lock, lock_file, lock_stats)
+        self.atomic = atomic
         super(LockingFileHandler, self).__init__(
             filename,
             # mode=mode, encoding=encoding, delay=delay,
             **kwargs)
 
+    def _ensure_stream_(self):
+        """Open the logfile if it isn't open (e.g. if ``delay`` is true),
+        exactly as ``logging.FileHandler.emit`` does.
+
+        :return: ``self.stream``
+        """
+        if self.stream is None:
+            if self.mode != 'w' or not getattr(self, '_closed', False):
+                self.stream = self._open()
+        return self.stream
+
+    def _open(self):
+        """Open the logfile; in atomic mode, make sure that writes append.
+        """
+        stream = super(LockingFileHandler, self)._open()
+        if self.atomic and fcntl:
+            fd = stream.fileno()
+            fcntl.fcntl(fd, fcntl.F_SETFL,
+                        fcntl.fcntl(fd, fcntl.F_GETFL) | os.O_APPEND)
+        return stream
+
     def emit(self, record):
         """Emit a logging record. Called by `logging`.
         """
+        if self.atomic:
+            if self._ensure_stream_():
+                self._emit_atomic_(record)
+            return
         self._acquire_()
         super(LockingFileHandler, self).emit(record)
         self._release_()
 
 
+class LockingBufferedFileHandler(LockingFileHandler):
+    """
+    .. _LockingBufferedFileHandler:
+
+    A multiprocessing-safe handler class that writes formatted logging
+    records to disk files in groups. Each process accumulates formatted
+    records in a private buffer, and writes the whole buffer to the file
+    under a single acquisition of the lock.
+
+    The buffer is written when any of the following occurs:
+
+        * it holds ``buffer_size`` records;
+        * a record is logged whose level is at least ``flush_level``;
+        * a record is logged at least ``flush_interval`` seconds after
+          the buffer was last written;
+        * ``flush()`` or ``close()`` is called -- in particular, by
+          ``logging.shutdown()`` at exit.
+
+    Note that ``flush_interval`` is checked only when records are emitted:
+    there's no timer thread, so the records of a process that falls silent
+    stay buffered until one of the other conditions occurs.
+
+    Records written by a single process appear in the logfile in order,
+    but the lines of different processes are interleaved group by group
+    rather than record by record.
+    """
+    def __init__(self, filename,
+                 create_lock=False,
+                 buffer_size=100,
+                 flush_interval=1.0,
+                 flush_level='ERROR',
+                 **kwargs):
+        """
+        :param filename: the logfile
+        :param create_lock: as for ``LockingFileHandler``
+        :param buffer_size: number of records to accumulate before writing
+        :param flush_interval: seconds; if not ``None``, write the buffer
+            when a record is logged at least this long after the previous
+            write.
+        :param flush_level: a level name or number; records at or above
+            this level cause the buffer to be written immediately.
+        :param kwargs: ``lock_file`` and ``lock_stats``, as for
+            ``LockingFileHandler``;
+            and as for ``logging.FileHandler``: ``mode``, ``encoding``,
+            ``delay``.
+        """
+        self.buffer_size = max(1, int(buffer_size))
+        self.flush_interval = flush_interval
+        self.flush_level = logging._checkLevel(flush_level)
+        self._buffer = []
+        self._buffer_pid = os.getpid()
+        self._last_write = time.time()
+        super(LockingBufferedFileHandler, self).__init__(
+            filename,
+            create_lock=create_lock,
+            **kwargs)
+
+    def _check_pid(self):
+        """A child process created by ``fork`` inherits a copy of
+        its parent's buffer, which the parent will write itself.
+        Discard it.
+        """
+        pid = os.getpid()
+        if pid != self._buffer_pid:
+            self._buffer = []
+            self._buffer_pid = pid
+
+    def _write_buffer(self):
+        """Write the buffered records to the file under one acquisition
+        of the multiprocessing lock, then empty the buffer.
+        """
+        self._check_pid()
+        if self._buffer:
+            if self._ensure_stream_():
+                text = ''.join(self._buffer)
+                self._acquire_()
+                try:
+                    self.stream.write(text)
+                    self.stream.flush()
+                finally:
+                    self._release_()
+            self._buffer = []
+        self._last_write = time.time()
+
+    def emit(self, record):
+        """Buffer a logging record, writing the buffer if it's time to.
+        Called by `logging`.
+        """
+        try:
+            msg = self.format(record)
+            self._check_pid()
+            self._buffer.append(msg + self.terminator)
+            if (len(self._buffer) >= self.buffer_size
+                or record.levelno >= self.flush_level
+                or (self.flush_interval is not None and
+                    record.created - self._last_write >= self.flush_interval)
+               ):
+                self._write_buffer()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        """Write any buffered records to the file. Called by `logging`.
+        """
+        self.acquire()
+        try:
+            self._write_buffer()
+        finally:
+            self.release()
+
+    def close(self):
+        """Write any buffered records, then close the file.
+        Called by `logging`.
+        """
+        self.acquire()
+        try:
+            self._write_buffer()
+            super(LockingBufferedFileHandler, self).close()
+        finally:
+            self.release()
+
+
 from logging import handlers
 
 class LockingRotatingFileHandler(logging.handlers.RotatingFileHandler, MPLock_Mixin):
@@ -119,28 +556,326 @@ class LockingRotatingFileHandler(logging.handlers.RotatingFileHandler, MPLock_Mi
     A multiprocessing-safe handler class that writes
     formatted logging records to a rotating set of disk files.
 
+    By default, the logfile is closed after every record is written, so that
+    no process ever writes to a file that another process has rotated. If
+    ``keep_open`` is true, the file instead stays open across calls to
+    ``emit``, and is reopened only when a check made while holding the lock
+    -- comparing the device and inode of the open file with those of the
+    file currently named ``filename`` -- shows that another process has
+    rolled it over.
+
+    If ``compress`` is given, backups are compressed, and named ``lf.log.1.gz``
+    (``.bz2``, ``.xz``), ``lf.log.2.gz``, and so on; ``backupCount`` limits
+    their number as usual. At rollover, ``emit`` only renames the logfile to
+    a uniquely named pending file and opens a new logfile. A background
+    thread then compresses the pending file and, briefly holding the lock,
+    renumbers the compressed backups and adds the new one as backup 1.
+    A process's backups are added in the order in which it rolled them
+    over. Processes wait for their compression threads to finish before
+    they exit: a ``multiprocessing`` finalizer joins them, so child
+    processes do too.
+
     For more information, see the documentation for the base class
     `logging.handlers.RotatingFileHandler <https://docs.python.org/3/library/logging.handlers.html?highlight=logging#rotatingfilehandler>`_.
     """
     def __init__(self, filename,
                  # mode='a', encoding=None, delay=False,
                  create_lock=False,
+                 lock_file=None,
+                 lock_stats=False,
+                 keep_open=False,
+                 compress=None,
                  **kwargs):
         """Open the specified file and use it as the stream for logging.
+
+        :param lock_file: if given (and ``create_lock`` is true), lock with
+            a ``FileLock`` on this file rather than a ``multiprocessing.Lock``.
+        :param lock_stats: if true (and ``create_lock`` is true), keep
+            ``LockStats`` for the lock in the attribute ``lock_stats``.
+        :param keep_open: if true, keep the logfile open between records,
+            reopening it only after another process has rotated it.
+        :param compress: ``None`` (the default), or ``'gzip'``, ``'bz2'``
+            or ``'xz'``: compress backups in the background, in that format.
         """
-        self._mp_lock_ = Lock() if create_lock else None
+        if compress and compress not in _compressors:
+            raise ValueError("compress must be one of %s, not '%s'"
+                             % (', '.join(sorted(_compressors)), compress))  # | raise
+        self._init_mp_lock_(create_lock, lock_file, lock_stats)
+        self.keep_open = keep_open
+        self.compress = compress or None
+        self._compressor = None         # most recently started thread
         super(LockingRotatingFileHandler, self).__init__(
             filename,
             # mode=mode, encoding=encoding, delay=delay,
             **kwargs)
 
+    def _reopen_if_rotated(self):
+        """Close the stream if the file it refers to is no longer
+        the one named ``self.baseFilename`` -- another process has
+        rotated it, or it's been removed. `logging` reopens the file
+        when it next needs the stream.
+        """
+        if self.stream is None:
+            return
+        try:
+            st = os.stat(self.baseFilename)
+        except OSError:         # e.g. FileNotFoundError: renamed, not yet recreated
+            st = None
+        fst = os.fstat(self.stream.fileno())
+        if (st is None or
+            (st.st_ino, st.st_dev) != (fst.st_ino, fst.st_dev)):
+            self.stream.close()
+            self.stream = None
+
     def emit(self, record):
         """Emit a logging record. Called by `logging`.
         """
         self._acquire_()
-        super(LockingRotatingFileHandler, self).emit(record)
-        self._release_()
-        self.close()        # . <-- Note well
+        try:
+            # With compress, a stream opened before another process rolled
+            # the file over (e.g. one inherited through fork) may refer to a
+            # pending file that's been compressed and removed
+            if self.keep_open or self.compress:
+                self._reopen_if_rotated()
+            super(LockingRotatingFileHandler, self).emit(record)
+        except Exception:
+            self.handleError(record)
+        finally:
+            self._release_()
+        if not self.keep_open:
+            # . <-- Note well. Close the file, not the handler: that would
+            # also remove the handler from logging's registry of handlers.
+            self.acquire()
+            try:
+                if self.stream:
+                    self.stream.close()
+                    self.stream = None
+            finally:
+                self.release()
+
+    def _backup_name(self, i):
+        return '%s.%d%s' % (self.baseFilename, i, _compressors[self.compress][1])
+
+    def doRollover(self):
+        """Roll over the logfile, handing the old one off for compression,
+        if ``compress`` was given. Called by `logging`, holding the lock.
+        """
+        if not self.compress:
+            super(LockingRotatingFileHandler, self).doRollover()
+            return
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        if self.backupCount > 0 and os.path.exists(self.baseFilename):
+            pending = '%s.%d-%d.pending' % (self.baseFilename,
+                                            os.getpid(), time.time() * 1e6)
+            os.rename(self.baseFilename, pending)
+            self._compressor = threading.Thread(
+                target=self._compress_backup,
+                args=(pending, self._compressor),
+                name='LockingRotatingFileHandler compressor')
+            _add_compression_thread(self._compressor)
+            self._compressor.start()
+        if not self.delay:
+            self.stream = self._open()
+
+    def _compress_backup(self, pending, previous):
+        """Compress ``pending``, then make the result backup 1, after the
+        thread that compressed the previous backup, ``previous``, is done.
+        Runs on a thread of its own.
+        """
+        module, ext = _compressors[self.compress]
+        compressed = pending + ext
+        try:
+            open_compressed = importlib.import_module(module).open
+            with open(pending, 'rb') as src:
+                with open_compressed(compressed, 'wb') as dst:
+                    shutil.copyfileobj(src, dst, 1 << 20)
+            if previous:
+                previous.join()
+            self._acquire_()
+            try:
+                for i in range(self.backupCount - 1, 0, -1):
+                    sfn = self._backup_name(i)
+                    if os.path.exists(sfn):
+                        os.replace(sfn, self._backup_name(i + 1))
+                os.replace(compressed, self._backup_name(1))
+            finally:
+                self._release_()
+            os.remove(pending)
+        except Exception:
+            if logging.raiseExceptions:
+                traceback.print_exc()
+        finally:
+            _compression_threads.discard(threading.current_thread())
+
+    def wait_for_compression(self):
+        """Wait until this process has finished compressing backups."""
+        if self._compressor:
+            self._compressor.join()
+
+
+# The compression threads running in this process, and the process that
+# registered _join_compression_threads to run at exit. A multiprocessing
+# child runs it as it finishes (before Python 3.7, it doesn't join its
+# non-daemon threads itself).
+_compression_threads = set()
+_compression_pid = None
+
+
+def _join_compression_threads():
+    for thread in list(_compression_threads):
+        thread.join()
+
+
+def _add_compression_thread(thread):
+    global _compression_pid
+    if _compression_pid != os.getpid():
+        # A forked child inherits neither the threads nor the finalizer
+        _compression_pid = os.getpid()
+        _compression_threads.clear()
+        multiprocessing.util.Finalize(None, _join_compression_threads,
+                                      exitpriority=10)
+    _compression_threads.add(thread)
+
+
+# compress: (module with an ``open`` function, extension).
+# Imported when first used: lzma, and bz2.open, are Python 3 only.
+_compressors = {
+    'gzip': ('gzip', '.gz'),
+    'bz2':  ('bz2', '.bz2'),
+    'xz':   ('lzma', '.xz'),
+}
+
+
+class LockingTimedRotatingFileHandler(logging.handlers.TimedRotatingFileHandler,
+                                       MPLock_Mixin):
+    """
+    .. _LockingTimedRotatingFileHandler:
+
+    A multiprocessing-safe handler class that writes formatted logging
+    records to a set of disk files rotated at timed intervals.
+
+    When a plain ``TimedRotatingFileHandler`` is shared by several processes,
+    each of them rolls the logfile over when its rollover time arrives, and
+    the processes rename one another's files away. Here, the process that
+    first emits a record after the rollover time, holding the lock, does the
+    rollover; any other process, when it in turn reaches the rollover time,
+    sees -- again holding the lock -- that the file has already been rolled
+    over, and just reopens it.
+
+    Processes don't necessarily reach their rollover times together (with
+    ``when='S'``, ``'M'``, ``'H'`` or ``'D'``, the times depend on when each
+    process started, or last rolled over), so each process also checks,
+    before every write, whether another has rolled the file over since.
+    Processes that inherit a ``multiprocessing.Lock`` through ``fork`` also
+    share a count of rollovers, and the next rollover time, in shared
+    memory: the check is a comparison of the count with the last one seen,
+    and ``emit`` makes no system calls other than the write. Processes that
+    share a ``FileLock`` needn't be related, so the check compares the
+    device and inode of the open file with those of the logfile.
+
+    At its rollover time, a process finds that the file has been rolled over
+    by another process if it's been written to since then (every process
+    rolls over before writing anything after its rollover time), or if it's
+    no longer the file that this handler has open.
+
+    For more information, see the documentation for the base class
+    `logging.handlers.TimedRotatingFileHandler <https://docs.python.org/3/library/logging.handlers.html#timedrotatingfilehandler>`_.
+    """
+    def __init__(self, filename,
+                 # when='h', interval=1, backupCount=0, encoding=None,
+                 # delay=False, utc=False, atTime=None,
+                 create_lock=False,
+                 lock_file=None,
+                 lock_stats=False,
+                 **kwargs):
+        """Open the specified file and use it as the stream for logging.
+
+        :param lock_file: if given (and ``create_lock`` is true), lock with
+            a ``FileLock`` on this file rather than a ``multiprocessing.Lock``.
+        :param lock_stats: if true (and ``create_lock`` is true), keep
+            ``LockStats`` for the lock in the attribute ``lock_stats``.
+        """
+        self._init_mp_lock_(create_lock, lock_file, lock_stats)
+        super(LockingTimedRotatingFileHandler, self).__init__(
+            filename,
+            **kwargs)
+        # [number of rollovers, next rollover time], shared by the
+        # processes that inherit the multiprocessing.Lock
+        self._shared_rollovers = None
+        self._rollovers_seen = 0
+        if self._mp_lock_ and not lock_file:
+            self._shared_rollovers = RawArray(ctypes.c_longlong, 2)
+            self._shared_rollovers[1] = self.rolloverAt
+
+    def _file_replaced(self):
+        """Return true if the open file is no longer the one named
+        ``self.baseFilename``."""
+        if self.stream is None:
+            return False
+        try:
+            st = os.stat(self.baseFilename)
+        except OSError:         # e.g. FileNotFoundError: renamed, not yet recreated
+            return False
+        fst = os.fstat(self.stream.fileno())
+        return (st.st_ino, st.st_dev) != (fst.st_ino, fst.st_dev)
+
+    def _rolled_over_by_another(self):
+        """Return true if another process has rolled over the logfile
+        since ``self.rolloverAt``. Called with the lock held.
+        """
+        try:
+            st = os.stat(self.baseFilename)
+        except OSError:         # e.g. FileNotFoundError: renamed, not yet recreated
+            return False
+        return st.st_mtime >= self.rolloverAt or self._file_replaced()
+
+    def _switch_to_new_logfile(self, rollover_at):
+        """Close the stream, which refers to a file that another process
+        has rolled over, and roll over next at ``rollover_at``."""
+        if self.stream:
+            self.stream.close()
+            self.stream = None      # reopened by FileHandler.emit
+        self.rolloverAt = rollover_at
+        if self._shared_rollovers is not None:
+            self._rollovers_seen = self._shared_rollovers[0]
+
+    def _coordinated_rollover(self):
+        """Roll over the logfile, unless another process already has;
+        in that case, just switch to the new logfile. Called with the
+        lock held.
+        """
+        if self._rolled_over_by_another():
+            self._switch_to_new_logfile(
+                self.computeRollover(int(time.time())))
+            return
+        self.doRollover()
+        shared = self._shared_rollovers
+        if shared is not None:
+            shared[0] += 1
+            shared[1] = self.rolloverAt
+            self._rollovers_seen = shared[0]
+
+    def emit(self, record):
+        """Emit a logging record. Called by `logging`.
+        """
+        self._acquire_()
+        try:
+            shared = self._shared_rollovers
+            if shared is not None:
+                if shared[0] != self._rollovers_seen:
+                    self._switch_to_new_logfile(shared[1])
+            elif self._mp_lock_ and self._file_replaced():
+                self._switch_to_new_logfile(
+                    self.computeRollover(int(time.time())))
+            if self.shouldRollover(record):
+                self._coordinated_rollover()
+            logging.FileHandler.emit(self, record)
+        except Exception:
+            self.handleError(record)
+        finally:
+            self._release_()
 
 
 # import socket
@@ -162,10 +897,17 @@ class LockingSysLogHandler(SysLogHandler, MPLock_Mixin):
                  # facility=SysLogHandler.LOG_USER,
                  # socktype=socket.SOCK_DGRAM,
                  create_lock=False,
+                 lock_file=None,
+                 lock_stats=False,
                  **kwargs):
         """Open the specified socket and use it as the destination for logging.
+
+        :param lock_file: if given (and ``create_lock`` is true), lock with
+            a ``FileLock`` on this file rather than a ``multiprocessing.Lock``.
+        :param lock_stats: if true (and ``create_lock`` is true), keep
+            ``LockStats`` for the lock in the attribute ``lock_stats``.
         """
-        self._mp_lock_ = Lock() if create_lock else None
+        self._init_mp_lock_(create_lock, lock_file, lock_stats)
         super(LockingSysLogHandler, self).__init__(
                         # address=address, facility=facility, socktype=socktype,
                         **kwargs)
@@ -0,0 +1,467 @@
+# coding=utf-8
+
+__author__ = "Brian O'Neill"
+
+__doc__ = """ \
+.. _log-parsing-module:
+
+Parse logfiles written with a known format -- any formatter preset, or any
+``FormatterSpec`` -- back into columns of values, for analysis.
+
+A ``LogParser`` compiles the format string, in any of the three styles,
+into one regular expression over bytes, in which only the attributes you
+ask for are captured groups, and runs it over the file with ``findall``,
+in the regular-expression engine, a chunk at a time: the file is
+memory-mapped, so a multi-gigabyte logfile is never read into memory
+whole. Each chunk ends where a record begins, so a record's continuation
+lines (a traceback, say) stay with its message. The captured values
+are converted column by column: numbers by ``int`` and ``float``, strings
+that take few distinct values (logger names, levels, ...) decoded once
+each, and ``asctime`` converted to a timestamp with one ``time.strptime``
+per second. So::
+
+    >>> parser = LogParser('time_logger_level_msg',             # doctest: +SKIP
+    ...                    columns=('timestamp', 'levelno', 'name'))
+    >>> cols = parser.parse('_log/app.log', numpy=True)          # doctest: +SKIP
+    >>> (cols['levelno'] >= logging.ERROR).sum()                # doctest: +SKIP
+
+Besides the attributes that the format uses, a parser can produce
+``timestamp``, in seconds since the epoch, from ``asctime`` (plus
+``msecs``, if the format has both and a ``datefmt``), ``created``,
+``epoch_ms`` or ``epoch_ns``; and ``levelno``, from ``levelname``.
+With ``numpy=True`` columns are NumPy arrays -- ``int64``, ``float64``, or
+``object`` for strings -- if NumPy is installed.
+
+Lines written by a :ref:`JSONFormatter` are parsed with `orjson`, if it's
+installed, or the `json` module, one per line.
+
+A format with no fixed text before the message -- ``msg``,
+``process_msg``, ``logger_msg`` -- gives no way to tell continuation lines
+from records, so with those, each line that matches the format is parsed
+as a record.
+"""
+
+import codecs
+import json
+import logging
+import mmap
+import re
+import time
+
+from .compiled_formatter import _parse
+from .format_parsing import format_attributes
+from .formatter_presets import FormatterSpec, _formatter_presets
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+__all__ = ['LogParser', 'parse_log']
+
+
+# Default number of bytes parsed at a time
+CHUNK_SIZE = 1 << 24
+
+_INT_ATTRIBUTES = frozenset(('levelno', 'lineno', 'thread', 'process',
+                             'epoch_ms', 'epoch_ns'))
+_FLOAT_ATTRIBUTES = frozenset(('created', 'msecs', 'relativeCreated'))
+# String attributes whose values don't contain spaces, by default
+_WORDS = frozenset(('name', 'pathname', 'filename', 'module', 'funcName',
+                    'processName'))
+# String attributes with few distinct values, decoded once each
+_LOW_CARDINALITY = frozenset(('name', 'levelname', 'pathname', 'filename',
+                              'module', 'funcName', 'threadName',
+                              'processName', 'taskName'))
+
+_INT = br'-?\d+'
+_FLOAT = br'[-+]?(?:\d+\.?\d*(?:[eE][-+]?\d+)?|\.\d+|inf|nan)'
+
+# The default asctime, '2017-01-01 12:00:00,123'
+_DEFAULT_ASCTIME = br'\d{4}-\d\d-\d\d \d\d:\d\d:\d\d,\d{3}'
+# logging.Formatter.default_time_format is new in Python 3.3
+_DEFAULT_TIME_FORMAT = getattr(logging.Formatter, 'default_time_format',
+                               '%Y-%m-%d %H:%M:%S')
+
+# Regular expressions for the strftime directives
+_DIRECTIVES = {
+    'Y': br'\d{4}', 'y': br'\d\d', 'm': br'\d\d', 'd': br'\d\d',
+    'H': br'\d\d', 'I': br'\d\d', 'M': br'\d\d', 'S': br'\d\d',
+    'j': br'\d{3}', 'f': br'\d{6}', 'z': br'[-+]\d{4}',
+    'a': br'[^\W\d]+', 'A': br'[^\W\d]+', 'b': br'[^\W\d]+',
+    'B': br'[^\W\d]+', 'p': br'[^\W\d]+', '%': b'%',
+}
+
+_decode = codecs.getdecoder('utf-8')
+
+
+def _text(b):
+    return b if b.__class__ is str else _decode(b, 'replace')[0]
+
+
+def _datefmt_regex(datefmt):
+    """Return a regular expression (bytes) for dates formatted with
+    ``datefmt``."""
+    parts = re.split(r'(%.)', datefmt)
+    regex = b''
+    for i, part in enumerate(parts):
+        if i % 2:
+            regex += _DIRECTIVES.get(part[1], br'.+?')
+        else:
+            regex += re.escape(part.encode('utf-8'))
+    return regex
+
+
+def _field_kind(attribute, spec, style):
+    """Return ``'int'``, ``'float'`` or ``'str'``: the kind of value that
+    the field ``spec`` (as returned by ``compiled_formatter._parse``)
+    renders; and whether it may be padded."""
+    if style == '{':
+        conversion = spec[2:-1]         # spec is '{}...}'
+        if conversion[:1] in ('.', '[', '!'):
+            return 'str', True
+        type_char = conversion[-1:] if conversion[-1:].isalpha() else ''
+    else:
+        type_char = spec[-1]
+    padded = bool(re.search(r'\d', spec))
+    if type_char in ('x', 'X', 'o', 'c', 'b', 'n', '%'):
+        return 'str', padded
+    if type_char in ('e', 'E', 'f', 'F', 'g', 'G'):
+        return 'float', padded
+    if type_char in ('d', 'i', 'u') or attribute in _INT_ATTRIBUTES:
+        return 'int', padded
+    if attribute in _FLOAT_ATTRIBUTES:
+        return 'float', padded
+    return 'str', padded
+
+
+def _level_regex():
+    """A regular expression matching the registered level names, and the
+    names ``logging.getLevelName`` gives other levels."""
+    names = sorted(set(logging._levelToName.values()), key=len, reverse=True)
+    return (b'(?:' + b'|'.join(re.escape(name.encode('utf-8'))
+                               for name in names) +
+            br'|Level -?\d+)')
+
+
+class _Seconds(dict):
+    """Maps date strings without milliseconds to seconds since the
+    epoch, calling ``time.strptime`` once per distinct string."""
+    def __init__(self, datefmt):
+        super(_Seconds, self).__init__()
+        self.datefmt = datefmt
+
+    def __missing__(self, key):
+        try:
+            value = time.mktime(time.strptime(_text(key), self.datefmt))
+        except (ValueError, OverflowError):
+            value = float('nan')
+        self[key] = value
+        return value
+
+
+class _Levels(dict):
+    """Maps level names to level numbers; unknown names map to -1."""
+    def __missing__(self, key):
+        name = _text(key).strip()
+        value = logging.getLevelName(name)
+        if value.__class__ is not int:
+            m = re.match(r'Level (-?\d+)$', name)
+            value = int(m.group(1)) if m else -1
+        self[key] = value
+        return value
+
+
+class _Strings(dict):
+    """Maps bytes to their decoded, stripped text."""
+    def __missing__(self, key):
+        value = self[key] = _text(key).strip()
+        return value
+
+
+class LogParser():
+    """
+    .. _LogParser:
+
+    A parser of logfiles written with a given format, which produces
+    columns of values: a dict that maps each column name to a list, or to
+    a NumPy array, with one value per record.
+    """
+    def __init__(self, spec, columns=None):
+        """
+        :param spec: a ``FormatterSpec``, or the name of a formatter preset
+        :param columns: a sequence of the names of the columns to produce
+            -- record attributes that the format uses, ``'timestamp'`` and
+            ``'levelno'``. Default: all those in ``self.available``.
+            Raise ``ValueError`` if a column isn't available.
+        """
+        if not isinstance(spec, FormatterSpec):
+            if spec not in _formatter_presets:
+                raise KeyError("No formatter preset named '%s'"
+                               % spec)                              # | raise
+            spec = _formatter_presets[spec]
+        self.spec = spec
+        self.json = spec.class_ == 'prelogging.JSONFormatter'
+        style = spec.style or '%'
+        attributes = format_attributes(spec.format, style)
+        self.datefmt = spec.dateformat
+
+        # Derived columns, and the attributes each is computed from
+        derived = {}
+        for source in ('epoch_ns', 'epoch_ms', 'created', 'asctime'):
+            if source in attributes:
+                sources = (source,)
+                if (source == 'asctime' and self.datefmt and
+                        'msecs' in attributes):
+                    sources += ('msecs',)
+                derived['timestamp'] = sources
+                break
+        if 'levelno' not in attributes and 'levelname' in attributes:
+            derived['levelno'] = ('levelname',)
+        self.available = tuple(attributes) + tuple(derived)
+
+        if columns is None:
+            columns = self.available
+        for column in columns:
+            if column not in self.available:
+                raise ValueError("Format %r has no column '%s'"
+                                 % (spec.format, column))           # | raise
+        self.columns = tuple(columns)
+        # The captured attributes from which each column is computed
+        self._sources = {column: derived.get(column, (column,))
+                         for column in self.columns}
+        captured = []
+        for column in self.columns:
+            for attribute in self._sources[column]:
+                if attribute not in captured:
+                    captured.append(attribute)
+        self._captured = tuple(captured)
+        self._converters = {column: self._converter(column, style, derived)
+                            for column in self.columns}
+
+        if self.json:
+            self._loads = orjson.loads if orjson else json.loads
+            self._start_re = re.compile(br'^\{', re.M)
+        else:
+            body, _ = self._regex(style, captured=())
+            self._start_re = re.compile(b'^' + body, re.M)
+            regex, self._group_order = self._regex(style, self._captured,
+                                                   continuation=body)
+            self._re = re.compile(b'^' + regex, re.M)
+
+    def _regex(self, style, captured, continuation=None):
+        """Return a regular expression for records, in which the first
+        occurrences of the ``captured`` attributes are groups, and the
+        list of those attributes in the order of the groups. If
+        ``continuation`` is given, a message that ends the format also
+        takes the following lines that don't match ``continuation``.
+        """
+        parts = _parse(self.spec.format, style)
+        regex = b''
+        order = []
+        for i, part in enumerate(parts):
+            if isinstance(part, str):
+                regex += re.escape(part.encode('utf-8'))
+                continue
+            attribute, spec = part
+            last = i == len(parts) - 1
+            kind, padded = _field_kind(attribute, spec, style)
+            if attribute == 'asctime':
+                core = (_datefmt_regex(self.datefmt) if self.datefmt else
+                        _DEFAULT_ASCTIME)
+            elif attribute == 'levelname' and kind == 'str':
+                core = _level_regex()
+            elif kind == 'int':
+                core = _INT
+            elif kind == 'float':
+                core = _FLOAT
+            elif attribute in _WORDS and kind == 'str':
+                core = br'\S*' if last else br'\S*?'
+            else:
+                core = br'.*' if last else br'.*?'
+            if attribute == 'message' and last and continuation is not None:
+                core += br'(?:\n(?!' + continuation + br'|\Z).*)*'
+            if attribute in captured and attribute not in order:
+                order.append(attribute)
+                core = b'(' + core + b')'
+            else:
+                core = b'(?:' + core + b')'
+            regex += (b' *' + core + b' *') if padded else core
+        return regex, order
+
+    def _converter(self, column, style, derived):
+        """Return a function that turns lists of captured values (bytes,
+        or for JSON lines, decoded values), one for each of the attributes
+        that ``column`` is computed from, into the list of values of
+        ``column``."""
+        if column == 'timestamp':
+            source = derived['timestamp'][0]
+            if source == 'epoch_ns':
+                return lambda values: [int(v) * 1e-9 for v in values]
+            if source == 'epoch_ms':
+                return lambda values: [int(v) * 0.001 for v in values]
+            if source == 'created':
+                return lambda values: list(map(float, values))
+            if not self.datefmt:
+                seconds = _Seconds(_DEFAULT_TIME_FORMAT)
+                return lambda values: [seconds[v[:19]] + int(v[20:]) * 0.001
+                                       for v in values]
+            seconds = _Seconds(self.datefmt)
+            if len(derived['timestamp']) == 2:      # and msecs
+                return lambda values, msecs: [
+                    seconds[v] + float(ms) * 0.001
+                    for v, ms in zip(values, msecs)]
+            return lambda values: list(map(seconds.__getitem__, values))
+        if column == 'levelno' and column in derived:
+            levels = _Levels()
+            return lambda values: list(map(levels.__getitem__, values))
+
+        kind = 'str'
+        for part in _parse(self.spec.format, style):
+            if not isinstance(part, str) and part[0] == column:
+                kind = _field_kind(column, part[1], style)[0]
+                break
+        if kind == 'int':
+            return lambda values: list(map(int, values))
+        if kind == 'float':
+            return lambda values: list(map(float, values))
+        if column in _LOW_CARDINALITY:
+            strings = _Strings()
+            return lambda values: list(map(strings.__getitem__, values))
+        return lambda values: list(map(_text, values))
+
+    def _columns(self, values):
+        """Return the dict of columns, given a dict that maps each of
+        ``self._captured`` to a sequence of its values."""
+        return {column: self._converters[column](
+                            *[values[attribute]
+                              for attribute in self._sources[column]])
+                for column in self.columns}
+
+    def parse_chunk(self, data, start=0, end=None, numpy=False):
+        """Return the columns of the records in ``data[start:end]``, which
+        should begin at the start of a record.
+
+        :param data: ``bytes``, or another bytes-like object such as an
+            ``mmap``
+        :param start: where to start parsing
+        :param end: where to stop parsing; default: the end of ``data``
+        :param numpy: if true, return NumPy arrays rather than lists
+        """
+        if end is None:
+            end = len(data)
+        if self.json:
+            values = self._json_values(data[start:end])
+        else:
+            # The newline that ends the last record doesn't begin another
+            if end > start and data[end - 1] in (10, b'\n'):
+                end -= 1
+            rows = self._re.findall(data, start, end)
+            if len(self._group_order) == 1:
+                rows = [(row,) for row in rows]
+            values = dict(zip(self._group_order, zip(*rows)))
+            for attribute in self._group_order:
+                values.setdefault(attribute, ())
+        columns = self._columns(values)
+        return self._arrays(columns) if numpy else columns
+
+    def _json_values(self, data):
+        loads = self._loads
+        records = []
+        for line in bytes(data).split(b'\n'):
+            if line[:1] == b'{':
+                try:
+                    records.append(loads(line))
+                except ValueError:
+                    pass
+        return {attribute: [record.get(attribute) for record in records]
+                for attribute in self._captured}
+
+    @staticmethod
+    def _arrays(columns):
+        if numpy is None:
+            raise ValueError("numpy is not installed")             # | raise
+        arrays = {}
+        for name, values in columns.items():
+            if values and isinstance(values[0], bool):
+                dtype = object
+            elif values and isinstance(values[0], int):
+                dtype = numpy.int64
+            elif values and isinstance(values[0], float):
+                dtype = numpy.float64
+            else:
+                dtype = object
+            arrays[name] = numpy.array(values, dtype=dtype)
+        return arrays
+
+    def _chunk_end(self, data, start, size, chunk_size):
+        """Return where the chunk that begins at ``start`` should end: at
+        the start of the first record that begins at least ``chunk_size``
+        bytes after ``start``, or at ``size``."""
+        if start + chunk_size >= size:
+            return size
+        newline = data.find(b'\n', start + chunk_size - 1)
+        if newline < 0:
+            return size
+        m = self._start_re.search(data, newline + 1)
+        return m.start() if m else size
+
+    def iter_chunks(self, source, chunk_size=CHUNK_SIZE, numpy=False):
+        """Yield the columns of the records of ``source``, for about
+        ``chunk_size`` bytes of it at a time.
+
+        :param source: a filename, which is memory-mapped; or a bytes-like
+            object
+        :param chunk_size: the number of bytes to parse at a time, rounded
+            up to the start of a record
+        :param numpy: if true, yield NumPy arrays rather than lists
+        """
+        if not isinstance(source, str):
+            data, f = source, None
+        else:
+            f = open(source, 'rb')
+            try:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:              # empty file
+                f.close()
+                return
+            if hasattr(data, 'madvise'):
+                data.madvise(mmap.MADV_SEQUENTIAL)
+        try:
+            size = len(data)
+            start = 0
+            while start < size:
+                end = self._chunk_end(data, start, size, chunk_size)
+                yield self.parse_chunk(data, start, end, numpy=numpy)
+                start = end
+        finally:
+            if f is not None:
+                data.close()
+                f.close()
+
+    def parse(self, source, chunk_size=CHUNK_SIZE, numpy=False):
+        """Return the columns of all the records of ``source``.
+        Arguments are as for ``iter_chunks``.
+        """
+        columns = {column: [] for column in self.columns}
+        for chunk in self.iter_chunks(source, chunk_size):
+            for column, values in chunk.items():
+                columns[column].extend(values)
+        return self._arrays(columns) if numpy else columns
+
+
+def parse_log(source, preset, columns=None, numpy=False):
+    """Return the columns of the records of a logfile written with the
+    formatter preset named by ``preset``, or with a ``FormatterSpec``.
+    See ``LogParser``.
+
+    :param source: a filename, or a bytes-like object
+    :param preset: the name of a formatter preset, or a ``FormatterSpec``
+    :param columns: the columns to produce; default: all available
+    :param numpy: if true, return NumPy arrays rather than lists
+    """
+    return LogParser(preset, columns).parse(source, numpy=numpy)
@@ -0,0 +1,898 @@
+# coding=utf-8
+
+__author__ = "Brian O'Neill"
+
+__doc__ = """ \
+.. _queue-handlers-module:
+
+A managed listener for the queue-based approach to multiprocess logging
+(*Python 3 only*).
+
+The Logging Cookbook's recipe -- worker processes log to a ``QueueHandler``,
+and a thread in the main process takes records off the queue and hands them
+to the real handlers -- involves a queue, a hand-written listening loop, and
+two logging configurations that must agree. ``LogListener`` packages all
+that: it's created from the ``LCDict`` describing the real handlers, runs
+them in a dedicated process (or a thread), and supplies the configuration
+for workers::
+
+    lcd = LCDict(log_path='_log', root_level='DEBUG')
+    lcd.add_file_handler('file', filename='app.log', attach_to_root=True)
+    listener = lcd.start_listener()     # in a process of its own
+
+    # In each worker:
+    listener.worker_lcdict().config()
+    ...
+
+    # When the workers are done:
+    listener.stop()
+
+Worker-side options, passed to ``worker_lcdict`` (and ``add_queue_handler``):
+``batch_size`` puts records on the queue in batches; ``compact=True`` sends
+each record as a tuple of just the attributes that the listener's formatters
+use, rather than a pickled ``LogRecord``; ``policy`` says what to do when
+the queue -- bounded, if the listener was given a ``queue_size`` -- is full.
+A listener created with an ``express_level`` gives workers handlers that put
+records at or above that level on a second queue, which it empties first.
+"""
+
+import copy
+import ctypes
+import logging
+import logging.handlers
+import multiprocessing
+import multiprocessing.util
+import os
+import queue as queue_module
+import threading
+import time
+import weakref
+from multiprocessing.sharedctypes import RawArray
+
+from .format_parsing import record_fields
+from .record_codec import RecordCodec
+from .tcp_syslog import _flush_handler
+
+__all__ = ['LogListener',
+           'BatchingQueueHandler', 'BatchingQueueListener',
+           'CompactQueueHandler',
+           'BoundedQueueHandler',
+           'OffloadHandler', 'OffloadThread',
+           'PriorityQueueHandler', 'LaneStats']
+
+
+def _records(item, codec):
+    """Return a list of the records in an item taken off a queue:
+    a ``LogRecord``, a compactly encoded record (a tuple), or a batch
+    (a list) of either."""
+    if not isinstance(item, list):
+        item = [item]
+    return [codec.record_from_values(rec) if isinstance(rec, tuple) else rec
+            for rec in item]
+
+
+def _shard_handlers(lcdict, shards):
+    """After ``lcdict.config()``, offload those of its handlers that aren't
+    offloaded already to ``shards`` threads, assigning them in turn.
+    Return the ``OffloadHandler``\\s."""
+    names = [name for name in lcdict.handlers
+             if name not in lcdict._offloaded]
+    return lcdict._offload_handlers(
+        dict((name, 'shard %d' % (i % shards))
+             for i, name in enumerate(names)))
+
+
+def _dispatch(queue, codec, express_queue=None, stats=None):
+    """Body of a listener: pass records from ``queue`` to their loggers
+    until the sentinel ``None`` arrives. Compactly encoded records are
+    decoded by ``codec``.
+
+    If there's an ``express_queue``, records on it are handled before any
+    on ``queue``. For each express record, a ``PriorityQueueHandler`` also
+    puts ``_EXPRESS`` on ``queue``, to wake the listener if it's waiting
+    there; the listener counts the express records it has handled before
+    their markers arrived, so that a marker makes it wait for an express
+    record only if that record is still on its way. The latency of each
+    record is recorded in ``stats``, a ``LaneStats``, if it's given.
+    """
+    if express_queue is None:
+        while True:
+            item = queue.get()
+            if item is None:
+                break
+            for record in _records(item, codec):
+                logging.getLogger(record.name).handle(record)
+        return
+
+    def handle(item, lane):
+        for record in _records(item, codec):
+            logging.getLogger(record.name).handle(record)
+            if stats is not None:
+                stats.record(lane, time.time() - record.created)
+
+    def drain_express():
+        count = 0
+        while True:
+            try:
+                item = express_queue.get_nowait()
+            except queue_module.Empty:
+                return count
+            handle(item, LaneStats.EXPRESS)
+            count += 1
+
+    handled_early = 0
+    while True:
+        handled_early += drain_express()
+        item = queue.get()
+        if item is None:
+            break
+        if item == _EXPRESS:
+            if handled_early:
+                handled_early -= 1
+            else:
+                try:
+                    handle(express_queue.get(timeout=1.0), LaneStats.EXPRESS)
+                except queue_module.Empty:
+                    pass
+        else:
+            handle(item, LaneStats.NORMAL)
+    drain_express()
+
+
+def _listen_in_process(queue, fields, lcdict, express_queue, stats, shards):
+    """Body of a listening process: configure logging from ``lcdict``,
+    offloading its handlers to ``shards`` threads if that's positive,
+    and handle records until told to stop."""
+    lcdict.config()
+    if shards:
+        _shard_handlers(lcdict, shards)
+    _dispatch(queue, RecordCodec(fields), express_queue, stats)
+    logging.shutdown()              # drains the shards' queues
+
+
+class LogListener():
+    """
+    .. _LogListener:
+
+    Handles, on behalf of other processes, the records they log: configures
+    logging from an ``LCDict``, then passes each record it takes from its
+    queue to the logger it was logged to -- and thus to that logger's
+    handlers, and its ancestors', as configured by the ``LCDict``.
+
+    With ``process=True``, the listener runs in a dedicated process, so that
+    all file, syslog, email, etc. I/O happens there. Otherwise, it runs on a
+    thread of the process that starts it, whose logging is configured by
+    the ``LCDict``.
+
+    Usually created by ``LCDict.start_listener``.
+    """
+    def __init__(self, lcdict, queue=None, process=True, extra_fields=(),
+                 queue_size=0, express_level=None, shards=0):
+        """
+        :param lcdict: an ``LCDict`` that configures the handlers which
+            actually write records. Don't call its ``config()`` method:
+            the listener does that, in the listening process.
+        :param queue: the queue that workers put records on;
+            by default, a new ``multiprocessing.Queue``.
+        :param process: if true, listen in a new process;
+            otherwise, on a thread of this one.
+        :param extra_fields: record attributes that compactly encoded
+            records should carry besides those that ``lcdict``'s formatters
+            use -- for example, attributes that its filters examine.
+        :param queue_size: if ``queue`` isn't given and this is positive,
+            the new queue holds at most this many items. Workers' queue
+            handlers then block when it's full, unless ``worker_lcdict`` is
+            given another ``policy``. (Handlers with a ``batch_size``, and
+            those of a listener with an ``express_level``, take no
+            ``policy``: a record that finds the queue full goes to their
+            ``handleError``.)
+        :param express_level: if not ``None``, a level name or number:
+            workers put records at or above this level on a second queue,
+            ``express_queue``, which the listener always empties first, so
+            that they don't wait behind a backlog of lesser records. The
+            listener then keeps :ref:`LaneStats <LaneStats>` of the latency
+            of records in each lane, in ``lane_stats``.
+        :param shards: if positive, the listener passes records to the
+            handlers of ``lcdict`` on this many threads, each with its own
+            queue, rather than on its own thread: a slow handler then holds
+            up only the others in its shard. Handlers are assigned to
+            shards in turn, and each handles its records in order. (Handlers
+            that ``lcdict`` offloads itself keep their own threads.)
+        """
+        self.lcdict = lcdict
+        self.queue = (multiprocessing.Queue(queue_size) if queue is None
+                      else queue)
+        self.queue_size = queue_size if queue is None else 0
+        self.process = process
+        self.extra_fields = tuple(extra_fields)
+        self.express_level = express_level
+        self.shards = shards
+        if express_level is None:
+            self.express_queue = self.lane_stats = None
+        else:
+            # Workers are processes even when the listener is a thread
+            self.express_queue = multiprocessing.Queue()
+            self.lane_stats = LaneStats()
+        self._runner = None
+
+    @property
+    def fields(self):
+        """The record attributes that compactly encoded records carry:
+        those that the formatters of the ``LCDict`` use (see
+        :ref:`record_fields <format-parsing-module>`), and ``extra_fields``.
+        """
+        extra = self.extra_fields
+        if self.express_level is not None:
+            extra += ('created',)       # for latency statistics
+        return record_fields(self.lcdict, extra)
+
+    def __getstate__(self):
+        # Workers started by spawn or forkserver receive a listener
+        # without its process or thread.
+        state = self.__dict__.copy()
+        state['_runner'] = None
+        return state
+
+    def worker_lcdict(self, compact=False, **kwargs):
+        """Return a new ``LCDict`` with which worker processes can configure
+        logging: it has a queue handler, named ``'queue'``, attached to the
+        root, which puts records on ``self.queue``. The levels of the root
+        and of the loggers are those in the listener's ``LCDict``, so
+        workers send only the records the listener might write.
+        Workers call its ``config()`` method. You can add more to it first.
+
+        :param compact: if true, the queue handler sends records as tuples
+            of the attributes in ``self.fields``.
+        :param kwargs: keyword arguments for ``add_queue_handler``, e.g.
+            ``batch_size``. If the listener's queue is bounded, ``policy``
+            is ``'block'`` unless given (or ``batch_size`` is).
+        """
+        if compact:
+            kwargs['fields'] = self.fields
+        if self.express_queue is not None:
+            kwargs['express_queue'] = self.express_queue
+            kwargs['express_level'] = self.express_level
+        elif self.queue_size > 0 and not kwargs.get('batch_size'):
+            kwargs.setdefault('policy', 'block')
+        from .lcdict import LCDict
+        lcd = LCDict(root_level=self.lcdict.root.get('level', 'WARNING'),
+                     attach_handlers_to_root=True)
+        for name, logger_dict in self.lcdict.loggers.items():
+            # propagate=True: a forked worker may have inherited the
+            # listener's configuration, as when it's a thread
+            lcd.add_logger(name,
+                           level=logger_dict.get('level', 'NOTSET'),
+                           propagate=True)
+        lcd.add_queue_handler('queue', queue=self.queue, **kwargs)
+        return lcd
+
+    def start(self):
+        """Start listening. Returns ``self``."""
+        if self.process:
+            self._runner = multiprocessing.Process(
+                target=_listen_in_process,
+                args=(self.queue, self.fields, self.lcdict,
+                      self.express_queue, self.lane_stats, self.shards),
+                name='LogListener')
+        else:
+            self.lcdict.config()
+            sharded = (_shard_handlers(self.lcdict, self.shards)
+                       if self.shards else [])
+            self._runner = threading.Thread(
+                target=self._listen_on_thread, args=(sharded,),
+                name='LogListener')
+            self._runner.daemon = True
+        self._runner.start()
+        return self
+
+    def _listen_on_thread(self, sharded):
+        try:
+            _dispatch(self.queue, RecordCodec(self.fields),
+                      self.express_queue, self.lane_stats)
+        finally:
+            for handler in sharded:
+                handler.flush()
+
+    def stop(self, timeout=None):
+        """Handle every record already on the queue, then stop listening.
+        Call this after the workers have finished -- e.g. after they've been
+        joined.
+
+        :param timeout: the most seconds to wait for the listener to finish.
+        """
+        if self._runner:
+            self.queue.put(None)
+            self._runner.join(timeout)
+            self._runner = None
+
+    def __enter__(self):
+        if not self._runner:
+            self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+#############################################################################
+# Batching
+#############################################################################
+
+class BatchingQueueHandler(logging.handlers.QueueHandler):
+    """
+    .. _BatchingQueueHandler:
+
+    A ``QueueHandler`` that puts records on the queue in batches -- lists --
+    rather than one at a time, so that a batch costs one ``put``: one
+    pickling, one pipe write, one acquisition of the queue's locks.
+
+    Each process accumulates prepared records in a private buffer, and
+    puts the buffer on the queue when any of the following occurs:
+
+        * it holds ``batch_size`` records;
+        * a record is logged whose level is at least ``flush_level``;
+        * a record is logged at least ``flush_interval`` seconds after
+          the previous batch was put;
+        * ``flush()`` or ``close()`` is called, or the process exits.
+
+    ``flush_interval`` is checked only when records are emitted.
+
+    If ``fields`` is given, records are encoded compactly, as by
+    :ref:`CompactQueueHandler <CompactQueueHandler>`.
+
+    The listener must accept batches: a :ref:`LogListener <LogListener>`
+    or a :ref:`BatchingQueueListener <BatchingQueueListener>`.
+    """
+    def __init__(self, queue,
+                 batch_size=100,
+                 flush_interval=1.0,
+                 flush_level='ERROR',
+                 fields=None):
+        """
+        :param queue: the queue to put batches on
+        :param batch_size: number of records to accumulate before putting
+        :param flush_interval: seconds; if not ``None``, put the buffer when
+            a record is logged at least this long after the previous put.
+        :param flush_level: a level name or number; records at or above
+            this level cause the buffer to be put immediately.
+        :param fields: if not ``None``, send each record as a tuple of
+            the values of these attributes.
+        """
+        super(BatchingQueueHandler, self).__init__(queue)
+        self.codec = None if fields is None else RecordCodec(fields)
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = flush_interval
+        self.flush_level = logging._checkLevel(flush_level)
+        self._buffer = []
+        self._buffer_pid = None
+        self._last_put = time.time()
+
+    def _check_pid(self):
+        """A child process created by ``fork`` inherits a copy of its
+        parent's buffer, which the parent will put itself: discard it.
+        In each process, arrange for the buffer to be put when the
+        process exits -- before ``multiprocessing`` shuts down the
+        queue's feeder thread.
+        """
+        pid = os.getpid()
+        if pid != self._buffer_pid:
+            self._buffer = []
+            self._buffer_pid = pid
+            multiprocessing.util.Finalize(self, _flush_handler,
+                                          args=(weakref.ref(self),),
+                                          exitpriority=100)
+
+    def prepare(self, record):
+        """Prepare a record for queuing, encoding it if ``fields``
+        was given."""
+        if self.codec is None:
+            return super(BatchingQueueHandler, self).prepare(record)
+        return self.codec.values(record)
+
+    def _put_buffer(self):
+        self._check_pid()
+        if self._buffer:
+            batch, self._buffer = self._buffer, []
+            self.enqueue(batch)
+        self._last_put = time.time()
+
+    def emit(self, record):
+        """Prepare and buffer a logging record, putting the buffer on the
+        queue if it's time to. Called by `logging`.
+        """
+        try:
+            self._check_pid()
+            self._buffer.append(self.prepare(record))
+            if (len(self._buffer) >= self.batch_size
+                or record.levelno >= self.flush_level
+                or (self.flush_interval is not None and
+                    record.created - self._last_put >= self.flush_interval)
+               ):
+                self._put_buffer()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        """Put any buffered records on the queue. Called by `logging`.
+        """
+        self.acquire()
+        try:
+            self._put_buffer()
+        finally:
+            self.release()
+
+    def close(self):
+        """Put any buffered records on the queue, then close the handler.
+        Called by `logging`.
+        """
+        self.flush()
+        super(BatchingQueueHandler, self).close()
+
+
+class BatchingQueueListener(logging.handlers.QueueListener):
+    """
+    .. _BatchingQueueListener:
+
+    A ``QueueListener`` that also accepts batches of records, as put on the
+    queue by a :ref:`BatchingQueueHandler <BatchingQueueHandler>`, and
+    compactly encoded records, as put by a
+    :ref:`CompactQueueHandler <CompactQueueHandler>`.
+    """
+    def __init__(self, queue, *handlers, **kwargs):
+        """
+        :param queue: the queue to take records from
+        :param handlers: the handlers to pass them to
+        :param respect_handler_level: (keyword-only) as for
+            ``QueueListener``
+        :param fields: (keyword-only) the ``fields`` of the handlers that
+            put compactly encoded records on the queue.
+        """
+        self.codec = RecordCodec(kwargs.pop('fields', None))
+        super(BatchingQueueListener, self).__init__(queue, *handlers, **kwargs)
+
+    def handle(self, record):
+        """Handle a record, or each record in a batch."""
+        for rec in _records(record, self.codec):
+            super(BatchingQueueListener, self).handle(rec)
+
+
+#############################################################################
+# Compact encoding
+#############################################################################
+
+class CompactQueueHandler(logging.handlers.QueueHandler):
+    """
+    .. _CompactQueueHandler:
+
+    A ``QueueHandler`` that sends each record as a tuple of the values of
+    just the attributes that the listener's formatters use, rather than
+    a ``LogRecord`` with its entire ``__dict__``. That's less to pickle
+    and to transmit. The message is merged with its arguments, and any
+    exception rendered as text, as ``QueueHandler.prepare`` does.
+
+    The listener must decode the tuples, with the same ``fields``:
+    a :ref:`LogListener <LogListener>` (whose ``fields`` property gives
+    them) or a :ref:`BatchingQueueListener <BatchingQueueListener>`.
+    """
+    def __init__(self, queue, fields=None):
+        """
+        :param queue: the queue to put records on
+        :param fields: the record attributes to send, as for ``RecordCodec``
+        """
+        super(CompactQueueHandler, self).__init__(queue)
+        self.codec = RecordCodec(fields)
+
+    def prepare(self, record):
+        """Return the tuple to put on the queue for ``record``."""
+        return self.codec.values(record)
+
+
+#############################################################################
+# Bounded queues
+#############################################################################
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """
+    .. _BoundedQueueHandler:
+
+    A ``QueueHandler`` for a bounded queue (e.g. ``multiprocessing.Queue(N)``),
+    which does what ``policy`` says when the queue is full:
+
+        ``'block'``        wait for room -- at most ``timeout`` seconds,
+                           if that's not ``None``; then drop the record
+        ``'drop_newest'``  drop the record
+        ``'drop_oldest'``  remove the oldest item from the queue, and discard
+                           it, to make room
+        ``'drop_below'``   drop the record if its level is below
+                           ``drop_level``; otherwise, as for ``'block'``
+
+    The handler counts the records it drops, or discards from the queue, in
+    its attribute ``dropped``, and keeps the greatest queue size it has seen
+    after a put in ``high_water`` (which stays ``None`` on platforms where
+    ``multiprocessing.Queue.qsize`` isn't implemented). Each process has its
+    own counts. ``stats()`` returns both.
+
+    If ``fields`` is given, records are encoded compactly, as by
+    :ref:`CompactQueueHandler <CompactQueueHandler>`.
+    """
+    POLICIES = ('block', 'drop_newest', 'drop_oldest', 'drop_below')
+
+    def __init__(self, queue,
+                 policy='block',
+                 timeout=None,
+                 drop_level='WARNING',
+                 fields=None):
+        """
+        :param queue: the queue to put records on
+        :param policy: one of ``POLICIES``
+        :param timeout: for ``'block'`` and ``'drop_below'``, the most
+            seconds to wait for room in the queue; ``None`` means no limit.
+        :param drop_level: for ``'drop_below'``, the lowest level of records
+            that aren't dropped when the queue is full.
+        :param fields: if not ``None``, send each record as a tuple of
+            the values of these attributes.
+        """
+        if policy not in self.POLICIES:
+            raise ValueError("policy must be one of %s, not '%s'"
+                             % (', '.join(self.POLICIES), policy))  # | raise
+        super(BoundedQueueHandler, self).__init__(queue)
+        self.policy = policy
+        self.timeout = timeout
+        self.drop_level = logging._checkLevel(drop_level)
+        self.codec = None if fields is None else RecordCodec(fields)
+        self.dropped = 0
+        self.high_water = None
+
+    def prepare(self, record):
+        """Prepare a record for queuing, encoding it if ``fields``
+        was given."""
+        if self.codec is None:
+            return super(BoundedQueueHandler, self).prepare(record)
+        return self.codec.values(record)
+
+    def _put(self, item, levelno):
+        """Put ``item`` on the queue as ``policy`` says.
+        Return true if it was put, false if it was dropped."""
+        q = self.queue
+        policy = self.policy
+        try:
+            if policy == 'drop_newest' or (policy == 'drop_below' and
+                                           levelno < self.drop_level):
+                q.put_nowait(item)
+            elif policy == 'drop_oldest':
+                for _ in range(10):     # other producers may take the room
+                    try:
+                        q.put_nowait(item)
+                        break
+                    except queue_module.Full:
+                        try:
+                            q.get_nowait()
+                            self.dropped += 1
+                        except queue_module.Empty:
+                            pass
+                else:
+                    raise queue_module.Full
+            else:
+                q.put(item, True, self.timeout)
+        except queue_module.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def emit(self, record):
+        """Put a logging record on the queue, according to ``policy`` if
+        the queue is full. Called by `logging`.
+        """
+        try:
+            if self._put(self.prepare(record), record.levelno):
+                try:
+                    size = self.queue.qsize()
+                except NotImplementedError:
+                    return
+                if self.high_water is None or size > self.high_water:
+                    self.high_water = size
+        except Exception:
+            self.handleError(record)
+
+    def stats(self):
+        """Return a dict: ``{'dropped': ..., 'high_water': ...}``."""
+        return {'dropped': self.dropped, 'high_water': self.high_water}
+
+
+#############################################################################
+# Offloading a handler to a thread
+#############################################################################
+
+class OffloadThread():
+    """
+    .. _OffloadThread:
+
+    A thread, with an in-process queue, that passes records to the handlers
+    of one or more :ref:`OffloadHandler <OffloadHandler>`\\s. Records for any
+    one handler are handled in the order they were queued.
+
+    The thread stops when the last handler using it is closed. In a child
+    process created by ``fork``, it's restarted when the first record is
+    queued.
+    """
+    def __init__(self, name='OffloadThread'):
+        """
+        :param name: the name of the thread
+        """
+        self.name = name
+        self._users = 0
+        self._lock = threading.Lock()
+        self._start()
+
+    def _start(self):
+        self._pid = os.getpid()
+        # SimpleQueue is faster, but new in Python 3.7
+        self.queue = getattr(queue_module, 'SimpleQueue', queue_module.Queue)()
+        self._thread = threading.Thread(target=self._handle_queued,
+                                        name=self.name)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _handle_queued(self):
+        """Body of the thread: handle ``(handler, record)`` pairs until the
+        sentinel ``None`` arrives. A ``threading.Event`` on the queue is a
+        flush request."""
+        q = self.queue
+        while True:
+            item = q.get()
+            if item is None:
+                break
+            if isinstance(item, threading.Event):
+                item.set()
+                continue
+            handler, record = item
+            try:
+                handler.handle(record)
+            except Exception:
+                handler.handleError(record)
+
+    def put(self, handler, record):
+        """Queue ``record`` for ``handler``."""
+        if self._pid != os.getpid():
+            self._start()
+        self.queue.put((handler, record))
+
+    def _running(self):
+        return (self._pid == os.getpid() and self._thread is not None
+                and self._thread.is_alive())
+
+    def flush(self):
+        """Wait until every record queued so far has been handled."""
+        if self._running():
+            done = threading.Event()
+            self.queue.put(done)
+            done.wait()
+
+    def attach(self):
+        """Note another handler using the thread."""
+        with self._lock:
+            self._users += 1
+
+    def detach(self):
+        """Note that a handler no longer uses the thread; if none does,
+        handle every queued record, then stop the thread."""
+        with self._lock:
+            self._users -= 1
+            if self._users > 0:
+                return
+            if self._running():
+                self.queue.put(None)
+                self._thread.join()
+            self._thread = None
+
+
+class OffloadHandler(logging.Handler):
+    """
+    .. _OffloadHandler:
+
+    Passes records to another handler, ``target``, on another thread,
+    so that the threads that log never wait for ``target``'s I/O -- an SMTP
+    exchange, a syslog connection, a slow disk. ``emit`` just puts the record
+    on the in-process queue of an :ref:`OffloadThread <OffloadThread>` --
+    its own, or one it shares with other offloaded handlers -- which calls
+    ``target.handle``, applying ``target``'s filters and formatter.
+    What's queued is a shallow copy of the record, as ``QueueHandler.prepare``
+    makes, because formatting sets attributes of the record (``message``,
+    ``asctime``, ``exc_text``), and other handlers -- on other threads --
+    format it too. Records are merged with their arguments on that thread,
+    so don't mutate arguments after logging them.
+
+    The handler's level is ``target``'s, so records that ``target`` would
+    ignore aren't queued. ``flush()`` waits until every record queued so far
+    has been handled; ``close()`` does that and stops the thread, if no
+    other handler uses it, but doesn't close ``target``.
+
+    Created by ``LCDict.config()`` for handlers added with ``offload``.
+    """
+    def __init__(self, target, thread=None):
+        """
+        :param target: the handler to offload
+        :param thread: an ``OffloadThread`` to share;
+            by default, a new one.
+        """
+        super(OffloadHandler, self).__init__(level=target.level)
+        self.target = target
+        if thread is None:
+            thread = OffloadThread(
+                name='OffloadHandler(%s)' % (target.name or ''))
+        self.thread = thread
+        thread.attach()
+
+    def emit(self, record):
+        """Queue a copy of a logging record for ``target``. Called by
+        `logging`.
+        """
+        try:
+            thread = self.thread
+            if thread is None:
+                raise ValueError("OffloadHandler is closed")        # | raise
+            thread.put(self.target, copy.copy(record))
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        """Wait until every record queued so far has been handled, then
+        flush ``target``. Called by `logging`.
+        """
+        if self.thread is not None:
+            self.thread.flush()
+        self.target.flush()
+
+    def close(self):
+        """Handle every queued record, and stop the thread if no other
+        handler uses it. Called by `logging`.
+        """
+        self.acquire()
+        try:
+            if self.thread is not None:
+                self.thread.flush()
+                self.thread.detach()
+                self.thread = None
+            super(OffloadHandler, self).close()
+        finally:
+            self.release()
+
+
+#############################################################################
+# Priority lanes
+#############################################################################
+
+# Put on the normal queue for each record put on the express queue
+_EXPRESS = '__express__'
+
+
+class PriorityQueueHandler(logging.handlers.QueueHandler):
+    """
+    .. _PriorityQueueHandler:
+
+    A ``QueueHandler`` with two lanes: it puts records at or above
+    ``express_level`` on ``express_queue``, and others on ``queue``.
+    A :ref:`LogListener <LogListener>` created with an ``express_level``
+    empties the express queue before taking anything from the other one,
+    so that errors aren't held up behind a backlog of debug messages.
+
+    For each express record, the handler also puts a small marker on
+    ``queue``, which wakes the listener if it's idle.
+
+    If ``fields`` is given, records are encoded compactly, as by
+    :ref:`CompactQueueHandler <CompactQueueHandler>`; include ``'created'``
+    for the listener's latency statistics to be meaningful.
+    """
+    def __init__(self, queue, express_queue,
+                 express_level='ERROR',
+                 fields=None):
+        """
+        :param queue: the queue for records below ``express_level``
+        :param express_queue: the queue for the others
+        :param express_level: a level name or number
+        :param fields: if not ``None``, send each record as a tuple of
+            the values of these attributes.
+        """
+        super(PriorityQueueHandler, self).__init__(queue)
+        self.express_queue = express_queue
+        self.express_level = logging._checkLevel(express_level)
+        self.codec = None if fields is None else RecordCodec(fields)
+
+    def prepare(self, record):
+        """Prepare a record for queuing, encoding it if ``fields``
+        was given."""
+        if self.codec is None:
+            return super(PriorityQueueHandler, self).prepare(record)
+        return self.codec.values(record)
+
+    def emit(self, record):
+        """Put a logging record on the queue for its lane.
+        Called by `logging`.
+        """
+        try:
+            item = self.prepare(record)
+            if record.levelno >= self.express_level:
+                self.express_queue.put_nowait(item)
+                self.queue.put_nowait(_EXPRESS)
+            else:
+                self.queue.put_nowait(item)
+        except Exception:
+            self.handleError(record)
+
+
+class LaneStats():
+    """
+    .. _LaneStats:
+
+    For each lane of a :ref:`LogListener <LogListener>` with an
+    ``express_level`` -- ``EXPRESS`` and ``NORMAL`` -- the number of records
+    handled, and their latencies: the time from the creation of each record
+    until the listener had handled it. Kept in shared memory, so that the
+    process that started a listener can read the statistics of a listener
+    process with ``snapshot()``.
+
+    Each histogram has ``NUM_BUCKETS`` buckets, as for
+    :ref:`LockStats <LockStats>`: bucket 0 counts latencies under 1
+    microsecond, and bucket `i` > 0 counts latencies of at least
+    ``2**(i-1)`` and less than ``2**i`` microseconds; the last bucket
+    also counts all longer latencies.
+
+    Only the listener updates the statistics, so no lock is needed.
+    """
+    NUM_BUCKETS = 32
+    EXPRESS = 0
+    NORMAL = 1
+    LANE_NAMES = ('express', 'normal')
+
+    # Indexes into a lane's part of self._data
+    _COUNT = 0
+    _TOTAL = 1
+    _MAX = 2
+    _HIST = 3
+    _LANE_SIZE = _HIST + NUM_BUCKETS
+
+    def __init__(self):
+        self._data = RawArray(ctypes.c_longlong, 2 * self._LANE_SIZE)
+
+    def record(self, lane, seconds):
+        """Record the handling of one record of ``lane``, ``seconds``
+        after its creation."""
+        ns = max(0, int(seconds * 1e9))
+        data = self._data
+        base = lane * self._LANE_SIZE
+        data[base + self._COUNT] += 1
+        data[base + self._TOTAL] += ns
+        if ns > data[base + self._MAX]:
+            data[base + self._MAX] = ns
+        data[base + self._HIST +
+             min((ns // 1000).bit_length(), self.NUM_BUCKETS - 1)] += 1
+
+    def snapshot(self):
+        """Return the statistics as a dict::
+
+            {'express': {'count': int, 'total': float, 'max': float,
+                         'mean': float, 'histogram': [int, ...]},
+             'normal': {...same keys...}}
+
+        Times are in seconds; ``'histogram'`` is a list of ``NUM_BUCKETS``
+        counts.
+        """
+        data = list(self._data)
+        result = {}
+        for lane, lane_name in enumerate(self.LANE_NAMES):
+            base = lane * self._LANE_SIZE
+            count = data[base + self._COUNT]
+            total = data[base + self._TOTAL] / 1e9
+            result[lane_name] = {
+                'count': count,
+                'total': total,
+                'max': data[base + self._MAX] / 1e9,
+                'mean': total / count if count else 0.0,
+                'histogram': data[base + self._HIST:
+                                  base + self._HIST + self.NUM_BUCKETS]}
+        return result
+
+    def reset(self):
+        """Zero all the statistics."""
+        for i in range(len(self._data)):
+            self._data[i] = 0
@@ -0,0 +1,117 @@
+# coding=utf-8
+
+__author__ = "Brian O'Neill"
+
+__doc__ = """ \
+.. _record-codec-module:
+
+Compact, fast serialization of ``LogRecord``\\s, for transports that carry
+records from one process to another.
+
+Rather than pickling a record's whole ``__dict__``, a ``RecordCodec``
+``marshal``\\s a tuple of the values of a fixed sequence of attributes,
+after merging the message with its arguments and rendering any exception
+as text -- just what ``QueueHandler.prepare`` does. On the receiving side,
+``decode`` rebuilds a ``LogRecord`` that handlers and formatters can use
+as usual.
+"""
+
+import logging
+import marshal
+import sys
+
+__all__ = ['RecordCodec']
+
+# Everything a formatter can refer to, apart from 'message' and 'asctime',
+# which formatters compute themselves; 'args' and 'exc_info' are folded
+# into 'msg' and 'exc_text'.
+RECORD_FIELDS = (
+    'name', 'msg', 'levelno', 'levelname',
+    'pathname', 'filename', 'module', 'lineno', 'funcName',
+    'created', 'msecs', 'relativeCreated',
+    'thread', 'threadName', 'process', 'processName',
+    'exc_text', 'stack_info',
+)
+if sys.version_info >= (3, 12):
+    RECORD_FIELDS += ('taskName',)
+
+_formatter = logging.Formatter()
+
+
+class RecordCodec():
+    """
+    .. _RecordCodec:
+
+    Encodes ``LogRecord``\\s as ``bytes``, and decodes them. Both ends of a
+    transport must use codecs with the same ``fields``.
+    """
+    def __init__(self, fields=None):
+        """
+        :param fields: a sequence of ``LogRecord`` attribute names to
+            transmit; by default, ``RECORD_FIELDS``. ``'msg'`` is always
+            transmitted, and ``'levelno'`` and ``'name'``, which `logging`
+            needs to dispatch records, are always included too. Attributes
+            that aren't transmitted have, in decoded records, the values
+            that the receiving process would give them -- except
+            ``levelname``, which is derived from ``levelno``.
+        """
+        if fields is None:
+            fields = RECORD_FIELDS
+        fields = list(fields)
+        for required in ('levelno', 'name', 'msg'):
+            if required not in fields:
+                fields.append(required)
+        self.fields = tuple(fields)
+
+    def __eq__(self, other):
+        return isinstance(other, RecordCodec) and self.fields == other.fields
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return 'RecordCodec(fields=%r)' % (self.fields,)
+
+    def values(self, record):
+        """Return a tuple of the values of ``self.fields`` of ``record``,
+        after merging its message and arguments, and rendering any
+        exception info as text. Values that ``marshal`` can't handle
+        are converted to ``str``.
+        """
+        d = record.__dict__
+        msg = record.getMessage()
+        exc_text = d.get('exc_text')
+        if d.get('exc_info') and not exc_text:
+            exc_text = _formatter.formatException(record.exc_info)
+        values = []
+        for field in self.fields:
+            if field == 'msg':
+                value = msg
+            elif field == 'exc_text':
+                value = exc_text
+            else:
+                value = d.get(field)
+                if not (value is None or
+                        isinstance(value, (str, int, float))):
+                    value = str(value)
+            values.append(value)
+        return tuple(values)
+
+    def encode(self, record):
+        """Return ``record`` encoded as ``bytes``."""
+        return marshal.dumps(self.values(record))
+
+    def record_from_values(self, values):
+        """Return a ``LogRecord`` built from a tuple returned by
+        ``values``."""
+        d = dict(zip(self.fields, values))
+        d['args'] = None
+        d['exc_info'] = None
+        if 'levelname' not in d:
+            d['levelname'] = logging.getLevelName(d['levelno'])
+        return logging.makeLogRecord(d)
+
+    def decode(self, data):
+        """Return a ``LogRecord`` built from ``bytes`` returned by
+        ``encode``."""
+        return self.record_from_values(marshal.loads(data))
@@ -0,0 +1,160 @@
+# coding=utf-8
+
+__author__ = "Brian O'Neill"
+
+__doc__ = """ \
+.. _record-trimming-module:
+
+Stop `logging` from collecting ``LogRecord`` attributes that no formatter
+uses.
+
+Whenever a record is created, `logging` looks up the caller's file, line
+and function (walking the stack), and the current thread, process and
+``multiprocessing`` process name -- unless module-level switches say not to.
+``trim_record_collection`` sets those switches for the attributes nobody
+needs; ``LCDict.config(trim_records=...)`` calls it with the switches that
+``unused_switches`` finds for the ``LCDict``'s formatters.
+
+The switches are global to `logging`. To keep collecting everything for
+records at or above some level -- say, errors, whose origin you'll want --
+pass ``below_level``: a record factory then fills in the switched-off
+attributes of those records only.
+"""
+
+import logging
+import os
+import sys
+import threading
+
+__all__ = ['unused_switches',
+           'trim_record_collection', 'restore_record_collection']
+
+# The switches of `logging`, and the record attributes each controls.
+# Switching off '_srcfile' also loses ``stack_info``.
+COLLECTION_SWITCHES = (
+    ('_srcfile', ('pathname', 'filename', 'module', 'lineno', 'funcName')),
+    ('logThreads', ('thread', 'threadName')),
+    ('logProcesses', ('process',)),
+    ('logMultiprocessing', ('processName',)),
+)
+if hasattr(logging, 'logAsyncioTasks'):                     # Python 3.12+
+    COLLECTION_SWITCHES += (('logAsyncioTasks', ('taskName',)),)
+
+# Values of the switches, and the record factory, before trimming;
+# None if nothing is trimmed.
+_saved = None
+
+# Frames in these files are `logging`'s, not the caller's
+_logging_srcfile = os.path.normcase(logging.addLevelName.__code__.co_filename)
+_this_file = os.path.normcase(__file__)
+
+
+
+def unused_switches(fields):
+    """Return a list of the names of the ``COLLECTION_SWITCHES`` whose
+    attributes are all absent from ``fields``.
+
+    :param fields: names of ``LogRecord`` attributes that are needed -- e.g.
+        as returned by :ref:`attributes_needed <format-parsing-module>`.
+
+    >>> unused_switches(('name', 'msg', 'levelno', 'created', 'process'))
+    ['_srcfile', 'logThreads', 'logMultiprocessing']
+    """
+    fields = set(fields)
+    return [switch for switch, attributes in COLLECTION_SWITCHES
+            if not fields.intersection(attributes)]
+
+
+def trim_record_collection(switches, below_level=None):
+    """Turn off the given `logging` switches -- for all records, or, if
+    ``below_level`` isn't ``None``, for records below that level only.
+    Undoes any previous trimming first.
+
+    :param switches: names from ``COLLECTION_SWITCHES``
+    :param below_level: a level name or number, or ``None``
+    """
+    global _saved
+    restore_record_collection()
+    switches = list(switches)
+    if not switches:
+        return
+    _saved = dict((switch, getattr(logging, switch))
+                  for switch, _ in COLLECTION_SWITCHES)
+    _saved['factory'] = logging.getLogRecordFactory()
+    for switch in switches:
+        setattr(logging, switch, None if switch == '_srcfile' else False)
+    if below_level is not None:
+        logging.setLogRecordFactory(
+            _completing_factory(_saved['factory'], switches,
+                                logging._checkLevel(below_level)))
+
+
+def restore_record_collection():
+    """Undo ``trim_record_collection``."""
+    global _saved
+    if _saved is None:
+        return
+    logging.setLogRecordFactory(_saved.pop('factory'))
+    for switch, value in _saved.items():
+        setattr(logging, switch, value)
+    _saved = None
+
+
+def _completing_factory(factory, switches, level):
+    """Return a record factory that calls ``factory``, then, for records at
+    or above ``level``, fills in the attributes that ``switches`` turned
+    off."""
+    switches = frozenset(switches)
+
+    def make_record(*args, **kwargs):
+        record = factory(*args, **kwargs)
+        if record.levelno >= level:
+            _complete(record, switches)
+        return record
+
+    return make_record
+
+
+def _complete(record, switches):
+    """Set the attributes that `logging` didn't, as it would have."""
+    if '_srcfile' in switches:
+        record.pathname, record.lineno, record.funcName = _find_caller()
+        try:
+            record.filename = os.path.basename(record.pathname)
+            record.module = os.path.splitext(record.filename)[0]
+        except (TypeError, ValueError, AttributeError):
+            record.filename = record.pathname
+            record.module = "Unknown module"
+    if 'logThreads' in switches:
+        record.thread = threading.get_ident()
+        record.threadName = threading.current_thread().name
+    if 'logProcesses' in switches:
+        record.process = os.getpid()
+    if 'logMultiprocessing' in switches:
+        record.processName = 'MainProcess'
+        mp = sys.modules.get('multiprocessing')
+        if mp is not None:
+            try:
+                record.processName = mp.current_process().name
+            except Exception:
+                pass
+    if 'logAsyncioTasks' in switches:
+        record.taskName = None
+        asyncio = sys.modules.get('asyncio')
+        if asyncio:
+            try:
+                record.taskName = asyncio.current_task().get_name()
+            except Exception:
+                pass
+
+
+def _find_caller():
+    """Return ``(pathname, lineno, funcName)`` of the frame that called
+    `logging`, as ``Logger.findCaller`` would (ignoring ``stacklevel``)."""
+    f = sys._getframe(1)
+    while f is not None:
+        filename = os.path.normcase(f.f_code.co_filename)
+        if filename not in (_logging_srcfile, _this_file):
+            return f.f_code.co_filename, f.f_lineno, f.f_code.co_name
+        f = f.f_back
+    return "(unknown file)", 0, "(unknown function)"
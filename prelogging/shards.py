@@ -0,0 +1,208 @@
+# coding=utf-8
+
+__author__ = "Brian O'Neill"
+
+__doc__ = """ \
+.. _shards-module:
+
+Per-process ("sharded") logfiles, and a tool that merges them.
+
+A ``ShardedFileHandler`` writes the records of each process to a file of its
+own, so it needs no lock at all: cross-process coordination is deferred
+until the shards are merged, by ``merge_shards`` or from the command line::
+
+    $ python -m prelogging.shards merged.log _log/app.*.log
+
+``merge_shards`` performs a streaming k-way merge: it holds only one record
+per shard in memory at a time, however large the shards are.
+"""
+
+import glob
+import heapq
+import logging
+import multiprocessing
+import os
+import re
+import sys
+
+__all__ = ['ShardedFileHandler', 'shard_filenames', 'merge_shards']
+
+#############################################################################
+# ShardedFileHandler
+#############################################################################
+
+_unsafe_chars = re.compile(r'[^A-Za-z0-9_.-]+')
+
+
+def _shard_filename(filename, shard_by):
+    """Insert the shard key of the current process before the extension
+    of ``filename``: e.g. ``app.log`` becomes ``app.1234.log``."""
+    if shard_by == 'process_name':
+        key = _unsafe_chars.sub('_', multiprocessing.current_process().name)
+    else:
+        key = str(os.getpid())
+    root, ext = os.path.splitext(filename)
+    return '%s.%s%s' % (root, key, ext)
+
+
+def shard_filenames(filename):
+    """Return a sorted list of the existing shards of ``filename``
+    -- the names that ``ShardedFileHandler(filename)`` gives them.
+
+    :param filename: the ``filename`` passed to ``ShardedFileHandler``
+    """
+    root, ext = os.path.splitext(filename)
+    return sorted(glob.glob('%s.*%s' % (glob.escape(root), glob.escape(ext))))
+
+
+class ShardedFileHandler(logging.FileHandler):
+    """
+    .. _ShardedFileHandler:
+
+    A multiprocessing-safe handler class that writes formatted logging
+    records of each process to a separate file -- a *shard* -- without
+    locking.
+
+    The name of each shard is ``filename`` with the process's *shard key*
+    inserted before its extension: given ``filename='app.log'``, the process
+    with pid 1234 writes to ``app.1234.log``, or, with
+    ``shard_by='process_name'``, process ``'worker 1'`` writes to
+    ``app.worker_1.log``. Each process opens its shard the first time it
+    emits a record.
+    """
+    def __init__(self, filename,
+                 shard_by='pid',
+                 mode='a',
+                 encoding=None,
+                 **kwargs):
+        """
+        :param filename: logfile name from which shard names are derived.
+        :param shard_by: ``'pid'`` or ``'process_name'``: what distinguishes
+            the shards of different processes.
+        :param mode: the mode in which shards are opened.
+        :param encoding: if not ``None``, shards are opened with that encoding.
+        :param kwargs: other keyword arguments for ``logging.FileHandler``
+            (``delay`` is ignored: shards are always opened lazily).
+        """
+        if shard_by not in ('pid', 'process_name'):
+            raise ValueError("shard_by must be 'pid' or 'process_name', "
+                             "not '%s'" % shard_by)                 # | raise
+        kwargs.pop('delay', None)
+        super(ShardedFileHandler, self).__init__(
+            filename, mode=mode, encoding=encoding, delay=True, **kwargs)
+        self.shard_by = shard_by
+        self.unsharded_filename = self.baseFilename
+        self._shard_pid = None
+
+    def emit(self, record):
+        """Emit a logging record to this process's shard. Called by `logging`.
+        """
+        if self._shard_pid != os.getpid():
+            # First record of this process: (re)direct output to its shard
+            if self.stream:             # inherited through fork
+                self.stream.close()
+                self.stream = None
+            self.baseFilename = _shard_filename(self.unsharded_filename,
+                                                self.shard_by)
+            self._shard_pid = os.getpid()
+        super(ShardedFileHandler, self).emit(record)
+
+
+#############################################################################
+# merge_shards
+#############################################################################
+
+# A timestamp as rendered by ``asctime`` with the default date format,
+# e.g. '2016-07-09 18:19:34,012'. In this form, they sort chronologically.
+DEFAULT_TIMESTAMP_PATTERN = r'\d{4}-\d\d-\d\d \d\d:\d\d:\d\d,\d{3}'
+
+
+def _records(lines, timestamp_re):
+    """Group ``lines`` into records, yielding ``(timestamp, text)`` pairs.
+    A record begins with a line containing a timestamp; following lines
+    without one (e.g. tracebacks) belong to the same record.
+    Lines before the first timestamp form a record with timestamp ``''``.
+    """
+    key, text = '', []
+    for line in lines:
+        m = timestamp_re.search(line)
+        if m:
+            if text:
+                yield key, ''.join(text)
+            key = m.group(1) if timestamp_re.groups else m.group(0)
+            text = [line]
+        else:
+            text.append(line)
+    if text:
+        yield key, ''.join(text)
+
+
+def merge_shards(shards, output,
+                 timestamp_pattern=DEFAULT_TIMESTAMP_PATTERN,
+                 encoding=None):
+    """Merge logfiles, each already in chronological order, into one
+    chronologically ordered file, reading them all in parallel and holding
+    only one record of each in memory. Records with equal timestamps keep
+    the order of ``shards``.
+
+    :param shards: a sequence of filenames; or the ``filename`` passed to
+        a ``ShardedFileHandler``, whose existing shards will be merged.
+    :param output: a filename, or a writable text stream.
+    :param timestamp_pattern: a regular expression that matches the
+        timestamp of each record; if it has a group, group 1 is the
+        timestamp. Timestamps are compared as strings, so they must sort
+        chronologically -- as ``asctime`` with the default date format does.
+    :param encoding: encoding of the shards, and of ``output`` if that's
+        a filename.
+    :return: the number of records written.
+    """
+    if isinstance(shards, str):
+        shards = shard_filenames(shards)
+    timestamp_re = re.compile(timestamp_pattern)
+
+    files = [open(fn, 'r', encoding=encoding) for fn in shards]
+    out = (open(output, 'w', encoding=encoding) if isinstance(output, str)
+           else output)
+    count = 0
+    try:
+        for _, text in heapq.merge(*[_records(f, timestamp_re) for f in files],
+                                   key=lambda rec: rec[0]):
+            if not text.endswith('\n'):
+                text += '\n'
+            out.write(text)
+            count += 1
+    finally:
+        for f in files:
+            f.close()
+        if out is not output:
+            out.close()
+    return count
+
+
+def main(argv=None):
+    """Command-line interface to ``merge_shards``."""
+    import argparse
+    parser = argparse.ArgumentParser(
+        prog='python -m prelogging.shards',
+        description="Merge per-process logfiles into one, by timestamp.")
+    parser.add_argument('output', help="merged logfile to write, or - for stdout")
+    parser.add_argument('shards', nargs='+',
+                        help="shard files; or the single filename given to "
+                             "ShardedFileHandler, to merge all its shards")
+    parser.add_argument('--timestamp-pattern', default=DEFAULT_TIMESTAMP_PATTERN,
+                        help="regular expression matching record timestamps "
+                             "[default: asctime's default format]")
+    parser.add_argument('--encoding', default=None)
+    args = parser.parse_args(argv)
+
+    shards = args.shards[0] if len(args.shards) == 1 else args.shards
+    if isinstance(shards, str) and os.path.exists(shards):
+        shards = [shards]
+    merge_shards(shards,
+                 sys.stdout if args.output == '-' else args.output,
+                 timestamp_pattern=args.timestamp_pattern,
+                 encoding=args.encoding)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,351 @@
+# coding=utf-8
+
+__author__ = "Brian O'Neill"
+
+__doc__ = """ \
+.. _shm-ring-module:
+
+A shared-memory ring buffer that carries logging records from worker
+processes to a single consumer (*Python 3.8+*).
+
+``logging.handlers.QueueHandler`` with a ``multiprocessing.Queue`` pickles
+every ``LogRecord``, hands it to a feeder thread, and writes it to a pipe.
+Here, instead, a worker's ``ShmRingHandler`` encodes each record compactly
+with a :ref:`RecordCodec <RecordCodec>` and copies the bytes directly into
+a slot of a ``ShmRing`` -- a fixed array of slots in
+``multiprocessing.shared_memory``. A ``ShmRingListener`` in the consuming
+process decodes the records and passes them to that process's handlers,
+typically configured by an ``LCDict``::
+
+    ring = ShmRing(slots=8192, slot_size=512, policy='block')
+
+    # Workers (forked after the ring is created, or passed it as an argument):
+    LCDict(attach_handlers_to_root=True).add_shm_ring_handler(
+        'ring', ring=ring).config()
+
+    # Consumer, whose LCDict configures the real handlers:
+    listener = ShmRingListener(ring)
+    listener.start()
+    ...
+    listener.stop()
+    ring.close()
+"""
+
+import logging
+import multiprocessing
+import os
+import struct
+import threading
+import time
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:         # Python < 3.8
+    shared_memory = None
+
+from .record_codec import RecordCodec
+
+__all__ = ['ShmRing', 'ShmRingHandler', 'ShmRingListener']
+
+#############################################################################
+# ShmRing
+#############################################################################
+
+# Header: eight unsigned 64-bit counters at the start of the shared memory
+_HEAD, _TAIL, _WRITTEN, _DROPPED, _OVERWRITTEN, _OVERSIZED, _HIGH_WATER = range(7)
+_HEADER_SIZE = 8 * 8
+
+_LENGTH = struct.Struct('I')    # each slot: length of data, then the data
+
+
+class ShmRing():
+    """
+    .. _ShmRing:
+
+    A bounded, multi-producer, single-consumer ring of fixed-size slots in
+    shared memory, each holding one encoded record.
+
+    Producers and the consumer briefly take a ``multiprocessing.Lock`` to
+    claim a slot and copy data in or out of it; a ``multiprocessing.Semaphore``
+    counts the records in the ring, so that the consumer can sleep while
+    it's empty.
+
+    What ``put`` does when the ring is full depends on ``policy``:
+
+        ``'block'``      wait for a free slot -- at most ``block_timeout``
+                         seconds, if that's not ``None``, after which the
+                         record is dropped
+        ``'drop'``       drop the new record
+        ``'overwrite'``  overwrite the oldest record in the ring
+
+    Records too long for a slot are always dropped. ``stats()`` returns
+    counts of all these events.
+
+    A ``ShmRing`` is inherited by processes forked after its creation, and
+    can be passed as an argument to processes started with other methods.
+    The creating process should call ``close()`` when it's done with the ring.
+    """
+    POLICIES = ('block', 'drop', 'overwrite')
+
+    def __init__(self,
+                 slots=4096,
+                 slot_size=512,
+                 policy='block',
+                 block_timeout=None,
+                 codec=None):
+        """
+        :param slots: number of slots, i.e. the capacity of the ring.
+        :param slot_size: bytes per slot, including a 4-byte length.
+        :param policy: ``'block'``, ``'drop'`` or ``'overwrite'``.
+        :param block_timeout: for ``policy='block'``, maximum seconds to
+            wait for a free slot; ``None`` means no limit.
+        :param codec: the ``RecordCodec`` with which handlers encode records,
+            and listeners decode them; by default, ``RecordCodec()``.
+        """
+        if shared_memory is None:
+            raise NotImplementedError(
+                "ShmRing requires multiprocessing.shared_memory "
+                "(Python 3.8+)")                                    # | raise
+        if policy not in self.POLICIES:
+            raise ValueError("policy must be one of %s, not '%s'"
+                             % (', '.join(self.POLICIES), policy))  # | raise
+        if slot_size <= _LENGTH.size:
+            raise ValueError("slot_size must exceed %d" % _LENGTH.size)  # | raise
+        self.slots = int(slots)
+        self.slot_size = int(slot_size)
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.codec = codec or RecordCodec()
+        self._lock = multiprocessing.Lock()
+        self._items = multiprocessing.Semaphore(0)
+        self._shm = shared_memory.SharedMemory(
+            create=True, size=_HEADER_SIZE + self.slots * self.slot_size)
+        self._owner_pid = os.getpid()
+        self._attach()
+        for i in range(len(self._header)):
+            self._header[i] = 0
+
+    def _attach(self):
+        self._buf = self._shm.buf
+        self._header = self._buf[:_HEADER_SIZE].cast('Q')
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_shm'] = self._shm.name
+        del state['_buf'], state['_header']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._shm = shared_memory.SharedMemory(name=state['_shm'])
+        self._attach()
+
+    @property
+    def name(self):
+        """The name of the shared memory block."""
+        return self._shm.name
+
+    def __len__(self):
+        """Number of records in the ring."""
+        return self._header[_HEAD] - self._header[_TAIL]
+
+    def _slot_offset(self, index):
+        return _HEADER_SIZE + (index % self.slots) * self.slot_size
+
+    def _write_slot(self, index, data):
+        offset = self._slot_offset(index)
+        _LENGTH.pack_into(self._buf, offset, len(data))
+        offset += _LENGTH.size
+        self._buf[offset: offset + len(data)] = data
+
+    def put(self, data):
+        """Copy ``data`` (``bytes``) into the ring, according to ``policy``
+        if the ring is full.
+
+        :return: ``True`` if ``data`` was added, ``False`` if it was dropped.
+        """
+        header = self._header
+        if len(data) > self.slot_size - _LENGTH.size:
+            with self._lock:
+                header[_OVERSIZED] += 1
+            return False
+
+        deadline = (None if self.block_timeout is None
+                    else time.monotonic() + self.block_timeout)
+        delay = 0.0001
+        while True:
+            with self._lock:
+                head = header[_HEAD]
+                count = head - header[_TAIL]
+                if count < self.slots:
+                    self._write_slot(head, data)
+                    header[_HEAD] = head + 1
+                    header[_WRITTEN] += 1
+                    if count + 1 > header[_HIGH_WATER]:
+                        header[_HIGH_WATER] = count + 1
+                    self._items.release()
+                    return True
+                if self.policy == 'overwrite':
+                    # The oldest record's slot is the next one to write
+                    self._write_slot(head, data)
+                    header[_HEAD] = head + 1
+                    header[_TAIL] += 1
+                    header[_WRITTEN] += 1
+                    header[_OVERWRITTEN] += 1
+                    return True
+                if (self.policy == 'drop' or
+                    (deadline is not None and time.monotonic() >= deadline)):
+                    header[_DROPPED] += 1
+                    return False
+            time.sleep(delay)
+            delay = min(delay * 2, 0.01)
+
+    def get(self, timeout=None):
+        """Remove and return the oldest record in the ring, as ``bytes``,
+        waiting at most ``timeout`` seconds (forever, if ``None``)
+        for one to arrive.
+
+        :return: ``bytes``, or ``None`` if the ring remained empty.
+        """
+        if not self._items.acquire(timeout=timeout):
+            return None
+        header = self._header
+        with self._lock:
+            tail = header[_TAIL]
+            offset = self._slot_offset(tail)
+            length = _LENGTH.unpack_from(self._buf, offset)[0]
+            offset += _LENGTH.size
+            data = bytes(self._buf[offset: offset + length])
+            header[_TAIL] = tail + 1
+        return data
+
+    def stats(self):
+        """Return a dict of counters: records ``'written'``; records
+        ``'dropped'`` because the ring was full, and ``'oversized'``
+        records dropped because they didn't fit in a slot; records
+        ``'overwritten'`` before they were read; the ``'high_water'`` mark,
+        the greatest number of records ever in the ring; and the number
+        of records in the ring now, ``'pending'``.
+        """
+        header = self._header
+        return {'written': header[_WRITTEN],
+                'dropped': header[_DROPPED],
+                'oversized': header[_OVERSIZED],
+                'overwritten': header[_OVERWRITTEN],
+                'high_water': header[_HIGH_WATER],
+                'pending': header[_HEAD] - header[_TAIL]}
+
+    def close(self, unlink=None):
+        """Detach from the shared memory.
+
+        :param unlink: if true, also destroy the shared memory block. By
+            default, only the process that created the ring destroys it.
+        """
+        if self._header is None:
+            return
+        self._header.release()
+        self._header = self._buf = None
+        self._shm.close()
+        if unlink or (unlink is None and os.getpid() == self._owner_pid):
+            self._shm.unlink()
+
+
+#############################################################################
+# ShmRingHandler
+#############################################################################
+
+class ShmRingHandler(logging.Handler):
+    """
+    .. _ShmRingHandler:
+
+    A handler that encodes records with the codec of a ``ShmRing``
+    and puts them in the ring.
+    """
+    def __init__(self, ring, **kwargs):
+        """
+        :param ring: a ``ShmRing``
+        :param kwargs: as for ``logging.Handler``, e.g. ``level``
+        """
+        super(ShmRingHandler, self).__init__(**kwargs)
+        self.ring = ring
+
+    def emit(self, record):
+        """Encode a logging record and put it in the ring.
+        Called by `logging`.
+        """
+        try:
+            self.ring.put(self.ring.codec.encode(record))
+        except Exception:
+            self.handleError(record)
+
+
+#############################################################################
+# ShmRingListener
+#############################################################################
+
+class ShmRingListener():
+    """
+    .. _ShmRingListener:
+
+    Takes records from a ``ShmRing`` on a thread of its own, and passes
+    them to handlers -- like ``logging.handlers.QueueListener``.
+    """
+    def __init__(self, ring, *handlers, **kwargs):
+        """
+        :param ring: a ``ShmRing``
+        :param handlers: handlers to which to pass each record. If there
+            are none, each record is instead handled by the logger it was
+            logged to -- that is, by ``logging.getLogger(record.name)`` --
+            and so by whatever handlers that logger and its ancestors have
+            in the listening process.
+        :param respect_handler_level: (keyword-only) if true, pass records
+            only to ``handlers`` whose level they meet. [default: False]
+        """
+        self.ring = ring
+        self.handlers = handlers
+        self.respect_handler_level = kwargs.pop('respect_handler_level', False)
+        if kwargs:
+            raise TypeError("unexpected keyword arguments: %s"
+                            % ', '.join(kwargs))                    # | raise
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def handle(self, record):
+        """Pass ``record`` to the handlers, or to its logger."""
+        if not self.handlers:
+            logging.getLogger(record.name).handle(record)
+            return
+        for handler in self.handlers:
+            if (not self.respect_handler_level or
+                record.levelno >= handler.level):
+                handler.handle(record)
+
+    def _monitor(self):
+        ring = self.ring
+        decode = ring.codec.decode
+        while not self._stop_event.is_set():
+            data = ring.get(timeout=0.1)
+            if data is not None:
+                self.handle(decode(data))
+        # Drain
+        while True:
+            data = ring.get(timeout=0)
+            if data is None:
+                break
+            self.handle(decode(data))
+
+    def start(self):
+        """Start the listening thread."""
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._monitor,
+                                        name='ShmRingListener')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Handle every record still in the ring, then stop the listening
+        thread. Call this after the producers have finished."""
+        if self._thread:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,310 @@
+# coding=utf-8
+
+__author__ = "Brian O'Neill"
+
+__doc__ = """ \
+.. _slotted-records-module:
+
+A lean ``LogRecord`` replacement, for programs that log a great many records.
+
+A ``logging.LogRecord`` keeps its attributes in a per-instance ``dict``, and
+its constructor computes all of them: the level name, the file name and
+module from the path, milliseconds, time relative to startup, and the
+current thread, process and ``multiprocessing`` process name.
+A ``SlottedLogRecord`` keeps its attributes in ``__slots__``, and the
+constructor stores only what it's given and the time. The derived
+attributes (``levelname``, ``filename``, ``module``, ``msecs``,
+``relativeCreated``) are computed when they're first read, and the thread
+and process attributes are collected only if the formatters need them.
+
+Install one with ``LCDict.config(slotted_records=True)``, or::
+
+    logging.setLogRecordFactory(slotted_record_factory(fields))
+
+Formatters, and `logging` itself, read a record's attributes through its
+``__dict__``; for a ``SlottedLogRecord`` that's a mapping that reads and
+writes the attributes, computing derived ones on demand. Attributes set
+by ``extra`` arguments or by filters are kept in an ordinary ``dict``.
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+try:
+    from collections.abc import MutableMapping
+except ImportError:                 # Python 2
+    from collections import MutableMapping
+
+from .record_codec import RECORD_FIELDS
+
+__all__ = ['SlottedLogRecord', 'slotted_record_factory']
+
+
+class _RecordFields(object):
+    """The storage of a ``SlottedLogRecord``, without its ``__setattr__``:
+    the factory builds one of these, which is fast, then changes its class.
+    """
+    __slots__ = ('name', 'msg', 'args', 'levelno',
+                 'pathname', 'lineno', 'funcName',
+                 'created', 'exc_info', 'exc_text', 'stack_info',
+                 'thread', 'threadName', 'process', 'processName',
+                 'message', 'asctime',
+                 '_levelname', '_filename', '_module', '_msecs',
+                 '_relativeCreated', '_extra')
+
+    def __init__(self, name, level, pathname, lineno,
+                 msg, args, exc_info, func=None, sinfo=None, **kwargs):
+        self.name = name
+        self.msg = msg
+        # As in LogRecord: logger.debug("%(a)s", {'a': 1})
+        if (args and len(args) == 1 and isinstance(args[0], dict)
+                and args[0]):
+            args = args[0]
+        self.args = args
+        self.levelno = level
+        self.pathname = pathname
+        self.lineno = lineno
+        self.funcName = func
+        self.created = time.time()
+        self.exc_info = exc_info
+        self.exc_text = None
+        self.stack_info = sinfo
+        self.thread = self.threadName = None
+        self.process = self.processName = None
+        self._levelname = self._filename = self._module = None
+        self._msecs = self._relativeCreated = None
+
+
+# Attributes whose values are computed, when first read, from others
+_DERIVED = ('levelname', 'filename', 'module', 'msecs', 'relativeCreated')
+
+_PUBLIC_SLOTS = tuple(slot for slot in _RecordFields.__slots__
+                      if not slot.startswith('_'))
+_SETTABLE = frozenset(_RecordFields.__slots__ + _DERIVED)
+
+
+def _derived(name, compute):
+    """A property whose value is ``compute(record)``, computed when first
+    read, unless it's been set."""
+    slot = getattr(_RecordFields, '_' + name)
+    get_slot, set_slot = slot.__get__, slot.__set__
+
+    def get(self):
+        value = get_slot(self)
+        if value is None:
+            value = compute(self)
+            set_slot(self, value)
+        return value
+
+    return property(get, set_slot)
+
+
+def _filename(record):
+    try:
+        return os.path.basename(record.pathname)
+    except (TypeError, ValueError, AttributeError):
+        return record.pathname
+
+
+def _module(record):
+    try:
+        return os.path.splitext(_filename(record))[0]
+    except (TypeError, ValueError, AttributeError):
+        return "Unknown module"
+
+
+# When logging was imported, in seconds: from Python 3.13, logging._startTime
+# is time.time_ns()
+_start_time = (logging._startTime / 1e9
+               if isinstance(logging._startTime, int) else
+               logging._startTime)
+
+
+def _msecs(record):
+    # As in LogRecord (Python 3.11): see gh-89047
+    created_ns = int(record.created * 1e9)
+    return (created_ns % 1000000000) // 1000000 + 0.0
+
+
+class _AttributeMap(MutableMapping):
+    """The ``__dict__`` of a ``SlottedLogRecord``: a mapping of attribute
+    names to values, which reads and writes the record's attributes.
+    ``MutableMapping`` supplies ``update``, ``setdefault``, ``pop`` and
+    the rest, which ``logging.makeLogRecord`` and others use."""
+    __slots__ = ('_record',)
+
+    def __init__(self, record):
+        self._record = record
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self._record, key)
+        except AttributeError:
+            raise KeyError(key)                                     # | raise
+
+    def __setitem__(self, key, value):
+        setattr(self._record, key, value)
+
+    def __delitem__(self, key):
+        try:
+            delattr(self._record, key)
+        except AttributeError:
+            raise KeyError(key)                                     # | raise
+
+    def __contains__(self, key):
+        return hasattr(self._record, key)
+
+    def get(self, key, default=None):
+        return getattr(self._record, key, default)
+
+    def keys(self):
+        return self._record._attribute_names()
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def values(self):
+        return [self[key] for key in self.keys()]
+
+    def copy(self):
+        return dict(self.items())
+
+    def __or__(self, other):
+        d = self.copy()
+        d.update(other)
+        return d
+
+    def __ror__(self, other):
+        d = dict(other)
+        d.update(self.items())
+        return d
+
+
+class SlottedLogRecord(_RecordFields):
+    """
+    .. _SlottedLogRecord:
+
+    A ``LogRecord`` work-alike whose attributes are kept in ``__slots__``,
+    and whose derived attributes are computed only when they're read.
+    Other attributes -- e.g. those given by ``extra``, or added by filters
+    -- can be set as usual. It isn't a subclass of ``logging.LogRecord``.
+
+    Create them with a factory returned by ``slotted_record_factory``.
+    """
+    __slots__ = ()
+
+    getMessage = logging.LogRecord.getMessage
+
+    levelname = _derived('levelname',
+                         lambda record: logging.getLevelName(record.levelno))
+    filename = _derived('filename', _filename)
+    module = _derived('module', _module)
+    msecs = _derived('msecs', _msecs)
+    relativeCreated = _derived(
+        'relativeCreated',
+        lambda record: (record.created - _start_time) * 1000)
+
+    def __setattr__(self, name, value, _set=object.__setattr__):
+        if name in _SETTABLE:
+            _set(self, name, value)
+        else:
+            try:
+                extra = _RecordFields._extra.__get__(self)
+            except AttributeError:
+                extra = {}
+                _RecordFields._extra.__set__(self, extra)
+            extra[name] = value
+
+    def __getattr__(self, name):
+        # Called only when ``name`` isn't a set slot or a property
+        try:
+            return _RecordFields._extra.__get__(self)[name]
+        except (AttributeError, KeyError):
+            raise AttributeError(
+                "'SlottedLogRecord' object has no attribute '%s'"
+                % name)                                             # | raise
+
+    def __delattr__(self, name):
+        if name in _SETTABLE:
+            object.__delattr__(self, name)
+        else:
+            try:
+                del _RecordFields._extra.__get__(self)[name]
+            except (AttributeError, KeyError):
+                raise AttributeError(name)                          # | raise
+
+    @property
+    def __dict__(self):
+        return _AttributeMap(self)
+
+    def _attribute_names(self):
+        names = [slot for slot in _PUBLIC_SLOTS if hasattr(self, slot)]
+        names.extend(_DERIVED)
+        try:
+            names.extend(_RecordFields._extra.__get__(self))
+        except AttributeError:
+            pass
+        return names
+
+    def __reduce__(self):
+        # For pickling (e.g. onto a multiprocessing queue) and copying
+        # (e.g. by QueueHandler.prepare)
+        return _unreduce, (self.__dict__.copy(),)
+
+    def __repr__(self):
+        return '<SlottedLogRecord: %s, %s, %s, %s, "%s">' % (
+            self.name, self.levelno, self.pathname, self.lineno, self.msg)
+
+
+def _unreduce(attributes):
+    record = _RecordFields.__new__(SlottedLogRecord)
+    for name, value in attributes.items():
+        setattr(record, name, value)
+    return record
+
+
+def slotted_record_factory(fields=None):
+    """Return a record factory, for ``logging.setLogRecordFactory``, that
+    creates ``SlottedLogRecord``\\s. The thread, process, and
+    ``multiprocessing`` process name are collected only if some of
+    ``fields`` refer to them; otherwise they're ``None``.
+
+    :param fields: the record attributes that are needed, e.g. as returned
+        by :ref:`attributes_needed <format-parsing-module>`; by default,
+        all of ``RECORD_FIELDS``.
+    """
+    fields = set(RECORD_FIELDS if fields is None else fields)
+    threads = bool(fields & set(('thread', 'threadName')))
+    processes = 'process' in fields
+    process_names = 'processName' in fields
+    get_ident = threading.get_ident
+    current_thread = threading.current_thread
+    getpid = os.getpid
+
+    def factory(*args, **kwargs):
+        record = _RecordFields(*args, **kwargs)
+        if threads:
+            record.thread = get_ident()
+            record.threadName = current_thread().name
+        if processes:
+            record.process = getpid()
+        if process_names:
+            record.processName = 'MainProcess'
+            mp = sys.modules.get('multiprocessing')
+            if mp is not None:
+                try:
+                    record.processName = mp.current_process().name
+                except Exception:
+                    pass
+        record.__class__ = SlottedLogRecord
+        return record
+
+    return factory
@@ -0,0 +1,389 @@
+# coding=utf-8
+
+__author__ = "Brian O'Neill"
+
+__doc__ = """ \
+.. _socket-handlers-module:
+
+Ship records from any number of processes, on any number of hosts, to one
+process that writes them.
+
+``BatchingSocketHandler`` sends records in batches over a persistent TCP
+(or Unix domain stream) connection, each batch in one length-prefixed
+frame. A ``LogServer`` accepts those connections -- one reader thread per
+connection -- and passes every record it receives to the logger it was
+logged to, whose handlers are configured by an ``LCDict`` and shared by all
+the readers::
+
+    # On the aggregating host:
+    lcd = LCDict(log_path='/var/log/app', root_level='DEBUG')
+    lcd.add_file_handler('file', filename='app.log', attach_to_root=True)
+    LogServer(lcd, address=('0.0.0.0', 9020)).serve_forever()
+
+    # In each client process:
+    lcd = LCDict(root_level='DEBUG')
+    lcd.add_socket_handler('sock', address=('loghost', 9020),
+                           attach_to_root=True)
+    lcd.config()
+
+Only the server writes to the logfiles, so no file locking is needed.
+
+Records are sent either as pickled dicts, like those of
+``logging.handlers.SocketHandler``, or -- if the handler is given ``fields``
+-- as compactly encoded tuples of just those attributes (see
+:ref:`RecordCodec <RecordCodec>`). ``LogServer.client_lcdict(compact=True)``
+uses the attributes that the server's formatters refer to.
+
+**Security note**: the server unpickles what it receives. Like
+``logging.handlers.SocketHandler``'s receivers, it should listen only on
+addresses that untrusted parties can't reach.
+"""
+
+import io
+import logging
+import marshal
+import os
+import pickle
+import select
+import socket
+import socketserver
+import struct
+import threading
+import time
+from logging.handlers import DEFAULT_TCP_LOGGING_PORT
+
+from .format_parsing import record_fields
+from .record_codec import RecordCodec
+from .tcp_syslog import _BatchingStreamHandler
+
+__all__ = ['BatchingSocketHandler', 'LogServer']
+
+# Frame header: length of the payload, and how it's encoded
+_HEADER = struct.Struct('>LB')
+_PICKLED = 1        # record dicts, each pickled, one after another
+_COMPACT = 2        # marshalled fields, then value tuples, each marshalled
+
+
+class BatchingSocketHandler(_BatchingStreamHandler):
+    """
+    .. _BatchingSocketHandler:
+
+    A handler that sends records, in batches, over a persistent stream
+    connection to a :ref:`LogServer <LogServer>`.
+
+    Records are buffered, and the buffer is sent, as one frame, when any of
+    the following occurs:
+
+        * it holds ``batch_size`` records;
+        * a record is logged whose level is at least ``flush_level``;
+        * a record is logged at least ``flush_interval`` seconds after
+          the buffer was last sent;
+        * ``flush()`` or ``close()`` is called, or the process exits.
+
+    If connecting or sending fails, the handler closes the connection,
+    keeps the unsent records, and doesn't try to connect again for
+    ``retry_delay`` seconds, doubling that delay (up to ``max_retry_delay``)
+    after each further failure. While it's disconnected, at most
+    ``max_buffered`` records are kept; older ones are discarded, and
+    counted in the attribute ``dropped``. So are records that can't be
+    encoded.
+
+    Each process has its own buffer and connection, so no lock is needed.
+    """
+    def __init__(self,
+                 address=('localhost', DEFAULT_TCP_LOGGING_PORT),
+                 fields=None,
+                 batch_size=100,
+                 flush_interval=1.0,
+                 flush_level='ERROR',
+                 retry_delay=0.5,
+                 max_retry_delay=30.0,
+                 max_buffered=10000,
+                 timeout=5.0,
+                 **kwargs):
+        """
+        :param address: a ``(host, port)`` tuple for TCP, or a ``str``,
+            the path of a Unix domain stream socket.
+        :param fields: if not ``None``, send each record as a tuple of
+            the values of these attributes, rather than as a pickled dict
+            of all of them.
+        :param batch_size: number of records to accumulate before sending
+        :param flush_interval: seconds; if not ``None``, send the buffer
+            when a record is logged at least this long after the previous
+            send.
+        :param flush_level: a level name or number; records at or above
+            this level cause the buffer to be sent immediately.
+        :param retry_delay: seconds to wait before reconnecting after the
+            first failure
+        :param max_retry_delay: upper limit of the reconnection delay
+        :param max_buffered: the most records to keep while disconnected
+        :param timeout: socket timeout, in seconds, for connecting and
+            sending
+        :param kwargs: as for ``logging.Handler``, e.g. ``level``
+        """
+        self.codec = None if fields is None else RecordCodec(fields)
+        if self.codec is not None:
+            self._fields_bytes = marshal.dumps(self.codec.fields)
+        super(BatchingSocketHandler, self).__init__(
+            address,
+            batch_size=batch_size,
+            flush_interval=flush_interval,
+            flush_level=flush_level,
+            retry_delay=retry_delay,
+            max_retry_delay=max_retry_delay,
+            max_buffered=max_buffered,
+            timeout=timeout,
+            **kwargs)
+
+    def frame(self, record):
+        """Return what's sent for ``record``, encoded: a tuple of the
+        values of ``fields``, or a dict of the record's attributes, with the
+        message merged with its arguments and any exception rendered as
+        text. Each record is encoded on its own, so that one that can't be
+        encoded is dropped alone, rather than with the batch it's in.
+        """
+        if self.codec is not None:
+            return self.codec.encode(record)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = _formatter.formatException(record.exc_info)
+        d = dict(record.__dict__)
+        d['msg'] = record.getMessage()
+        d['args'] = None
+        d['exc_info'] = None
+        d.pop('message', None)
+        try:
+            return pickle.dumps(d, pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            # As RecordCodec does, send values that won't pickle as strings
+            for key, value in d.items():
+                try:
+                    pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+                except Exception:
+                    d[key] = str(value)
+            return pickle.dumps(d, pickle.HIGHEST_PROTOCOL)
+
+    def _batch_bytes(self, items):
+        if self.codec is not None:
+            payload = self._fields_bytes + b''.join(items)
+            kind = _COMPACT
+        else:
+            payload = b''.join(items)
+            kind = _PICKLED
+        return _HEADER.pack(len(payload), kind) + payload
+
+
+_formatter = logging.Formatter()
+
+
+#############################################################################
+# The server
+#############################################################################
+
+class _LogRequestHandler(socketserver.StreamRequestHandler):
+    """Reads the frames sent on one connection, and passes the records in
+    them to their loggers."""
+
+    def finish(self):
+        self.server.log_server._closed(self.connection)
+        super(_LogRequestHandler, self).finish()
+
+    def handle(self):
+        codecs = {}
+        while True:
+            header = self.rfile.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                return
+            length, kind = _HEADER.unpack(header)
+            payload = self.rfile.read(length)
+            if len(payload) < length:
+                return
+            payload = io.BytesIO(payload)
+            records = []
+            if kind == _COMPACT:
+                fields = marshal.load(payload)
+                codec = codecs.get(fields)
+                if codec is None:
+                    codec = codecs[fields] = RecordCodec(fields)
+                while payload.tell() < length:
+                    records.append(
+                        codec.record_from_values(marshal.load(payload)))
+            else:
+                while payload.tell() < length:
+                    records.append(logging.makeLogRecord(pickle.load(payload)))
+            for record in records:
+                logging.getLogger(record.name).handle(record)
+
+
+class _ServerMixin():
+    daemon_threads = True
+
+    def process_request(self, request, client_address):
+        # On the serving thread, so that once ``shutdown()`` returns,
+        # every accepted connection has been registered.
+        self.log_server._opened(request)
+        super(_ServerMixin, self).process_request(request, client_address)
+
+
+class _ThreadingTCPServer(_ServerMixin, socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+
+
+if hasattr(socketserver, 'ThreadingUnixStreamServer'):
+    class _ThreadingUnixStreamServer(_ServerMixin,
+                                     socketserver.ThreadingUnixStreamServer):
+        pass
+else:
+    _ThreadingUnixStreamServer = None
+
+
+class LogServer():
+    """
+    .. _LogServer:
+
+    Receives records from :ref:`BatchingSocketHandler
+    <BatchingSocketHandler>`\\s, and handles them as an ``LCDict``
+    configures: each record is passed to the logger it was logged to --
+    and thus to that logger's handlers, and its ancestors'.
+
+    Each connection has a reader thread of its own; all of them share the
+    handlers, whose locks serialize their output.
+
+    Usually created by ``LCDict.start_log_server``.
+    """
+    def __init__(self, lcdict,
+                 address=('localhost', DEFAULT_TCP_LOGGING_PORT),
+                 extra_fields=()):
+        """
+        :param lcdict: an ``LCDict`` that configures the handlers which
+            actually write records. Don't call its ``config()`` method:
+            the server does that when it starts.
+        :param address: a ``(host, port)`` tuple to listen on with TCP
+            (port ``0`` picks a free one), or a ``str``, the path of a
+            Unix domain socket. Once the server is listening, ``address``
+            is the actual address.
+        :param extra_fields: record attributes that compactly encoded
+            records should carry besides those that ``lcdict``'s formatters
+            use -- for example, attributes that its filters examine.
+        """
+        self.lcdict = lcdict
+        self.address = (address if isinstance(address, str)
+                        else tuple(address))
+        self.extra_fields = tuple(extra_fields)
+        self._server = None
+        self._thread = None
+        self._connections = set()
+        self._connections_lock = threading.Lock()
+
+    @property
+    def fields(self):
+        """The record attributes that compactly encoded records carry:
+        those that the formatters of the ``LCDict`` use, and
+        ``extra_fields``.
+        """
+        return record_fields(self.lcdict, self.extra_fields)
+
+    def client_lcdict(self, compact=False, **kwargs):
+        """Return a new ``LCDict`` with which client processes can configure
+        logging: it has a socket handler, named ``'socket'``, attached to
+        the root, which sends records to this server. The levels of the root
+        and of the loggers are those in the server's ``LCDict``, so clients
+        send only the records the server might write.
+
+        :param compact: if true, the socket handler sends records as tuples
+            of the attributes in ``self.fields``.
+        :param kwargs: keyword arguments for ``add_socket_handler``, e.g.
+            ``batch_size``.
+        """
+        if compact:
+            kwargs['fields'] = self.fields
+        from .lcdict import LCDict
+        lcd = LCDict(root_level=self.lcdict.root.get('level', 'WARNING'),
+                     attach_handlers_to_root=True)
+        for name, logger_dict in self.lcdict.loggers.items():
+            lcd.add_logger(name,
+                           level=logger_dict.get('level', 'NOTSET'),
+                           propagate=True)
+        lcd.add_socket_handler('socket', address=self.address, **kwargs)
+        return lcd
+
+    def _opened(self, conn):
+        with self._connections_lock:
+            self._connections.add(conn)
+
+    def _closed(self, conn):
+        with self._connections_lock:
+            self._connections.discard(conn)
+
+    def _listen(self):
+        """Configure logging, and bind and listen on ``address``."""
+        self.lcdict.config()
+        if isinstance(self.address, str):
+            if _ThreadingUnixStreamServer is None:
+                raise NotImplementedError(
+                    "Unix domain sockets aren't available")         # | raise
+            if os.path.exists(self.address):
+                os.remove(self.address)
+            server = _ThreadingUnixStreamServer(self.address,
+                                                _LogRequestHandler)
+        else:
+            server = _ThreadingTCPServer(self.address, _LogRequestHandler)
+            self.address = server.server_address[:2]
+        server.log_server = self
+        self._server = server
+
+    def start(self):
+        """Start serving on a thread of this process. Returns ``self``."""
+        self._listen()
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name='LogServer')
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Serve on this thread until ``stop()`` is called on another one
+        (or until interrupted)."""
+        if self._server is None:
+            self._listen()
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+    def stop(self, timeout=5.0):
+        """Stop accepting connections; wait for clients to close theirs --
+        at most ``timeout`` seconds -- then close any that remain, and
+        stop.
+        """
+        server = self._server
+        if server is None:
+            return
+        self._server = None
+        deadline = time.time() + timeout
+        # Let the serving thread accept connections already made
+        while (select.select([server.socket], [], [], 0)[0]
+               and time.time() < deadline):
+            time.sleep(0.01)
+        server.shutdown()
+        while self._connections and time.time() < deadline:
+            time.sleep(0.01)
+        with self._connections_lock:
+            for conn in self._connections:
+                try:
+                    conn.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+        server.server_close()
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.remove(self.address)
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        if self._server is None:
+            self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
@@ -0,0 +1,366 @@
+# coding=utf-8
+
+__author__ = "Brian O'Neill"
+
+__doc__ = """ \
+.. _tcp-syslog-module:
+
+A syslog handler that sends RFC 5424 messages over a persistent TCP (or Unix
+stream) connection, several records per write.
+
+``logging.handlers.SysLogHandler`` sends each record in a datagram of its
+own, or, over TCP, as an unframed send that a receiver can't reliably split
+into messages; if the connection drops, the handler just reports an error
+for every record thereafter. ``BatchingSysLogHandler`` instead frames each
+message with RFC 6587 octet counting (``<length> <message>``), accumulates
+framed messages, and sends them in batches over a connection that it keeps
+open, reconnecting with exponential backoff when the connection fails.
+"""
+
+import logging
+import multiprocessing.util
+import os
+import socket
+import sys
+import time
+import weakref
+from logging.handlers import SysLogHandler, SYSLOG_TCP_PORT
+
+__all__ = ['BatchingSysLogHandler']
+
+
+def _flush_handler(handler_ref):
+    """Exit finalizer: flush the handler, if it still exists."""
+    handler = handler_ref()
+    if handler is not None:
+        handler.flush()
+
+
+class _BatchingStreamHandler(logging.Handler):
+    """
+    Base class of handlers that buffer encoded records and send them in
+    batches over a persistent stream connection -- TCP, or a Unix domain
+    socket -- reconnecting with exponential backoff when it fails.
+    Subclasses implement ``frame``, and may override ``_batch_bytes``.
+
+    Each process has its own buffer and connection -- a process created
+    by ``fork`` discards what it inherits -- so no lock is needed.
+    """
+    def __init__(self,
+                 address,
+                 batch_size=100,
+                 flush_interval=1.0,
+                 flush_level='ERROR',
+                 retry_delay=0.5,
+                 max_retry_delay=30.0,
+                 max_buffered=10000,
+                 timeout=5.0,
+                 **kwargs):
+        super(_BatchingStreamHandler, self).__init__(**kwargs)
+        self.address = (address if isinstance(address, str)
+                        else tuple(address))
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = flush_interval
+        self.flush_level = logging._checkLevel(flush_level)
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.max_buffered = max(self.batch_size, int(max_buffered))
+        self.timeout = timeout
+        self.dropped = 0
+        self._finalizer_pid = None
+        self._reset_process_state()
+
+    def _reset_process_state(self):
+        """Start afresh in a new process: no connection, empty buffer.
+        Arrange for the buffer to be sent when the process exits:
+        ``multiprocessing`` children don't run ``atexit`` handlers, so
+        ``logging.shutdown()`` doesn't flush it.
+        """
+        self._pid = os.getpid()
+        if self._finalizer_pid != self._pid:
+            # Only a weak reference: the finalizer goes when the handler does
+            multiprocessing.util.Finalize(self, _flush_handler,
+                                          args=(weakref.ref(self),),
+                                          exitpriority=100)
+            self._finalizer_pid = self._pid
+        self._sock = None
+        self._buffer = []
+        self._last_send = time.time()
+        self._next_retry = 0.0
+        self._current_delay = self.retry_delay
+
+    def _check_pid(self):
+        """A child process created by ``fork`` inherits a copy of its
+        parent's buffer and connection, which the parent will use itself.
+        Discard them.
+        """
+        if os.getpid() != self._pid:
+            if self._sock is not None:
+                self._sock.close()      # only this process's copy
+            self._reset_process_state()
+
+    def frame(self, record):
+        """Return what to buffer for ``record``, as ``bytes``. If this
+        raises, the record is dropped, and counted in ``dropped``."""
+        raise NotImplementedError
+
+    def _batch_bytes(self, items):
+        """Return the ``bytes`` to send for a list of buffered items."""
+        return b''.join(items)
+
+    # -------------------------------------------------------------------
+    # Connection
+    # -------------------------------------------------------------------
+
+    def _connect(self):
+        """Return a connected socket, or ``None`` if it's not yet time
+        to retry, or connecting fails."""
+        if self._sock is not None:
+            return self._sock
+        if time.time() < self._next_retry:
+            return None
+        try:
+            if isinstance(self.address, str):
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.settimeout(self.timeout)
+                try:
+                    sock.connect(self.address)
+                except OSError:
+                    sock.close()
+                    raise
+            else:
+                sock = socket.create_connection(self.address, self.timeout)
+        except OSError:
+            self._connection_failed()
+            return None
+        self._sock = sock
+        self._current_delay = self.retry_delay
+        return sock
+
+    def _connection_failed(self):
+        """Close the connection, and back off before the next attempt."""
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+        self._next_retry = time.time() + self._current_delay
+        self._current_delay = min(self._current_delay * 2,
+                                  self.max_retry_delay)
+
+    def _send_buffer(self):
+        """Send the buffered items in one write. If that fails, keep
+        them for the next attempt, discarding the oldest beyond
+        ``max_buffered``.
+        """
+        self._check_pid()
+        self._last_send = time.time()
+        if not self._buffer:
+            return
+        sock = self._connect()
+        if sock is not None:
+            try:
+                sock.sendall(self._batch_bytes(self._buffer))
+                self._buffer = []
+                return
+            except OSError:
+                # Part of the batch may have been sent; better a duplicate
+                # than a loss.
+                self._connection_failed()
+        excess = len(self._buffer) - self.max_buffered
+        if excess > 0:
+            del self._buffer[:excess]
+            self.dropped += excess
+
+    # -------------------------------------------------------------------
+    # Handler API
+    # -------------------------------------------------------------------
+
+    def emit(self, record):
+        """Frame and buffer a logging record, sending the buffer if it's
+        time to. Called by `logging`.
+        """
+        try:
+            self._check_pid()
+            try:
+                item = self.frame(record)
+            except Exception:
+                self.dropped += 1       # rather than buffered, unsendable
+                raise
+            self._buffer.append(item)
+            if (len(self._buffer) >= self.batch_size
+                or record.levelno >= self.flush_level
+                or (self.flush_interval is not None and
+                    record.created - self._last_send >= self.flush_interval)
+               ):
+                self._send_buffer()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        """Send any buffered items. Called by `logging`.
+        """
+        self.acquire()
+        try:
+            self._send_buffer()
+        finally:
+            self.release()
+
+    def close(self):
+        """Send any buffered items, then close the connection.
+        Called by `logging`.
+        """
+        self.acquire()
+        try:
+            self._send_buffer()
+            if self._sock is not None:
+                self._sock.close()
+                self._sock = None
+            super(_BatchingStreamHandler, self).close()
+        finally:
+            self.release()
+
+
+class BatchingSysLogHandler(_BatchingStreamHandler):
+    """
+    .. _BatchingSysLogHandler:
+
+    A handler that sends RFC 5424 syslog messages, framed by octet
+    counting (RFC 6587), in batches over a persistent stream connection.
+
+    Each message has the form ::
+
+        <PRI>1 TIMESTAMP HOSTNAME APP-NAME PROCID MSGID - MSG
+
+    where ``MSG`` is the formatted record. The part of this header from
+    ``HOSTNAME`` on is the same for every record that a process logs,
+    so it's computed once per process; the ``<PRI>1`` part is computed once
+    per level, and the ``TIMESTAMP`` once per second.
+
+    Framed messages are buffered, and the buffer is sent when any of the
+    following occurs:
+
+        * it holds ``batch_size`` messages;
+        * a record is logged whose level is at least ``flush_level``;
+        * a record is logged at least ``flush_interval`` seconds after
+          the buffer was last sent;
+        * ``flush()`` or ``close()`` is called -- in particular, by
+          ``logging.shutdown()`` at exit.
+
+    If connecting or sending fails, the handler closes the connection,
+    keeps the unsent messages, and doesn't try to connect again for
+    ``retry_delay`` seconds, doubling that delay (up to ``max_retry_delay``)
+    after each further failure. While it's disconnected, at most
+    ``max_buffered`` messages are kept; older ones are discarded, and
+    counted in the attribute ``dropped``.
+
+    Each process has its own buffer and connection -- a process created
+    by ``fork`` discards what it inherits -- so no lock is needed.
+    """
+    def __init__(self,
+                 address=('localhost', SYSLOG_TCP_PORT),
+                 facility=SysLogHandler.LOG_USER,
+                 app_name=None,
+                 hostname=None,
+                 msgid=None,
+                 batch_size=100,
+                 flush_interval=1.0,
+                 flush_level='ERROR',
+                 retry_delay=0.5,
+                 max_retry_delay=30.0,
+                 max_buffered=10000,
+                 timeout=5.0,
+                 **kwargs):
+        """
+        :param address: a ``(host, port)`` tuple for TCP, or a ``str``,
+            the path of a Unix domain stream socket.
+        :param facility: a syslog facility, as a number
+            (e.g. ``SysLogHandler.LOG_LOCAL0``) or a name (``'local0'``).
+        :param app_name: the APP-NAME field; by default, the name of the
+            running script.
+        :param hostname: the HOSTNAME field; by default,
+            ``socket.gethostname()``.
+        :param msgid: the MSGID field; by default, ``'-'`` (none).
+        :param batch_size: number of messages to accumulate before sending
+        :param flush_interval: seconds; if not ``None``, send the buffer
+            when a record is logged at least this long after the previous
+            send.
+        :param flush_level: a level name or number; records at or above
+            this level cause the buffer to be sent immediately.
+        :param retry_delay: seconds to wait before reconnecting after the
+            first failure
+        :param max_retry_delay: upper limit of the reconnection delay
+        :param max_buffered: the most messages to keep while disconnected
+        :param timeout: socket timeout, in seconds, for connecting and
+            sending
+        :param kwargs: as for ``logging.Handler``, e.g. ``level``
+        """
+        if isinstance(facility, str):
+            facility = SysLogHandler.facility_names[facility.lower()]
+        self.facility = facility
+        if app_name is None:
+            app_name = os.path.basename(sys.argv[0]) if sys.argv else ''
+        self.app_name = _nil(app_name)
+        self.hostname = _nil(hostname or socket.gethostname())
+        self.msgid = msgid or '-'
+        super(BatchingSysLogHandler, self).__init__(
+            address,
+            batch_size=batch_size,
+            flush_interval=flush_interval,
+            flush_level=flush_level,
+            retry_delay=retry_delay,
+            max_retry_delay=max_retry_delay,
+            max_buffered=max_buffered,
+            timeout=timeout,
+            **kwargs)
+
+    def _reset_process_state(self):
+        """Start afresh in a new process: no connection, empty buffer,
+        and headers computed for this process."""
+        super(BatchingSysLogHandler, self)._reset_process_state()
+        self._header_suffix = ' %s %s %d %s - ' % (
+            self.hostname, self.app_name, self._pid, self.msgid)
+        self._pri_prefixes = {}
+        self._timestamp_second = None
+        self._timestamp_prefix = ''
+
+    # -------------------------------------------------------------------
+    # Message construction
+    # -------------------------------------------------------------------
+
+    def _pri_prefix(self, record):
+        """``'<PRI>1 '``, for the level of ``record``."""
+        prefix = self._pri_prefixes.get(record.levelno)
+        if prefix is None:
+            priority = SysLogHandler.priority_map.get(record.levelname,
+                                                      'warning')
+            pri = (self.facility << 3) | SysLogHandler.priority_names[priority]
+            prefix = self._pri_prefixes[record.levelno] = '<%d>1 ' % pri
+        return prefix
+
+    def _timestamp(self, created):
+        """RFC 3339 timestamp, in UTC, with microseconds."""
+        second = int(created)
+        if second != self._timestamp_second:
+            self._timestamp_second = second
+            self._timestamp_prefix = time.strftime('%Y-%m-%dT%H:%M:%S',
+                                                   time.gmtime(second))
+        return '%s.%06dZ' % (self._timestamp_prefix,
+                             int((created - second) * 1000000))
+
+    def frame(self, record):
+        """Return the RFC 5424 message for ``record``, with its RFC 6587
+        octet-count frame, as ``bytes``."""
+        msg = (self._pri_prefix(record)
+               + self._timestamp(record.created)
+               + self._header_suffix
+               + self.format(record)).encode('utf-8')
+        return b'%d %s' % (len(msg), msg)
+
+
+def _nil(s):
+    """RFC 5424 header fields are printable ASCII without spaces,
+    or ``'-'`` if empty."""
+    s = ''.join(c for c in s if '!' <= c <= '~')
+    return s or '-'
@@ -0,0 +1,124 @@
+__author__ = 'brianoneill'
+
+import logging
+import os
+from multiprocessing import Process
+from unittest import TestCase
+
+try:
+    import prelogging
+except ImportError:
+    import sys
+    sys.path[0:0] = ['../..']
+from prelogging import LCDict, LockingFileHandler, LockingStreamHandler
+from prelogging.locking_handlers import PIPE_BUF
+
+
+LOG_PATH = '_testlogs'       # NOTE: directory should already exist
+LOGFILENAME = 'test_atomic_write.log'
+
+LOGGER_NAME = 'test_atomic_write'
+
+#############################################################################
+
+def _worker(num, long_msg):
+    logger = logging.getLogger(LOGGER_NAME)
+    for i in range(num):
+        logger.info("pid %d record %d", os.getpid(), i)
+    logger.info(long_msg)
+
+
+class TestAtomicWrite(TestCase):
+
+    def setUp(self):
+        self.filename = os.path.join(LOG_PATH, LOGFILENAME)
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+
+    def tearDown(self):
+        logger = logging.getLogger(LOGGER_NAME)
+        for handler in logger.handlers:
+            handler.close()
+        logger.handlers = []
+
+    def config_logging(self, mode='a'):
+        lcd = LCDict(log_path=LOG_PATH, locking='atomic')
+        lcd.add_file_handler('atomic_file',
+                             filename=LOGFILENAME,
+                             formatter='msg',
+                             mode=mode)
+        lcd.add_logger(LOGGER_NAME,
+                       handlers='atomic_file',
+                       level='DEBUG',
+                       propagate=False)
+        lcd.config()
+        return lcd
+
+    def test_lcdict_handler_dicts(self):
+        lcd = self.config_logging()
+        self.assertEqual(lcd.locking, 'atomic')
+        self.assertEqual(
+            lcd.handlers['atomic_file'],
+            {'()': 'ext://prelogging.LockingFileHandler',
+             'atomic': True,
+             'create_lock': True,
+             'delay': False,
+             'filename': self.filename,
+             'formatter': 'msg',
+             'mode': 'a'}
+        )
+        lcd.add_stderr_handler('con', locking='atomic')
+        self.assertEqual(lcd.handlers['con']['atomic'], True)
+        lcd.add_stdout_handler('con2', locking=True)
+        self.assertNotIn('atomic', lcd.handlers['con2'])
+
+        handler = logging.getLogger(LOGGER_NAME).handlers[0]
+        self.assertIsInstance(handler, LockingFileHandler)
+        self.assertTrue(handler.atomic)
+
+    def test_bad_locking_mode(self):
+        lcd = LCDict()
+        with self.assertRaises(ValueError):
+            lcd.add_stderr_handler('con', locking='nonsense')
+
+    def test_mode_w_appends(self):
+        with open(self.filename, 'w') as f:
+            f.write("stale\n")
+        self.config_logging(mode='w')
+        logger = logging.getLogger(LOGGER_NAME)
+        logger.info("one")
+        logger.info("two")
+        with open(self.filename) as f:
+            self.assertEqual(f.read(), "one\ntwo\n")
+
+    def test_stream_handler(self):
+        with open(self.filename, 'a') as stream:
+            handler = LockingStreamHandler(stream, create_lock=True,
+                                           atomic=True)
+            logger = logging.getLogger(LOGGER_NAME)
+            logger.addHandler(handler)
+            logger.setLevel('INFO')
+            logger.info("short")
+            logger.info("x" * (PIPE_BUF + 10))    # takes the lock
+        with open(self.filename) as f:
+            self.assertEqual(f.read(),
+                             "short\n" + "x" * (PIPE_BUF + 10) + "\n")
+
+    def test_multiprocessing(self):
+        self.config_logging(mode='w')
+        num_procs, num_records = 4, 200
+        long_msg = "L" * (2 * PIPE_BUF)
+        procs = [Process(target=_worker, args=(num_records, long_msg))
+                 for _ in range(num_procs)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+
+        with open(self.filename) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(len(lines), num_procs * (num_records + 1))
+        self.assertEqual(lines.count(long_msg), num_procs)
+        for line in lines:
+            if line != long_msg:
+                self.assertRegex(line, r'^pid \d+ record \d+$')
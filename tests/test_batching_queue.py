@@ -0,0 +1,125 @@
+__author__ = 'brianoneill'
+
+import logging
+import os
+import queue
+from multiprocessing import Process
+from unittest import TestCase
+
+try:
+    import prelogging
+except ImportError:
+    import sys
+    sys.path[0:0] = ['../..']
+from prelogging import (LCDict, BatchingQueueHandler, BatchingQueueListener)
+
+
+LOG_PATH = '_testlogs'       # NOTE: directory should already exist
+LOGFILENAME = 'test_batching_queue.log'
+
+LOGGER_NAME = 'test_batching_queue'
+
+#############################################################################
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super(ListHandler, self).__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def _worker(listener, num):
+    # No logging.shutdown(): the last partial batch is put at exit
+    listener.worker_lcdict(batch_size=20).config()
+    logger = logging.getLogger(LOGGER_NAME)
+    for i in range(num):
+        logger.info("record %d", i)
+
+
+class TestBatchingQueueHandler(TestCase):
+
+    def setUp(self):
+        self.logger = logging.getLogger(LOGGER_NAME)
+
+    def tearDown(self):
+        for handler in self.logger.handlers:
+            handler.close()
+        self.logger.handlers = []
+        self.logger.setLevel(logging.NOTSET)
+        self.logger.propagate = True
+
+    def test_lcdict_handler_dict(self):
+        q = queue.Queue()
+        lcd = LCDict()
+        lcd.add_queue_handler('batching', queue=q, batch_size=10,
+                              flush_level='CRITICAL')
+        lcd.add_queue_handler('plain', queue=q)
+        self.assertEqual(lcd.handlers['batching'],
+                         {'class': 'prelogging.BatchingQueueHandler',
+                          'queue': q,
+                          'batch_size': 10,
+                          'flush_level': 'CRITICAL'})
+        self.assertEqual(lcd.handlers['plain'],
+                         {'class': 'logging.handlers.QueueHandler',
+                          'queue': q})
+
+    def test_batches(self):
+        q = queue.Queue()
+        handler = BatchingQueueHandler(q, batch_size=3, flush_interval=None)
+        self.logger.addHandler(handler)
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.propagate = False
+
+        self.logger.info("one")
+        self.logger.info("two %s", 'args')
+        self.assertTrue(q.empty())
+        self.logger.info("three")
+        batch = q.get_nowait()
+        self.assertEqual([r.getMessage() for r in batch],
+                         ["one", "two args", "three"])
+        self.assertIsNone(batch[1].args)        # prepared
+
+        self.logger.info("four")
+        self.logger.error("five")               # flush_level
+        self.assertEqual([r.msg for r in q.get_nowait()], ["four", "five"])
+        self.logger.info("six")
+        handler.flush()
+        self.assertEqual([r.msg for r in q.get_nowait()], ["six"])
+        self.assertTrue(q.empty())
+
+    def test_batching_queue_listener(self):
+        q = queue.Queue()
+        target = ListHandler()
+        listener = BatchingQueueListener(q, target)
+        listener.start()
+        q.put(logging.makeLogRecord({'msg': 'single'}))
+        q.put([logging.makeLogRecord({'msg': 'batch %d' % i})
+               for i in range(2)])
+        listener.stop()
+        self.assertEqual([r.msg for r in target.records],
+                         ['single', 'batch 0', 'batch 1'])
+
+    def test_multiprocessing(self):
+        filename = os.path.join(LOG_PATH, LOGFILENAME)
+        if os.path.exists(filename):
+            os.remove(filename)
+        lcd = LCDict(log_path=LOG_PATH)
+        lcd.add_file_handler('file', filename=LOGFILENAME,
+                             formatter='process_msg')
+        lcd.add_logger(LOGGER_NAME, handlers='file', level='INFO')
+        listener = lcd.start_listener()
+
+        num_procs, num_records = 3, 50
+        procs = [Process(target=_worker, args=(listener, num_records))
+                 for _ in range(num_procs)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+        listener.stop()
+
+        with open(filename) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(len(lines), num_procs * num_records)
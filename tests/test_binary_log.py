@@ -0,0 +1,225 @@
+__author__ = 'brianoneill'
+
+import enum
+import io
+import logging
+import os
+from multiprocessing import Process
+from unittest import TestCase
+
+try:
+    import prelogging
+except ImportError:
+    import sys
+    sys.path[0:0] = ['../..']
+from prelogging import (LCDict, BinaryFileHandler, read_binary_log,
+                        render_binary_log)
+from prelogging import binary_log
+from prelogging.formatter_presets import _formatter_presets
+
+
+LOG_PATH = '_testlogs'       # NOTE: directory should already exist
+LOGFILENAME = 'test_binary_log.binlog'
+LOGGER_NAME = 'test_binary_log'
+
+#############################################################################
+
+class Color(enum.IntEnum):
+    RED = 1
+
+
+class _Keep(logging.Handler):
+    """Keeps the records it handles."""
+    def __init__(self):
+        super(_Keep, self).__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def _worker(num):
+    logger = logging.getLogger(LOGGER_NAME)
+    for i in range(num):
+        logger.info("pid %d record %d", os.getpid(), i)
+    logging.shutdown()
+
+
+class TestBinaryLog(TestCase):
+
+    def setUp(self):
+        self.filename = os.path.join(LOG_PATH, LOGFILENAME)
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+
+    def tearDown(self):
+        logger = logging.getLogger(LOGGER_NAME)
+        for handler in logger.handlers:
+            handler.close()
+        logger.handlers = []
+
+    def config_logging(self, **kwargs):
+        lcd = LCDict(log_path=LOG_PATH)
+        lcd.add_file_handler('binary',
+                             filename=LOGFILENAME,
+                             binary=True,
+                             **kwargs)
+        lcd.add_logger(LOGGER_NAME,
+                       handlers='binary',
+                       level='DEBUG',
+                       propagate=False)
+        lcd.config()
+        self.keep = _Keep()
+        logging.getLogger(LOGGER_NAME).addHandler(self.keep)
+        return lcd
+
+    def log_assorted(self):
+        logger = logging.getLogger(LOGGER_NAME)
+        for i in range(3):
+            logger.info("%d: %s %r %.2f %s", i, 'text', b'bytes', 1.5,
+                        [None, True])
+        logger.warning("no args, 100%%")
+        logger.debug("mapping: %(a)s", {'a': 'b'})
+        logger.debug("enum: %s %d", Color.RED, Color.RED)
+        logger.debug({'not': 'a string'})
+        try:
+            1 / 0
+        except ZeroDivisionError:
+            logger.exception("failed: %s", object)
+        logger.info("stack", stack_info=True)
+
+    def close_handlers(self):
+        for handler in logging.getLogger(LOGGER_NAME).handlers:
+            handler.close()
+
+    def assertSameRendering(self, records, formatter):
+        decoded = list(read_binary_log(self.filename))
+        self.assertEqual(len(decoded), len(records))
+        for original, record in zip(records, decoded):
+            self.assertEqual(formatter.format(record),
+                             formatter.format(original))
+
+    def test_lcdict_handler_dict(self):
+        lcd = self.config_logging(locking='atomic', buffer_size=10)
+        self.assertEqual(
+            lcd.handlers['binary'],
+            {'()': 'ext://prelogging.BinaryFileHandler',
+             'atomic': True,
+             'buffer_size': 10,
+             'create_lock': True,
+             'delay': False,
+             'filename': self.filename,
+             'mode': 'a'}
+        )
+        handler = logging.getLogger(LOGGER_NAME).handlers[0]
+        self.assertIsInstance(handler, BinaryFileHandler)
+        self.assertEqual(handler.mode, 'ab')
+
+    def test_presets(self):
+        self.config_logging(locking=True)
+        self.log_assorted()
+        self.close_handlers()
+        for name in _formatter_presets:
+            self.assertSameRendering(self.keep.records,
+                                     binary_log._make_formatter(name))
+        self.assertSameRendering(
+            self.keep.records,
+            binary_log._make_formatter(
+                format='%(relativeCreated)f %(msecs)d %(created)r '
+                       '%(thread)d %(threadName)s %(process)d '
+                       '%(pathname)s %(filename)s %(module)s '
+                       '%(funcName)s %(lineno)d %(message)s'))
+
+    def test_decoded_records(self):
+        self.config_logging(locking='flock')
+        self.log_assorted()
+        self.close_handlers()
+        decoded = list(read_binary_log(self.filename))
+        self.assertEqual(decoded[0].msg, "%d: %s %r %.2f %s")
+        self.assertEqual(decoded[0].args, (0, 'text', b'bytes', 1.5,
+                                           [None, True]))
+        self.assertEqual(decoded[3].args, ())
+        self.assertEqual(decoded[4].args, {'a': 'b'})
+        # Arguments that marshal can't write exactly are merged
+        self.assertEqual(decoded[5].msg,
+                         "enum: %s %d" % (Color.RED, Color.RED))
+        self.assertEqual(decoded[5].args, ())
+        self.assertEqual(decoded[6].msg, "{'not': 'a string'}")
+        self.assertIn('ZeroDivisionError', decoded[7].exc_text)
+        self.assertIsNone(decoded[7].exc_info)
+        self.assertTrue(decoded[8].stack_info.startswith('Stack'))
+        for original, record in zip(self.keep.records, decoded):
+            self.assertEqual(record.created, original.created)
+
+    def test_size(self):
+        self.config_logging(buffer_size=50)
+        logger = logging.getLogger(LOGGER_NAME)
+        for i in range(1000):
+            logger.debug("record %d of %d", i, 1000)
+        self.close_handlers()
+        text = ''.join(
+            logging.Formatter('%(asctime)s: %(name)s: %(levelname)s: '
+                              '%(message)s').format(r) + '\n'
+            for r in self.keep.records)
+        self.assertLess(os.path.getsize(self.filename) * 2, len(text))
+
+    def test_intern_limit(self):
+        self.config_logging()
+        handler = logging.getLogger(LOGGER_NAME).handlers[0]
+        handler.intern_limit = 10
+        logger = logging.getLogger(LOGGER_NAME)
+        for i in range(25):
+            logger.info("preformatted %d" % i)
+            logger.info("template %d", i)
+        self.assertLessEqual(len(handler._prefixes), 10)
+        self.close_handlers()
+        self.assertSameRendering(self.keep.records, logging.Formatter())
+
+    def test_processes(self):
+        self.config_logging(locking='atomic')
+        procs = [Process(target=_worker, args=(200,)) for _ in range(3)]
+        for p in procs:
+            p.start()
+        _worker(200)
+        for p in procs:
+            p.join()
+        by_pid = {}
+        for record in read_binary_log(self.filename):
+            by_pid.setdefault(record.process, []).append(record.getMessage())
+        self.assertEqual(len(by_pid), 4)
+        for pid, messages in by_pid.items():
+            self.assertEqual(messages, ["pid %d record %d" % (pid, i)
+                                        for i in range(200)])
+
+    def test_incomplete_and_invalid(self):
+        self.config_logging()
+        logging.getLogger(LOGGER_NAME).info("one %s", 'two')
+        self.close_handlers()
+        with open(self.filename, 'rb') as f:
+            data = f.read()
+        # A frame still being written is ignored
+        records = list(read_binary_log(io.BytesIO(data + data[:3]),
+                                       chunk_size=7))
+        self.assertEqual([r.getMessage() for r in records], ["one two"])
+        with self.assertRaises(ValueError):
+            list(read_binary_log(io.BytesIO(b'\x05text\n')))
+
+    def test_render(self):
+        self.config_logging()
+        logger = logging.getLogger(LOGGER_NAME)
+        logger.debug("quiet")
+        logger.warning("loud %d", 1)
+        self.close_handlers()
+        out = io.StringIO()
+        self.assertEqual(render_binary_log(self.filename, out,
+                                           'logger_level_msg', level='INFO'),
+                         1)
+        self.assertEqual(out.getvalue(),
+                         '%-20s: WARNING : loud 1\n' % LOGGER_NAME)
+
+        text_file = self.filename + '.txt'
+        binary_log.main([self.filename, '--format', '{levelname} {message}',
+                         '--style', '{', '-o', text_file])
+        with open(text_file) as f:
+            self.assertEqual(f.read(), "DEBUG quiet\nWARNING loud 1\n")
+        os.remove(text_file)
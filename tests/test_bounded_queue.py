@@ -0,0 +1,150 @@
+__author__ = 'brianoneill'
+
+import logging
+import queue
+from unittest import TestCase
+
+try:
+    import prelogging
+except ImportError:
+    import sys
+    sys.path[0:0] = ['../..']
+from prelogging import LCDict, BoundedQueueHandler, LogListener, RecordCodec
+
+
+LOGGER_NAME = 'test_bounded_queue'
+
+#############################################################################
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super(ListHandler, self).__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class TestBoundedQueueHandler(TestCase):
+
+    def setUp(self):
+        self.logger = logging.getLogger(LOGGER_NAME)
+
+    def tearDown(self):
+        for handler in self.logger.handlers:
+            handler.close()
+        self.logger.handlers = []
+        self.logger.setLevel(logging.NOTSET)
+        self.logger.propagate = True
+
+    def _log(self, handler, *levels):
+        self.logger.addHandler(handler)
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.propagate = False
+        for i, level in enumerate(levels):
+            self.logger.log(level, "record %d", i)
+
+    @staticmethod
+    def _messages(q):
+        msgs = []
+        while not q.empty():
+            msgs.append(q.get_nowait().getMessage())
+        return msgs
+
+    def test_drop_newest(self):
+        q = queue.Queue(2)
+        handler = BoundedQueueHandler(q, policy='drop_newest')
+        self._log(handler, *[logging.INFO] * 4)
+        self.assertEqual(self._messages(q), ["record 0", "record 1"])
+        self.assertEqual(handler.stats(), {'dropped': 2, 'high_water': 2})
+
+    def test_drop_oldest(self):
+        q = queue.Queue(2)
+        handler = BoundedQueueHandler(q, policy='drop_oldest')
+        self._log(handler, *[logging.INFO] * 4)
+        self.assertEqual(self._messages(q), ["record 2", "record 3"])
+        self.assertEqual(handler.dropped, 2)
+
+    def test_block_with_timeout(self):
+        q = queue.Queue(1)
+        handler = BoundedQueueHandler(q, timeout=0.01)
+        self._log(handler, logging.INFO, logging.CRITICAL)
+        self.assertEqual(self._messages(q), ["record 0"])
+        self.assertEqual(handler.dropped, 1)
+
+    def test_drop_below(self):
+        q = queue.Queue(1)
+        handler = BoundedQueueHandler(q, policy='drop_below', timeout=0.01,
+                                      drop_level='ERROR')
+        self._log(handler, logging.INFO, logging.INFO)
+        self.assertEqual(handler.dropped, 1)
+        # Records at or above drop_level wait for room
+        got = []
+        consumer = logging.threading.Timer(
+            0.05, lambda: got.append(q.get_nowait().getMessage()))
+        consumer.start()
+        handler.timeout = 5
+        self.logger.error("urgent")
+        consumer.join()
+        self.assertEqual(got, ["record 0"])
+        self.assertEqual(self._messages(q), ["urgent"])
+        self.assertEqual(handler.dropped, 1)
+
+    def test_compact(self):
+        q = queue.Queue(4)
+        handler = BoundedQueueHandler(q, policy='drop_newest',
+                                      fields=('msg',))
+        self._log(handler, logging.INFO)
+        item = q.get_nowait()
+        self.assertIsInstance(item, tuple)
+        record = RecordCodec(('msg',)).record_from_values(item)
+        self.assertEqual(record.getMessage(), "record 0")
+
+    def test_bad_policy(self):
+        with self.assertRaises(ValueError):
+            BoundedQueueHandler(queue.Queue(1), policy='drop_all')
+
+    def test_lcdict_handler_dict(self):
+        q = queue.Queue(10)
+        lcd = LCDict()
+        lcd.add_queue_handler('bounded', queue=q, policy='drop_below',
+                              drop_level='ERROR')
+        self.assertEqual(lcd.handlers['bounded'],
+                         {'class': 'prelogging.BoundedQueueHandler',
+                          'queue': q,
+                          'policy': 'drop_below',
+                          'drop_level': 'ERROR'})
+        with self.assertRaises(ValueError):
+            lcd.add_queue_handler('both', queue=q, policy='drop_newest',
+                                  batch_size=10)
+
+    def test_bounded_listener_queue(self):
+        handler = ListHandler()
+        lcd = LCDict()
+        lcd.handlers['list'] = {'()': lambda: handler}
+        lcd.add_logger(LOGGER_NAME, handlers='list', level='DEBUG',
+                       propagate=False)
+        listener = LogListener(lcd, process=False, queue_size=5)
+        self.assertEqual(listener.queue._maxsize, 5)
+        # Workers block when the queue is full, unless told otherwise
+        handler_dict = listener.worker_lcdict().handlers['queue']
+        self.assertEqual(handler_dict['class'],
+                         'prelogging.BoundedQueueHandler')
+        self.assertEqual(handler_dict['policy'], 'block')
+        handler_dict = listener.worker_lcdict(
+            policy='drop_newest').handlers['queue']
+        self.assertEqual(handler_dict['policy'], 'drop_newest')
+        handler_dict = LogListener(lcd, process=False).worker_lcdict(
+            ).handlers['queue']
+        self.assertEqual(handler_dict['class'],
+                         'logging.handlers.QueueHandler')
+        with listener:
+            bounded = BoundedQueueHandler(listener.queue, timeout=10)
+            for i in range(20):
+                bounded.handle(self.logger.makeRecord(
+                    LOGGER_NAME, logging.INFO, __file__, 1,
+                    "record %d", (i,), None))
+        self.assertEqual(bounded.dropped, 0)
+        self.assertLessEqual(bounded.high_water, 5)
+        self.assertEqual([r.getMessage() for r in handler.records],
+                         ["record %d" % i for i in range(20)])
@@ -0,0 +1,112 @@
+__author__ = 'brianoneill'
+
+import logging
+import os
+from multiprocessing import Process
+from unittest import TestCase
+
+try:
+    import prelogging
+except ImportError:
+    import sys
+    sys.path[0:0] = ['../..']
+from prelogging import LCDict, LockingBufferedFileHandler
+
+
+LOG_PATH = '_testlogs'       # NOTE: directory should already exist
+LOGFILENAME = 'test_buffered_fh.log'
+
+#############################################################################
+
+def _read_lines(filename):
+    with open(filename) as f:
+        return f.read().splitlines()
+
+
+def _worker(logger_name, num):
+    logger = logging.getLogger(logger_name)
+    for i in range(num):
+        logger.info("pid %d record %d", os.getpid(), i)
+    logging.shutdown()
+
+
+class TestLockingBufferedFileHandler(TestCase):
+
+    def setUp(self):
+        self.filename = os.path.join(LOG_PATH, LOGFILENAME)
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+
+    def tearDown(self):
+        logging.getLogger('test_buffered_fh').handlers = []
+
+    def config_logging(self, **kwargs):
+        lcd = LCDict(log_path=LOG_PATH, locking=True)
+        lcd.add_file_handler('buffered',
+                             filename=LOGFILENAME,
+                             formatter='level_msg',
+                             **kwargs)
+        lcd.add_logger('test_buffered_fh',
+                       handlers='buffered',
+                       level='DEBUG',
+                       propagate=False)
+        lcd.config()
+        return lcd
+
+    def test_lcdict_handler_dict(self):
+        lcd = self.config_logging(buffer_size=10, flush_interval=None)
+        self.assertEqual(
+            lcd.handlers['buffered'],
+            {'()': 'ext://prelogging.LockingBufferedFileHandler',
+             'buffer_size': 10,
+             'create_lock': True,
+             'delay': False,
+             'filename': os.path.join(LOG_PATH, LOGFILENAME),
+             'formatter': 'level_msg',
+             'mode': 'a'}
+        )
+
+    def test_flush_on_size_and_level(self):
+        self.config_logging(buffer_size=3, flush_interval=None)
+        logger = logging.getLogger('test_buffered_fh')
+        handler = logger.handlers[0]
+        self.assertIsInstance(handler, LockingBufferedFileHandler)
+
+        logger.info("one")
+        logger.info("two")
+        self.assertEqual(_read_lines(self.filename), [])
+
+        logger.info("three")            # buffer full
+        self.assertEqual(_read_lines(self.filename),
+                         ["INFO    : one", "INFO    : two", "INFO    : three"])
+
+        logger.debug("four")
+        logger.error("five")            # at flush_level
+        self.assertEqual(_read_lines(self.filename)[3:],
+                         ["DEBUG   : four", "ERROR   : five"])
+
+        logger.info("six")
+        handler.close()                 # as at logging.shutdown
+        self.assertEqual(_read_lines(self.filename)[5:], ["INFO    : six"])
+
+    def test_flush_on_interval(self):
+        self.config_logging(buffer_size=100, flush_interval=0.0)
+        logger = logging.getLogger('test_buffered_fh')
+        logger.info("one")
+        self.assertEqual(_read_lines(self.filename), ["INFO    : one"])
+
+    def test_multiprocessing(self):
+        self.config_logging(buffer_size=25, flush_interval=None)
+        num_procs, num_records = 4, 100
+        procs = [Process(target=_worker,
+                         args=('test_buffered_fh', num_records))
+                 for _ in range(num_procs)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+
+        lines = _read_lines(self.filename)
+        self.assertEqual(len(lines), num_procs * num_records)
+        for line in lines:
+            self.assertRegex(line, r'^INFO    : pid \d+ record \d+$')
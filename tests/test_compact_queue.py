@@ -0,0 +1,162 @@
+__author__ = 'brianoneill'
+
+import logging
+import os
+import queue
+from multiprocessing import Process
+from unittest import TestCase
+
+try:
+    import prelogging
+except ImportError:
+    import sys
+    sys.path[0:0] = ['../..']
+from prelogging import (LCDict, LogListener, CompactQueueHandler,
+                        BatchingQueueListener,
+                        format_attributes, record_fields)
+from prelogging.record_codec import RECORD_FIELDS
+
+
+LOG_PATH = '_testlogs'       # NOTE: directory should already exist
+LOGFILENAME = 'test_compact_queue.log'
+
+LOGGER_NAME = 'test_compact_queue'
+
+#############################################################################
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super(ListHandler, self).__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def _worker(listener, num, worker_kwargs):
+    listener.worker_lcdict(compact=True, **worker_kwargs).config()
+    logger = logging.getLogger(LOGGER_NAME)
+    for i in range(num):
+        logger.info("record %d", i)
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        logger.exception("oops")
+
+
+class TestFormatParsing(TestCase):
+
+    def test_format_attributes(self):
+        self.assertEqual(
+            format_attributes('%(asctime)s: %(name)-20s: %(message)s'),
+            ['asctime', 'name', 'message'])
+        self.assertEqual(
+            format_attributes('{process:>6} {args[0]} {msg.x} {{literal}}',
+                              style='{'),
+            ['process', 'args', 'msg'])
+        self.assertEqual(format_attributes('$$ ${thread} $threadName',
+                                           style='$'),
+                         ['thread', 'threadName'])
+        with self.assertRaises(ValueError):
+            format_attributes('', style='#')
+
+    def test_record_fields(self):
+        lcd = LCDict()
+        lcd.add_formatter('brace', format='{lineno} {message}', style='{')
+        lcd.add_stdout_handler('out', formatter='brace')
+        lcd.add_stderr_handler('err')               # default format
+        self.assertEqual(record_fields(lcd),
+                         ('name', 'msg', 'levelno', 'exc_text', 'stack_info',
+                          'lineno'))
+        self.assertEqual(record_fields(lcd, extra=('asctime', 'lineno')),
+                         ('name', 'msg', 'levelno', 'exc_text', 'stack_info',
+                          'lineno', 'created', 'msecs'))
+
+        lcd.add_formatter('custom', ** {'()': 'logging.Formatter'})
+        lcd.add_null_handler('null', formatter='custom')
+        self.assertEqual(record_fields(lcd), RECORD_FIELDS)
+
+
+class TestCompactQueueHandler(TestCase):
+
+    def setUp(self):
+        self.logger = logging.getLogger(LOGGER_NAME)
+
+    def tearDown(self):
+        for handler in self.logger.handlers:
+            handler.close()
+        self.logger.handlers = []
+        self.logger.setLevel(logging.NOTSET)
+        self.logger.propagate = True
+
+    def test_lcdict_handler_dict(self):
+        q = queue.Queue()
+        lcd = LCDict()
+        lcd.add_queue_handler('compact', queue=q, fields=('lineno',))
+        lcd.add_queue_handler('batching', queue=q, fields=('lineno',),
+                              batch_size=5)
+        self.assertEqual(lcd.handlers['compact'],
+                         {'class': 'prelogging.CompactQueueHandler',
+                          'queue': q,
+                          'fields': ('lineno',)})
+        self.assertEqual(lcd.handlers['batching']['class'],
+                         'prelogging.BatchingQueueHandler')
+        self.assertEqual(lcd.handlers['batching']['fields'], ('lineno',))
+
+    def test_round_trip(self):
+        q = queue.Queue()
+        fields = ('lineno', 'funcName')
+        self.logger.addHandler(CompactQueueHandler(q, fields=fields))
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.propagate = False
+        self.logger.warning("hi %s", 'there')
+        item = q.get_nowait()
+        self.assertIsInstance(item, tuple)
+        self.assertEqual(len(item), 5)  # + levelno, name, msg
+
+        target = ListHandler()
+        listener = BatchingQueueListener(q, target, fields=fields)
+        listener.start()
+        q.put(item)
+        listener.stop()
+        record = target.records[0]
+        self.assertEqual(record.getMessage(), "hi there")
+        self.assertEqual(record.levelname, 'WARNING')
+        self.assertEqual(record.funcName, 'test_round_trip')
+
+    def run_listener(self, **worker_kwargs):
+        filename = os.path.join(LOG_PATH, LOGFILENAME)
+        if os.path.exists(filename):
+            os.remove(filename)
+        lcd = LCDict(log_path=LOG_PATH)
+        lcd.add_formatter('pid_line_msg',
+                          format='%(process)d %(lineno)d %(message)s')
+        lcd.add_file_handler('file', filename=LOGFILENAME,
+                             formatter='pid_line_msg')
+        lcd.add_logger(LOGGER_NAME, handlers='file', level='INFO')
+        listener = lcd.start_listener()
+        self.assertEqual(listener.fields,
+                         ('name', 'msg', 'levelno', 'exc_text', 'stack_info',
+                          'process', 'lineno'))
+
+        num_procs, num_records = 3, 30
+        procs = [Process(target=_worker,
+                         args=(listener, num_records, worker_kwargs))
+                 for _ in range(num_procs)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+        listener.stop()
+
+        with open(filename) as f:
+            text = f.read()
+        for p in procs:
+            self.assertRegex(text, r"\b%d [1-9]\d* record 0\n" % p.pid)
+        self.assertEqual(text.count("ZeroDivisionError"), num_procs)
+
+    def test_listener(self):
+        self.run_listener()
+
+    def test_listener_batches(self):
+        self.run_listener(batch_size=10)
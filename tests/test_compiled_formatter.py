@@ -0,0 +1,161 @@
+__author__ = 'brianoneill'
+
+import io
+import logging
+import sys
+import time
+from unittest import TestCase
+
+try:
+    import prelogging
+except ImportError:
+    sys.path[0:0] = ['../..']
+from prelogging import (LCDict, CachedTimeFormatter, CompiledFormatter,
+                        record_fields)
+from prelogging.formatter_presets import (_formatter_presets,
+                                          update_formatter_presets)
+
+
+LOGGER_NAME = 'test_compiled_formatter'
+
+# logging.Formatter's validate parameter is new in Python 3.8
+NO_VALIDATE = {'validate': False} if sys.version_info >= (3, 8) else {}
+
+#############################################################################
+
+class TestCompiledFormatter(TestCase):
+
+    def setUp(self):
+        self.record = logging.LogRecord(
+            'some.logger', logging.INFO, '/a/b/module.py', 17,
+            "%s and %s", ('this', 'that'), None, 'func')
+        self.record.user = 'alice'
+
+    def assertSameOutput(self, fmt, style='%', record=None,
+                         reference=logging.Formatter, **kwargs):
+        record = record or self.record
+        compiled = CompiledFormatter(fmt, style=style, **kwargs)
+        expected = reference(fmt, style=style, **kwargs).format(record)
+        self.assertEqual(compiled.format(record), expected)
+        return compiled
+
+    def test_presets(self):
+        for spec in _formatter_presets.values():
+            if spec.class_ == 'prelogging.JSONFormatter':
+                continue
+            reference = (CachedTimeFormatter if 'epoch_' in spec.format
+                         else logging.Formatter)
+            compiled = self.assertSameOutput(spec.format, spec.style,
+                                             datefmt=spec.dateformat,
+                                             reference=reference)
+            self.assertIsNotNone(compiled._render)
+
+    def test_percent_style(self):
+        self.assertSameOutput('%(levelno)03d %(lineno)-5d|%(created).3f '
+                              '100%% %(user)s %(message)r %(name)+25s')
+        self.assertSameOutput('no fields %%', **NO_VALIDATE)
+
+    def test_brace_style(self):
+        self.assertSameOutput('{asctime} {name!r:>20} {levelname:^9} '
+                              '{args[0]} {{literal}} {message}', style='{')
+        # Not compiled, but formatted as logging.Formatter would
+        compiled = self.assertSameOutput('{levelname:{lineno}} {message}',
+                                         style='{', **NO_VALIDATE)
+        self.assertIsNone(compiled._render)
+
+    def test_dollar_style(self):
+        self.assertSameOutput('$levelname $$ ${name}: $message 100%',
+                              style='$')
+
+    def test_folded_renderings_cached(self):
+        compiled = self.assertSameOutput(
+            '%(processName)-10s: %(name)-20s: %(levelname)-8s: %(message)s')
+        other = logging.LogRecord('other', logging.ERROR, __file__, 1,
+                                  "msg", None, None)
+        self.assertSameOutput(
+            '%(processName)-10s: %(name)-20s: %(levelname)-8s: %(message)s',
+            record=other)
+        self.assertEqual(compiled.format(other),
+                         "MainProcess: other               : ERROR   : msg")
+
+    def test_exceptions_and_missing_fields(self):
+        try:
+            1 / 0
+        except ZeroDivisionError:
+            record = logging.LogRecord('x', logging.ERROR, __file__, 1,
+                                       "oops", None, sys.exc_info(),
+                                       sinfo='Stack (most recent call last)')
+        self.assertSameOutput('%(levelname)s %(message)s', record=record)
+        with self.assertRaises(ValueError) as cm:
+            CompiledFormatter('%(nonesuch)s').format(self.record)
+        self.assertEqual(str(cm.exception),
+                         "Formatting field not found in record: 'nonesuch'")
+        if sys.version_info >= (3, 10):
+            self.assertSameOutput('%(nonesuch)s %(message)s',
+                                  defaults={'nonesuch': '-'})
+
+    def test_cached_time(self):
+        fmt = '%(asctime)s %(message)s'
+        records = [logging.LogRecord('x', logging.INFO, __file__, 1,
+                                     "msg", None, None)
+                   for _ in range(3)]
+        records[1].created += 0.5
+        records[2].created += 1.25
+        for datefmt in (None, '%H:%M:%S', '%Y-%m-%d %H:%M:%S'):
+            stock = logging.Formatter(fmt, datefmt=datefmt)
+            for cls in (CachedTimeFormatter, CompiledFormatter):
+                formatter = cls(fmt, datefmt=datefmt)
+                for record in records + records[:1]:
+                    record.msecs = (record.created % 1) * 1000
+                    self.assertEqual(formatter.format(record),
+                                     stock.format(record))
+                # A different converter isn't served from the cache
+                formatter.converter = stock.converter = time.gmtime
+                self.assertEqual(formatter.format(records[0]),
+                                 stock.format(records[0]))
+
+    def test_epoch_timestamps(self):
+        self.record.created = 1500000000.123456
+        for cls in (CachedTimeFormatter, CompiledFormatter):
+            formatter = cls('%(epoch_ms)d {%(epoch_ns)d}')
+            self.assertEqual(formatter.format(self.record),
+                             '1500000000123 {%d}'
+                             % int(1500000000.123456 * 1000000000))
+            self.assertEqual(self.record.epoch_ms, 1500000000123)
+        self.assertIn('created',
+                      record_fields(LCDict().add_stdout_handler(
+                          'h', formatter='epoch_ms_logger_level_msg')))
+
+    def test_lcdict(self):
+        update_formatter_presets('''\
+            compiled_level_msg
+                format: '%(levelname)-8s: %(message)s'
+                class: prelogging.CompiledFormatter
+            ''')
+        self.assertEqual(_formatter_presets['compiled_level_msg'].to_dict(),
+                         {'format': '%(levelname)-8s: %(message)s',
+                          'class': 'prelogging.CompiledFormatter',
+                          'style': '%'})
+        stream = io.StringIO()
+        lcd = LCDict()
+        lcd.add_formatter('compiled', class_='prelogging.CompiledFormatter',
+                          format='{name}: {message}', style='{')
+        lcd.add_stream_handler('stream', stream=stream, formatter='compiled')
+        lcd.add_stream_handler('stream2', stream=stream,
+                               formatter='compiled_level_msg')
+        lcd.add_logger(LOGGER_NAME, handlers=['stream', 'stream2'],
+                       propagate=False)
+        self.assertEqual(record_fields(lcd),
+                         ('name', 'msg', 'levelno', 'exc_text',
+                          'stack_info', 'levelname'))
+        lcd.config()
+        logger = logging.getLogger(LOGGER_NAME)
+        self.assertIsInstance(logger.handlers[0].formatter, CompiledFormatter)
+        logger.warning("hello %s", 'there')
+        self.assertEqual(stream.getvalue(),
+                         "test_compiled_formatter: hello there\n"
+                         "WARNING : hello there\n")
+        for handler in logger.handlers:
+            handler.close()
+        logger.handlers = []
+        del _formatter_presets['compiled_level_msg']
@@ -0,0 +1,103 @@
+__author__ = 'brianoneill'
+
+import logging
+import os
+import pickle
+import subprocess
+import sys
+from unittest import TestCase
+
+try:
+    import prelogging
+except ImportError:
+    sys.path[0:0] = ['../..']
+from prelogging import LCDict, FileLock, LockingFileHandler
+
+
+LOG_PATH = '_testlogs'       # NOTE: directory should already exist
+LOGFILENAME = 'test_flock.log'
+
+LOGGER_NAME = 'test_flock'
+
+#############################################################################
+
+def config_logging(log_path):
+    lcd = LCDict(log_path=log_path, locking='flock')
+    lcd.add_file_handler('flock_file',
+                         filename=LOGFILENAME,
+                         formatter='msg')
+    lcd.add_logger(LOGGER_NAME,
+                   handlers='flock_file',
+                   level='DEBUG',
+                   propagate=False)
+    lcd.config()
+    return lcd
+
+
+# A separately launched program that logs to the same file.
+_WORKER_SCRIPT = """
+import logging, os, sys
+sys.path[0:0] = [%(package_dir)r]
+sys.path[0:0] = [%(tests_dir)r]
+from test_flock import config_logging, LOGGER_NAME
+config_logging(%(log_path)r)
+logger = logging.getLogger(LOGGER_NAME)
+for i in range(%(num)d):
+    logger.info("pid %%d record %%d %%s", os.getpid(), i, 'x' * 100)
+"""
+
+
+class TestFlock(TestCase):
+
+    def setUp(self):
+        self.filename = os.path.join(LOG_PATH, LOGFILENAME)
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+
+    def tearDown(self):
+        logger = logging.getLogger(LOGGER_NAME)
+        for handler in logger.handlers:
+            handler.close()
+        logger.handlers = []
+
+    def test_lcdict_handler_dict(self):
+        lcd = config_logging(LOG_PATH)
+        self.assertEqual(lcd.handlers['flock_file']['lock_file'],
+                         self.filename + '.lock')
+        lcd.add_stderr_handler('con')
+        self.assertTrue(
+            lcd.handlers['con']['lock_file'].endswith('prelogging-con.lock'))
+        lcd.add_stdout_handler('con2', lock_file='my.lock')
+        self.assertEqual(lcd.handlers['con2']['lock_file'], 'my.lock')
+
+        handler = logging.getLogger(LOGGER_NAME).handlers[0]
+        self.assertIsInstance(handler, LockingFileHandler)
+        self.assertIsInstance(handler._mp_lock_, FileLock)
+
+    def test_filelock(self):
+        lock = FileLock(self.filename + '.lock')
+        lock.acquire()
+        lock.release()
+        lock2 = pickle.loads(pickle.dumps(lock))
+        self.assertEqual(lock2.path, lock.path)
+        lock2.acquire()
+        lock2.release()
+
+    def test_unrelated_processes(self):
+        tests_dir = os.path.dirname(os.path.abspath(__file__))
+        num_procs, num_records = 3, 200
+        script = _WORKER_SCRIPT % dict(
+            package_dir=os.path.dirname(tests_dir),
+            tests_dir=tests_dir,
+            log_path=os.path.abspath(LOG_PATH),
+            num=num_records)
+        procs = [subprocess.Popen([sys.executable, '-c', script])
+                 for _ in range(num_procs)]
+        for p in procs:
+            self.assertEqual(p.wait(), 0)
+
+        with open(self.filename) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(len(lines), num_procs * num_records)
+        for line in lines:
+            self.assertRegex(line, r'^pid \d+ record \d+ x{100}$')
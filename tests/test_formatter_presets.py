@@ -39,6 +39,24 @@ class Test_update_formatter_presets_from_file(TestCase):
             'process_time_logger_level_msg': FormatterSpec('%(processName)-10s: %(asctime)s:'
                                                            ' %(name)-20s: %(levelname)-8s: %(message)s'),
             'time_logger_level_msg': FormatterSpec('%(asctime)s: %(name)-20s: %(levelname)-8s: %(message)s'),
+            'cached_process_time_level_msg': FormatterSpec('%(processName)-10s: %(asctime)s:'
+                                                           ' %(levelname)-8s: %(message)s',
+                                                           class_='prelogging.CachedTimeFormatter'),
+            'cached_process_time_logger_level_msg': FormatterSpec('%(processName)-10s: %(asctime)s:'
+                                                                  ' %(name)-20s: %(levelname)-8s: %(message)s',
+                                                                  class_='prelogging.CachedTimeFormatter'),
+            'cached_time_logger_level_msg': FormatterSpec('%(asctime)s: %(name)-20s: %(levelname)-8s: %(message)s',
+                                                          class_='prelogging.CachedTimeFormatter'),
+            'epoch_ms_logger_level_msg': FormatterSpec('%(epoch_ms)d: %(name)s: %(levelname)s: %(message)s',
+                                                       class_='prelogging.CompiledFormatter'),
+            'epoch_ns_pid_logger_level_msg': FormatterSpec('%(epoch_ns)d: %(process)d: %(name)s:'
+                                                           ' %(levelname)s: %(message)s',
+                                                           class_='prelogging.CompiledFormatter'),
+            'json_time_logger_level_msg': FormatterSpec('%(asctime)s %(name)s %(levelname)s %(message)s',
+                                                        class_='prelogging.JSONFormatter'),
+            'json_epoch_ms_pid_logger_level_msg': FormatterSpec('%(epoch_ms)d %(process)d %(name)s'
+                                                                ' %(levelname)s %(message)s',
+                                                                class_='prelogging.JSONFormatter'),
         }
         # _formatter_presets contains d:
         for k in d:
@@ -200,7 +218,7 @@ class Test_read_formatter_presets(TestCase):
             _make_formatter_specs(dedent(s).splitlines(True))
         self.assertEqual(str(exc.exception),
                          "line 3: bad key 'badbadkey' -- must be one of "
-                         "'format', 'dateformat', 'style'")
+                         "'format', 'dateformat', 'style', 'class', 'static'")
 
 
 class TestStyle(TestCase):
@@ -0,0 +1,153 @@
+__author__ = 'brianoneill'
+
+import io
+import json
+import logging
+import sys
+from unittest import TestCase
+
+try:
+    import prelogging
+except ImportError:
+    sys.path[0:0] = ['../..']
+from prelogging import LCDict, JSONFormatter, record_fields
+from prelogging.formatter_presets import (_formatter_presets,
+                                          update_formatter_presets)
+from prelogging.json_formatter import orjson, ujson
+
+
+LOGGER_NAME = 'test_json_formatter'
+
+#############################################################################
+
+class TestJSONFormatter(TestCase):
+
+    def setUp(self):
+        self.record = logging.LogRecord(
+            'some.logger', logging.INFO, '/a/b/module.py', 17,
+            'says "%s"\n', ('héllo',), None, 'func')
+        self.record.user = {'id': 7, 'roles': ['admin'], 'since': None}
+        self.record.thing = object()
+
+    def test_fields(self):
+        formatter = JSONFormatter(
+            '%(asctime)s %(name)-20s %(levelname)s %(process)d %(lineno)d '
+            '%(created)f %(user)s %(message)s', datefmt='%Y')
+        obj = json.loads(formatter.format(self.record))
+        self.assertEqual(list(obj),
+                         ['asctime', 'name', 'levelname', 'process',
+                          'lineno', 'created', 'user', 'message'])
+        self.assertEqual(obj['name'], 'some.logger')
+        self.assertEqual(obj['lineno'], 17)
+        self.assertEqual(obj['created'], self.record.created)
+        self.assertEqual(obj['user'], self.record.user)
+        self.assertEqual(obj['message'], 'says "héllo"\n')
+        self.assertEqual(obj['asctime'], self.record.asctime)
+        # Styles, and fields
+        for formatter in (JSONFormatter('{levelname:8} {message}', style='{'),
+                          JSONFormatter('$levelname $message', style='$'),
+                          JSONFormatter(fields=['levelname', 'message'])):
+            self.assertEqual(
+                formatter.format(self.record),
+                '{"levelname":"INFO","message":"says \\"héllo\\"\\n"}')
+
+    def test_static_and_unencodable(self):
+        formatter = JSONFormatter('%(thing)s %(message)s',
+                                  static='{"app": "prelogging", "v": 1}')
+        obj = json.loads(formatter.format(self.record))
+        self.assertEqual(list(obj), ['app', 'v', 'thing', 'message'])
+        self.assertTrue(obj['thing'].startswith('<object object'))
+        self.assertEqual(JSONFormatter(fields=()).format(self.record), '{}')
+
+    def test_nan_and_infinity(self):
+        self.record.ratio = float('nan')
+        self.record.limits = {'max': float('inf')}
+        for encoder, module in (('json', json), ('orjson', orjson),
+                                ('ujson', ujson)):
+            if module is None:
+                continue
+            formatter = JSONFormatter('%(ratio)s %(limits)s %(message)s',
+                                      encoder=encoder)
+
+            def invalid(constant):
+                raise ValueError("%s isn't JSON" % constant)
+
+            obj = json.loads(formatter.format(self.record),
+                             parse_constant=invalid)
+            self.assertEqual(obj['message'], 'says "héllo"\n', encoder)
+        # Written as strings, as values that can't be encoded are
+        formatter = JSONFormatter('%(ratio)s %(limits)s', encoder='json')
+        self.assertEqual(json.loads(formatter.format(self.record)),
+                         {'ratio': 'nan', 'limits': "{'max': inf}"})
+
+    def test_encoders(self):
+        fmt = '%(name)s %(user)s %(created)f %(funcName)s %(message)s'
+        expected = JSONFormatter(fmt, encoder='json').format(self.record)
+        for encoder, module in (('orjson', orjson), ('ujson', ujson)):
+            if module is None:
+                with self.assertRaises(ValueError):
+                    JSONFormatter(fmt, encoder=encoder)
+            else:
+                self.assertEqual(
+                    JSONFormatter(fmt, encoder=encoder).format(self.record),
+                    expected)
+        with self.assertRaises(ValueError):
+            JSONFormatter(fmt, encoder='pickle')
+
+    def test_exceptions(self):
+        try:
+            1 / 0
+        except ZeroDivisionError:
+            record = logging.LogRecord('x', logging.ERROR, __file__, 1,
+                                       "oops", None, sys.exc_info(),
+                                       sinfo='Stack (most recent call last)')
+        obj = json.loads(JSONFormatter().format(record))
+        self.assertEqual(list(obj), ['message', 'exc_info', 'stack_info'])
+        self.assertTrue(obj['exc_info'].endswith('ZeroDivisionError: '
+                                                 'division by zero'))
+        self.assertEqual(obj['stack_info'], 'Stack (most recent call last)')
+        self.assertEqual(list(json.loads(
+                             JSONFormatter(fields=[]).format(record))),
+                         ['exc_info', 'stack_info'])
+        with self.assertRaises(ValueError):
+            JSONFormatter('%(nonesuch)s').format(record)
+
+    def test_lcdict(self):
+        update_formatter_presets('''\
+            json_app_msg
+                format: '%(levelname)s %(user)s %(message)s'
+                class: prelogging.JSONFormatter
+                static: {"app": "test"}
+            ''')
+        stream = io.StringIO()
+        lcd = LCDict()
+        lcd.add_formatter('json', class_='prelogging.JSONFormatter',
+                          fields=['name', 'message'], static={'app': 'test'})
+        self.assertEqual(lcd.formatters['json']['()'],
+                         'prelogging.JSONFormatter')
+        lcd.add_stream_handler('stream', stream=stream, formatter='json')
+        lcd.add_stream_handler('stream2', stream=stream,
+                               formatter='json_app_msg')
+        lcd.add_stream_handler('stream3', stream=stream,
+                               formatter='json_epoch_ms_pid_logger_level_msg')
+        lcd.add_logger(LOGGER_NAME, handlers=['stream', 'stream2', 'stream3'],
+                       propagate=False)
+        self.assertEqual(
+            record_fields(lcd, extra=['user']),
+            ('name', 'msg', 'levelno', 'exc_text', 'stack_info', 'levelname',
+             'user', 'created', 'process'))
+        lcd.config()
+        logger = logging.getLogger(LOGGER_NAME)
+        logger.warning("hello %s", 'there', extra={'user': 'alice'})
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual(lines[0], {'app': 'test', 'name': LOGGER_NAME,
+                                    'message': 'hello there'})
+        self.assertEqual(lines[1], {'app': 'test', 'levelname': 'WARNING',
+                                    'user': 'alice',
+                                    'message': 'hello there'})
+        self.assertEqual(list(lines[2]), ['epoch_ms', 'process', 'name',
+                                          'levelname', 'message'])
+        for handler in logger.handlers:
+            handler.close()
+        logger.handlers = []
+        del _formatter_presets['json_app_msg']
@@ -0,0 +1,122 @@
+__author__ = 'brianoneill'
+
+import logging
+import os
+from multiprocessing import Process
+from unittest import TestCase
+
+try:
+    import prelogging
+except ImportError:
+    import sys
+    sys.path[0:0] = ['../..']
+from prelogging import (LCDict, LockStats, LockingFileHandler,
+                        MPLock_Mixin, handler_lock_stats)
+
+
+LOG_PATH = '_testlogs'       # NOTE: directory should already exist
+LOGFILENAME = 'test_lock_stats.log'
+
+LOGGER_NAME = 'test_lock_stats'
+
+#############################################################################
+
+def _worker(num):
+    logger = logging.getLogger(LOGGER_NAME)
+    for i in range(num):
+        logger.info("record %d", i)
+
+
+class TestLockStats(TestCase):
+
+    def setUp(self):
+        self.filename = os.path.join(LOG_PATH, LOGFILENAME)
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+
+    def tearDown(self):
+        logger = logging.getLogger(LOGGER_NAME)
+        for handler in logger.handlers:
+            handler.close()
+        logger.handlers = []
+
+    def config_logging(self, **kwargs):
+        lcd = LCDict(log_path=LOG_PATH, locking=True)
+        lcd.add_file_handler('stats_file',
+                             filename=LOGFILENAME,
+                             formatter='msg',
+                             **kwargs)
+        lcd.add_logger(LOGGER_NAME,
+                       handlers='stats_file',
+                       level='DEBUG',
+                       propagate=False)
+        lcd.config()
+
+    def test_disabled(self):
+        self.config_logging()
+        handler = logging.getLogger(LOGGER_NAME).handlers[0]
+        self.assertIsNone(handler.lock_stats)
+        # The uninstrumented methods of the class are used
+        self.assertNotIn('_acquire_', vars(handler))
+        self.assertIs(type(handler)._acquire_, MPLock_Mixin._acquire_)
+        self.assertIsNone(handler_lock_stats('stats_file'))
+
+    def test_histogram_buckets(self):
+        stats = LockStats()
+        stats.record_wait(500)              # < 1us
+        stats.record_hold(1500)             # [1us, 2us)
+        stats.record_wait(3000)             # [2us, 4us)
+        stats.record_hold(10 ** 15)         # overflow
+        snap = stats.snapshot()
+        self.assertEqual(snap['acquisitions'], 2)
+        self.assertEqual(snap['wait']['histogram'][:3], [1, 0, 1])
+        self.assertEqual(snap['hold']['histogram'][1], 1)
+        self.assertEqual(snap['hold']['histogram'][-1], 1)
+        self.assertEqual(snap['wait']['max'], 3000 / 1e9)
+        self.assertAlmostEqual(snap['wait']['mean'], 1750 / 1e9)
+        stats.reset()
+        self.assertEqual(stats.snapshot()['acquisitions'], 0)
+
+    def test_aggregated_across_processes(self):
+        self.config_logging(lock_stats=True)
+        handler = logging.getLogger(LOGGER_NAME).handlers[0]
+        self.assertIsInstance(handler, LockingFileHandler)
+        self.assertIsInstance(handler.lock_stats, LockStats)
+
+        num_procs, num_records = 3, 50
+        _worker(num_records)                # parent logs too
+        procs = [Process(target=_worker, args=(num_records,))
+                 for _ in range(num_procs)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+
+        snap = handler_lock_stats('stats_file')
+        total = (num_procs + 1) * num_records
+        self.assertEqual(snap['acquisitions'], total)
+        self.assertEqual(sum(snap['wait']['histogram']), total)
+        self.assertEqual(sum(snap['hold']['histogram']), total)
+        self.assertGreater(snap['hold']['total'], 0)
+
+    def test_rotating_handler(self):
+        # It closes its file after each record, but stays registered
+        lcd = LCDict(log_path=LOG_PATH, locking=True)
+        lcd.add_rotating_file_handler('stats_rot_fh',
+                                      filename=LOGFILENAME,
+                                      formatter='msg',
+                                      max_bytes=10000,
+                                      lock_stats=True)
+        lcd.add_logger(LOGGER_NAME,
+                       handlers='stats_rot_fh',
+                       level='DEBUG',
+                       propagate=False)
+        lcd.config()
+        _worker(3)
+        handler = logging.getLogger(LOGGER_NAME).handlers[0]
+        self.assertIsNone(handler.stream)
+        self.assertEqual(handler_lock_stats('stats_rot_fh')['acquisitions'],
+                         3)
+        with open(self.filename) as f:
+            self.assertEqual(f.read().splitlines(),
+                             ["record %d" % i for i in range(3)])
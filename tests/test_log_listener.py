@@ -0,0 +1,92 @@
+__author__ = 'brianoneill'
+
+import logging
+import os
+from multiprocessing import Process
+from unittest import TestCase
+
+try:
+    import prelogging
+except ImportError:
+    import sys
+    sys.path[0:0] = ['../..']
+from prelogging import LCDict, LogListener
+
+
+LOG_PATH = '_testlogs'       # NOTE: directory should already exist
+LOGFILENAME = 'test_log_listener.log'
+
+LOGGER_NAME = 'test_log_listener'
+
+#############################################################################
+
+def _worker(listener, num):
+    listener.worker_lcdict().config()
+    logger = logging.getLogger(LOGGER_NAME)
+    for i in range(num):
+        logger.debug("debug %d", i)         # below the listener's level
+        logger.info("record %d", i)
+
+
+class TestLogListener(TestCase):
+
+    def setUp(self):
+        self.filename = os.path.join(LOG_PATH, LOGFILENAME)
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+
+    def tearDown(self):
+        logger = logging.getLogger(LOGGER_NAME)
+        for handler in logger.handlers:
+            handler.close()
+        logger.handlers = []
+        logger.setLevel(logging.NOTSET)
+
+    def listener_lcdict(self):
+        lcd = LCDict(log_path=LOG_PATH)
+        lcd.add_formatter('pname_msg', format='%(processName)s %(message)s')
+        lcd.add_file_handler('file', filename=LOGFILENAME,
+                             formatter='pname_msg')
+        lcd.add_logger(LOGGER_NAME, handlers='file', level='INFO',
+                       propagate=False)
+        return lcd
+
+    def run_workers(self, listener, num_procs=3, num_records=50):
+        procs = [Process(target=_worker, args=(listener, num_records),
+                         name='worker %d' % i)
+                 for i in range(num_procs)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+        listener.stop()
+        with open(self.filename) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(len(lines), num_procs * num_records)
+        for i in range(num_procs):
+            self.assertEqual(
+                [line for line in lines if line.startswith('worker %d ' % i)],
+                ['worker %d record %d' % (i, n) for n in range(num_records)])
+
+    def test_worker_lcdict(self):
+        listener = LogListener(self.listener_lcdict())
+        lcd = listener.worker_lcdict()
+        self.assertEqual(lcd.handlers['queue'],
+                         {'class': 'logging.handlers.QueueHandler',
+                          'queue': listener.queue})
+        self.assertEqual(lcd.root['handlers'], ['queue'])
+        self.assertEqual(lcd.root['level'], 'WARNING')
+        self.assertEqual(lcd.loggers[LOGGER_NAME],
+                         {'level': 'INFO', 'propagate': True})
+
+    def test_listener_process(self):
+        listener = self.listener_lcdict().start_listener()
+        self.assertIsInstance(listener, LogListener)
+        # The listener process, not this one, has the file handler
+        self.assertEqual(logging.getLogger(LOGGER_NAME).handlers, [])
+        self.run_workers(listener)
+
+    def test_listener_thread(self):
+        listener = self.listener_lcdict().start_listener(process=False)
+        self.assertEqual(len(logging.getLogger(LOGGER_NAME).handlers), 1)
+        self.run_workers(listener)
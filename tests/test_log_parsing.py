@@ -0,0 +1,170 @@
+__author__ = 'brianoneill'
+
+import logging
+import os
+import sys
+import time
+from unittest import TestCase, skipIf
+
+try:
+    import prelogging
+except ImportError:
+    sys.path[0:0] = ['../..']
+from prelogging import LogParser, parse_log
+from prelogging import log_parsing
+from prelogging.binary_log import _make_formatter
+from prelogging.formatter_presets import FormatterSpec, _formatter_presets
+
+
+LOG_PATH = '_testlogs'       # NOTE: directory should already exist
+LOGFILENAME = 'test_log_parsing.log'
+
+# Formats in which nothing distinguishes a continuation line from a record
+_NO_ANCHOR = ('msg', 'process_msg', 'logger_msg')
+
+#############################################################################
+
+def _records():
+    """Records with assorted names, levels and messages, one with a
+    traceback, created at known times."""
+    start = time.time()
+    records = []
+    for i in range(40):
+        exc_info = None
+        if i == 17:
+            try:
+                1 / 0
+            except ZeroDivisionError:
+                exc_info = sys.exc_info()
+        record = logging.LogRecord(
+            'parse.%s' % 'abc'[i % 3], (i % 5 + 1) * 10, __file__, i,
+            "record %d: %s", (i, 'x' * (i % 4)), exc_info)
+        record.created = start + i * 0.25
+        record.msecs = int((record.created % 1) * 1000)
+        records.append(record)
+    return records
+
+
+class TestLogParsing(TestCase):
+
+    def setUp(self):
+        self.filename = os.path.join(LOG_PATH, LOGFILENAME)
+        self.records = _records()
+
+    def tearDown(self):
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+
+    def write_log(self, formatter, records=None):
+        with open(self.filename, 'w') as f:
+            for record in records or self.records:
+                f.write(formatter.format(record) + '\n')
+
+    def check_columns(self, columns, records, preset=''):
+        self.assertEqual(len(columns['message']), len(records), preset)
+        for i, record in enumerate(records):
+            message = record.getMessage()
+            # JSON lines keep the traceback in "exc_info"
+            if (record.exc_text and preset not in _NO_ANCHOR and
+                    not preset.startswith('json')):
+                message += '\n' + record.exc_text
+            self.assertEqual(columns['message'][i], message, preset)
+            if 'name' in columns:
+                self.assertEqual(columns['name'][i], record.name, preset)
+            if 'levelno' in columns:
+                self.assertEqual(columns['levelno'][i], record.levelno, preset)
+            if 'timestamp' in columns:
+                self.assertAlmostEqual(columns['timestamp'][i], record.created,
+                                       delta=0.0011, msg=preset)
+
+    def test_presets(self):
+        for preset in _formatter_presets:
+            records = self.records
+            if preset in _NO_ANCHOR:
+                records = [r for r in records if not r.exc_info]
+            self.write_log(_make_formatter(preset), records)
+            columns = parse_log(self.filename, preset)
+            self.check_columns(columns, records, preset)
+
+    def test_chunks(self):
+        self.write_log(_make_formatter('time_logger_level_msg'))
+        parser = LogParser('time_logger_level_msg')
+        whole = parser.parse(self.filename)
+        for chunk_size in (1, 50, 333, 1000):
+            self.assertEqual(parser.parse(self.filename, chunk_size), whole)
+        chunks = list(parser.iter_chunks(self.filename, chunk_size=1000))
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(sum(len(c['message']) for c in chunks),
+                         len(self.records))
+        with open(self.filename, 'rb') as f:
+            self.assertEqual(parser.parse(f.read(), chunk_size=100), whole)
+
+    def test_columns(self):
+        parser = LogParser('epoch_ns_pid_logger_level_msg',
+                           columns=('levelno', 'process'))
+        self.assertEqual(parser.available,
+                         ('epoch_ns', 'process', 'name', 'levelname',
+                          'message', 'timestamp', 'levelno'))
+        self.write_log(_make_formatter('epoch_ns_pid_logger_level_msg'))
+        columns = parser.parse(self.filename)
+        self.assertEqual(sorted(columns), ['levelno', 'process'])
+        self.assertEqual(columns['levelno'],
+                         [r.levelno for r in self.records])
+        self.assertEqual(columns['process'], [os.getpid()] * 40)
+        # One column, so one group
+        columns = parse_log(self.filename, 'epoch_ns_pid_logger_level_msg',
+                            columns=('name',))
+        self.assertEqual(columns, {'name': [r.name for r in self.records]})
+
+        with self.assertRaises(ValueError):
+            LogParser('logger_level_msg', columns=('timestamp',))
+        with self.assertRaises(KeyError):
+            LogParser('no_such_preset')
+
+    def test_custom_formats(self):
+        spec = FormatterSpec(format='%(asctime)s.%(msecs)03d [%(lineno)4d] '
+                                    '%(levelname)s %(message)s',
+                             dateformat='%d/%m/%Y %H:%M:%S')
+        self.write_log(_make_formatter(format=spec.format,
+                                       dateformat=spec.dateformat))
+        columns = LogParser(spec).parse(self.filename)
+        self.check_columns(columns, self.records)
+        self.assertEqual(columns['lineno'], list(range(40)))
+        self.assertEqual(columns['msecs'],
+                         [float(r.msecs) for r in self.records])
+
+        spec = FormatterSpec(format='{created:.6f} {name:>12} '
+                                    '{levelname:<8} | {message}',
+                             style='{')
+        self.write_log(_make_formatter(format=spec.format, style='{'))
+        self.check_columns(LogParser(spec).parse(self.filename), self.records)
+
+        # A level number with no registered name
+        record = logging.LogRecord('parse', 25, __file__, 1, "between",
+                                   None, None)
+        self.write_log(_make_formatter('level_msg'), [record])
+        self.assertEqual(parse_log(self.filename, 'level_msg')['levelno'],
+                         [25])
+
+    def test_empty(self):
+        open(self.filename, 'w').close()
+        columns = parse_log(self.filename, 'time_logger_level_msg')
+        self.assertEqual(columns, {'asctime': [], 'name': [],
+                                   'levelname': [], 'message': [],
+                                   'timestamp': [], 'levelno': []})
+
+    @skipIf(log_parsing.numpy is not None, "numpy is installed")
+    def test_numpy_missing(self):
+        with self.assertRaises(ValueError):
+            parse_log(b'', 'msg', numpy=True)
+
+    @skipIf(log_parsing.numpy is None, "numpy is not installed")
+    def test_numpy(self):
+        self.write_log(_make_formatter('epoch_ms_logger_level_msg'))
+        columns = parse_log(self.filename, 'epoch_ms_logger_level_msg',
+                            numpy=True)
+        self.assertEqual(columns['levelno'].dtype.name, 'int64')
+        self.assertEqual(columns['timestamp'].dtype.name, 'float64')
+        self.assertEqual((columns['levelno'] >= logging.ERROR).sum(),
+                         sum(r.levelno >= logging.ERROR
+                             for r in self.records))
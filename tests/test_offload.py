@@ -0,0 +1,135 @@
+__author__ = 'brianoneill'
+
+import logging
+import os
+import threading
+import time
+from unittest import TestCase
+
+try:
+    import prelogging
+except ImportError:
+    import sys
+    sys.path[0:0] = ['../..']
+from prelogging import LCDict, OffloadHandler
+
+
+LOG_PATH = '_testlogs'       # NOTE: directory should already exist
+LOGFILENAME = 'test_offload.log'
+
+LOGGER_NAME = 'test_offload'
+
+#############################################################################
+
+class SlowHandler(logging.Handler):
+    """Takes a while to emit each record, and notes the thread it's on."""
+    def __init__(self, delay=0.02):
+        super(SlowHandler, self).__init__()
+        self.delay = delay
+        self.messages = []
+        self.threads = set()
+
+    def emit(self, record):
+        time.sleep(self.delay)
+        self.messages.append(self.format(record))
+        self.threads.add(threading.current_thread())
+
+
+class TestOffload(TestCase):
+
+    def setUp(self):
+        self.filename = os.path.join(LOG_PATH, LOGFILENAME)
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+        self.logger = logging.getLogger(LOGGER_NAME)
+
+    def tearDown(self):
+        for handler in self.logger.handlers:
+            handler.close()
+        self.logger.handlers = []
+        self.logger.setLevel(logging.NOTSET)
+        self.logger.propagate = True
+
+    def test_handler(self):
+        slow = SlowHandler()
+        slow.setLevel(logging.INFO)
+        handler = OffloadHandler(slow)
+        self.assertEqual(handler.level, logging.INFO)
+        self.logger.addHandler(handler)
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.propagate = False
+        start = time.time()
+        for i in range(10):
+            self.logger.debug("debug %d", i)
+            self.logger.info("record %d", i)
+        self.assertLess(time.time() - start, 10 * slow.delay)
+        handler.flush()
+        self.assertEqual(slow.messages, ["record %d" % i for i in range(10)])
+        self.assertNotIn(threading.current_thread(), slow.threads)
+        self.logger.info("last")
+        handler.close()
+        self.assertEqual(slow.messages[-1], "last")
+        # A record that arrives after close() is an error, reported as usual
+        errors = []
+        handler.handleError = errors.append
+        self.logger.info("too late")
+        self.assertEqual([r.getMessage() for r in errors], ["too late"])
+
+    def test_records_copied(self):
+        # Handlers on different threads mustn't format the same record
+        seen = []
+        kept = []
+
+        class Keep(logging.Handler):
+            def __init__(self, records):
+                super(Keep, self).__init__()
+                self.records = records
+
+            def emit(self, record):
+                self.format(record)
+                self.records.append(record)
+
+        first, second = Keep(seen), Keep(kept)
+        first.setFormatter(logging.Formatter('%(asctime)s %(message)s',
+                                             datefmt='%H:%M:%S'))
+        second.setFormatter(logging.Formatter('%(asctime)s %(message)s',
+                                              datefmt='%Y'))
+        offloaded = [OffloadHandler(first), OffloadHandler(second)]
+        self.logger.handlers = offloaded
+        self.logger.propagate = False
+        self.logger.warning("one %s", 'arg')
+        for handler in offloaded:
+            handler.flush()
+        self.assertIsNot(seen[0], kept[0])
+        self.assertEqual(len(seen[0].asctime), len('12:00:00'))
+        self.assertEqual(len(kept[0].asctime), len('2017'))
+        self.assertEqual(kept[0].message, "one arg")
+
+    def test_lcdict(self):
+        slow = SlowHandler()
+        lcd = LCDict(log_path=LOG_PATH)
+        lcd.add_file_handler('file', filename=LOGFILENAME,
+                             formatter='msg', offload=True)
+        lcd.add_handler('slow', offload=True, **{'()': lambda: slow})
+        lcd.add_null_handler('null')
+        lcd.add_logger(LOGGER_NAME, handlers=['file', 'slow', 'null'],
+                       level='DEBUG', propagate=False)
+        # offload isn't part of the handler dicts
+        self.assertEqual(lcd.handlers['slow'], {'()': lcd.handlers['slow']['()']})
+        lcd.config()
+
+        file_handler, slow_handler, null_handler = self.logger.handlers
+        self.assertIsInstance(file_handler, OffloadHandler)
+        self.assertIsInstance(file_handler.target, logging.FileHandler)
+        self.assertEqual(file_handler.target.name, 'file')
+        self.assertIs(slow_handler.target, slow)
+        self.assertIsInstance(null_handler, logging.NullHandler)
+
+        for i in range(5):
+            self.logger.info("record %d", i)
+        for handler in self.logger.handlers:
+            handler.flush()
+        with open(self.filename) as f:
+            self.assertEqual(f.read().splitlines(),
+                             ["record %d" % i for i in range(5)])
+        self.assertEqual(slow.messages, ["record %d" % i for i in range(5)])
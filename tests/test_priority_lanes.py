@@ -0,0 +1,153 @@
+__author__ = 'brianoneill'
+
+import logging
+import os
+import queue
+import time
+from multiprocessing import Process
+from unittest import TestCase
+
+try:
+    import prelogging
+except ImportError:
+    import sys
+    sys.path[0:0] = ['../..']
+from prelogging import LCDict, LogListener, PriorityQueueHandler, LaneStats
+
+
+LOG_PATH = '_testlogs'       # NOTE: directory should already exist
+LOGFILENAME = 'test_priority_lanes.log'
+
+LOGGER_NAME = 'test_priority_lanes'
+
+#############################################################################
+
+class SlowHandler(logging.Handler):
+    def __init__(self, delay=0.002):
+        super(SlowHandler, self).__init__()
+        self.delay = delay
+        self.messages = []
+
+    def emit(self, record):
+        time.sleep(self.delay)
+        self.messages.append(record.getMessage())
+
+
+def _worker(listener, num):
+    listener.worker_lcdict(compact=True).config()
+    logger = logging.getLogger(LOGGER_NAME)
+    for i in range(num):
+        logger.info("record %d", i)
+    logger.error("error")
+
+
+class TestPriorityLanes(TestCase):
+
+    def setUp(self):
+        self.logger = logging.getLogger(LOGGER_NAME)
+
+    def tearDown(self):
+        for handler in self.logger.handlers:
+            handler.close()
+        self.logger.handlers = []
+        self.logger.setLevel(logging.NOTSET)
+        self.logger.propagate = True
+
+    def test_handler_lanes(self):
+        q, express = queue.Queue(), queue.Queue()
+        handler = PriorityQueueHandler(q, express, express_level='WARNING')
+        for level in (logging.INFO, logging.WARNING, logging.DEBUG):
+            handler.handle(self.logger.makeRecord(
+                LOGGER_NAME, level, __file__, 1, "msg", None, None))
+        self.assertEqual(express.get_nowait().levelno, logging.WARNING)
+        items = [q.get_nowait() for _ in range(3)]
+        self.assertEqual(items[1], '__express__')
+        self.assertEqual([items[0].levelno, items[2].levelno],
+                         [logging.INFO, logging.DEBUG])
+
+    def test_lcdict_handler_dict(self):
+        q, express = queue.Queue(), queue.Queue()
+        lcd = LCDict()
+        lcd.add_queue_handler('lanes', queue=q, express_queue=express)
+        self.assertEqual(lcd.handlers['lanes'],
+                         {'class': 'prelogging.PriorityQueueHandler',
+                          'queue': q,
+                          'express_queue': express})
+        with self.assertRaises(ValueError):
+            lcd.add_queue_handler('both', queue=q, express_queue=express,
+                                  batch_size=10)
+
+    def test_errors_bypass_backlog(self):
+        slow = SlowHandler()
+        lcd = LCDict()
+        lcd.add_handler('slow', **{'()': lambda: slow})
+        lcd.add_logger(LOGGER_NAME, handlers='slow', level='DEBUG',
+                       propagate=False)
+        listener = LogListener(lcd, process=False, express_level='ERROR')
+        self.assertIn('created', listener.fields)
+        handler = listener.worker_lcdict().handlers['queue']
+        self.assertIs(handler['express_queue'], listener.express_queue)
+        worker = PriorityQueueHandler(listener.queue, listener.express_queue,
+                                      express_level='ERROR')
+        with listener:
+            for i in range(200):
+                worker.handle(self.logger.makeRecord(
+                    LOGGER_NAME, logging.INFO, __file__, 1,
+                    "record %d", (i,), None))
+            worker.handle(self.logger.makeRecord(
+                LOGGER_NAME, logging.ERROR, __file__, 1, "error", None, None))
+        self.assertEqual(len(slow.messages), 201)
+        self.assertLess(slow.messages.index("error"), 50)
+        stats = listener.lane_stats.snapshot()
+        self.assertEqual(stats['express']['count'], 1)
+        self.assertEqual(stats['normal']['count'], 200)
+        self.assertLess(stats['express']['max'], stats['normal']['max'])
+        self.assertEqual(sum(stats['normal']['histogram']), 200)
+
+    def test_multiprocess(self):
+        self.check_multiprocess(process=True)
+
+    def test_multiprocess_listener_thread(self):
+        # Workers are processes even when the listener is a thread
+        self.check_multiprocess(process=False)
+
+    def check_multiprocess(self, process):
+        filename = os.path.join(LOG_PATH, LOGFILENAME)
+        if os.path.exists(filename):
+            os.remove(filename)
+        lcd = LCDict(log_path=LOG_PATH)
+        lcd.add_formatter('pname_msg', format='%(processName)s %(message)s')
+        lcd.add_file_handler('file', filename=LOGFILENAME,
+                             formatter='pname_msg')
+        lcd.add_logger(LOGGER_NAME, handlers='file', level='INFO',
+                       propagate=False)
+        listener = lcd.start_listener(process=process, express_level='ERROR')
+        procs = [Process(target=_worker, args=(listener, 50),
+                         name='worker %d' % i)
+                 for i in range(3)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+        listener.stop()
+        with open(filename) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(len(lines), 3 * 51)
+        self.assertEqual(len([line for line in lines
+                              if line.endswith(' error')]), 3)
+        stats = listener.lane_stats.snapshot()
+        self.assertEqual(stats['express']['count'], 3)
+        self.assertEqual(stats['normal']['count'], 150)
+
+    def test_lane_stats(self):
+        stats = LaneStats()
+        stats.record(LaneStats.EXPRESS, 0.0000005)
+        stats.record(LaneStats.EXPRESS, 0.003)
+        snap = stats.snapshot()
+        self.assertEqual(snap['express']['count'], 2)
+        self.assertAlmostEqual(snap['express']['max'], 0.003)
+        self.assertEqual(snap['express']['histogram'][0], 1)
+        self.assertEqual(snap['express']['histogram'][12], 1)
+        self.assertEqual(snap['normal']['count'], 0)
+        stats.reset()
+        self.assertEqual(stats.snapshot()['express']['count'], 0)
@@ -0,0 +1,129 @@
+__author__ = 'brianoneill'
+
+import io
+import logging
+import queue
+from unittest import TestCase
+
+try:
+    import prelogging
+except ImportError:
+    import sys
+    sys.path[0:0] = ['../..']
+from prelogging import (LCDict, attributes_needed, unused_switches,
+                        trim_record_collection, restore_record_collection)
+from prelogging.record_codec import RECORD_FIELDS
+
+
+LOGGER_NAME = 'test_record_trimming'
+
+#############################################################################
+
+class TestRecordTrimming(TestCase):
+
+    def setUp(self):
+        self.logger = logging.getLogger(LOGGER_NAME)
+        self.srcfile = logging._srcfile
+
+    def tearDown(self):
+        restore_record_collection()
+        for handler in self.logger.handlers:
+            handler.close()
+        self.logger.handlers = []
+        self.logger.filters = []
+        self.logger.setLevel(logging.NOTSET)
+        self.logger.propagate = True
+
+    def lcdict(self, stream, **formatter_kwargs):
+        lcd = LCDict()
+        lcd.add_formatter('fmt', **formatter_kwargs)
+        lcd.add_stream_handler('stream', stream=stream, formatter='fmt')
+        lcd.add_logger(LOGGER_NAME, handlers='stream', level='DEBUG',
+                       propagate=False)
+        return lcd
+
+    def test_attributes_needed(self):
+        lcd = LCDict()
+        lcd.add_stdout_handler('out', formatter='msg')
+        self.assertEqual(unused_switches(attributes_needed(lcd))[:4],
+                         ['_srcfile', 'logThreads', 'logProcesses',
+                          'logMultiprocessing'])
+        lcd.add_formatter('dollar', format='$threadName ${lineno} $message',
+                          style='$')
+        lcd.add_stderr_handler('err', formatter='dollar')
+        self.assertEqual(unused_switches(attributes_needed(lcd))[:2],
+                         ['logProcesses', 'logMultiprocessing'])
+        # Compact queue handler: its fields are needed too
+        lcd.add_queue_handler('compact', queue=queue.Queue(),
+                              fields=('process',))
+        self.assertIn('process', attributes_needed(lcd))
+        # A plain queue handler sends everything on
+        lcd.add_queue_handler('q', queue=queue.Queue())
+        self.assertEqual(attributes_needed(lcd), RECORD_FIELDS)
+        self.assertEqual(unused_switches(RECORD_FIELDS), [])
+
+    def test_attributes_needed_locking(self):
+        # LCDict's locking handlers are created by factories, whose needs
+        # are known
+        lcd = LCDict(log_path='_testlogs', locking=True)
+        lcd.add_formatter('fmt', format='%(process)d %(message)s')
+        lcd.add_file_handler('file', filename='unused.log', formatter='fmt',
+                             delay=True)
+        lcd.add_rotating_file_handler('rot', filename='unused_rot.log',
+                                      formatter='fmt', delay=True)
+        lcd.add_stderr_handler('err', formatter='fmt')
+        self.assertEqual(lcd.handlers['file']['()'],
+                         'ext://prelogging.LockingFileHandler')
+        self.assertEqual(unused_switches(attributes_needed(lcd))[:3],
+                         ['_srcfile', 'logThreads', 'logMultiprocessing'])
+        # Binary logfiles record attributes themselves
+        lcd.add_file_handler('binary', filename='unused.binlog',
+                             binary=True, delay=True)
+        self.assertEqual(attributes_needed(lcd), RECORD_FIELDS)
+
+    def test_config_trims(self):
+        stream = io.StringIO()
+        self.lcdict(stream, format='{threadName} {message}',
+                    style='{').config(trim_records=True)
+        self.assertIsNone(logging._srcfile)
+        self.assertTrue(logging.logThreads)
+        self.assertFalse(logging.logProcesses)
+        self.assertFalse(logging.logMultiprocessing)
+        self.logger.info("hello")
+        self.assertEqual(stream.getvalue(), "MainThread hello\n")
+        record = self.logger.makeRecord(LOGGER_NAME, logging.INFO, 'f', 1,
+                                        'm', None, None)
+        self.assertIsNone(record.process)
+
+        restore_record_collection()
+        self.assertEqual(logging._srcfile, self.srcfile)
+        self.assertTrue(logging.logProcesses)
+
+    def test_trim_below_level(self):
+        stream = io.StringIO()
+        self.lcdict(stream, format='%(levelname)s %(message)s'
+                    ).config(trim_records='ERROR')
+        self.assertIsNone(logging._srcfile)
+        records = []
+        self.logger.addFilter(lambda record: records.append(record) or True)
+        self.logger.info("info")
+        self.logger.error("error")
+        self.assertEqual(stream.getvalue(), "INFO info\nERROR error\n")
+        info, error = records
+        self.assertEqual(info.funcName, "(unknown function)")
+        self.assertIsNone(info.thread)
+        self.assertIsNone(info.process)
+        self.assertEqual(error.funcName, "test_trim_below_level")
+        self.assertEqual(error.filename, "test_record_trimming.py")
+        self.assertEqual(error.module, "test_record_trimming")
+        self.assertIsNotNone(error.thread)
+        self.assertIsNotNone(error.process)
+        self.assertEqual(error.processName, "MainProcess")
+
+    def test_retrim_restores_first(self):
+        trim_record_collection(['logThreads'])
+        trim_record_collection(['logProcesses'])
+        self.assertTrue(logging.logThreads)
+        self.assertFalse(logging.logProcesses)
+        restore_record_collection()
+        self.assertTrue(logging.logProcesses)
@@ -0,0 +1,118 @@
+__author__ = 'brianoneill'
+
+import glob
+import gzip
+import logging
+import lzma
+import os
+from multiprocessing import Process
+from unittest import TestCase
+
+try:
+    import prelogging
+except ImportError:
+    import sys
+    sys.path[0:0] = ['../..']
+from prelogging import LCDict, LockingRotatingFileHandler
+
+
+LOG_PATH = '_testlogs/rot_fh/'      # NOTE: directory must exist
+LOGFILENAME = 'test_rot_fh_compress.log'
+
+LOGGER_NAME = 'test_rot_fh_compress'
+
+#############################################################################
+
+def _worker(num):
+    logger = logging.getLogger(LOGGER_NAME)
+    for i in range(num):
+        logger.info("pid %d record %d", os.getpid(), i)
+
+
+class TestLockingRotatingFileHandlerCompress(TestCase):
+
+    def setUp(self):
+        self.filename = os.path.join(LOG_PATH, LOGFILENAME)
+        for fn in glob.glob(self.filename + '*'):
+            os.remove(fn)
+
+    def tearDown(self):
+        logger = logging.getLogger(LOGGER_NAME)
+        for handler in logger.handlers:
+            handler.close()
+        logger.handlers = []
+
+    def config_logging(self, locking=True, **kwargs):
+        lcd = LCDict(log_path=LOG_PATH, locking=locking)
+        lcd.add_rotating_file_handler('rot_fh',
+                                      filename=LOGFILENAME,
+                                      formatter='msg',
+                                      **kwargs)
+        lcd.add_logger(LOGGER_NAME,
+                       handlers='rot_fh',
+                       level='DEBUG',
+                       propagate=False)
+        lcd.config()
+        return lcd
+
+    def read_all(self):
+        """Return the lines of the logfile and all its backups."""
+        lines = []
+        for fn in glob.glob(self.filename + '*'):
+            opener = (gzip.open if fn.endswith('.gz') else
+                      lzma.open if fn.endswith('.xz') else
+                      open)
+            with opener(fn, 'rt') as f:
+                lines.extend(f.read().splitlines())
+        return lines
+
+    def test_lcdict_handler_dict(self):
+        lcd = self.config_logging(locking=False, compress='xz',
+                                  max_bytes=100, backup_count=2)
+        self.assertEqual(lcd.handlers['rot_fh']['()'],
+                         'ext://prelogging.LockingRotatingFileHandler')
+        self.assertEqual(lcd.handlers['rot_fh']['compress'], 'xz')
+        self.assertNotIn('create_lock', lcd.handlers['rot_fh'])
+        handler = logging.getLogger(LOGGER_NAME).handlers[0]
+        self.assertIsInstance(handler, LockingRotatingFileHandler)
+        self.assertEqual(handler.compress, 'xz')
+
+        with self.assertRaises(ValueError):
+            LockingRotatingFileHandler(self.filename, compress='zip')
+
+    def test_retention(self):
+        self.config_logging(compress='gzip', max_bytes=100, backup_count=3)
+        logger = logging.getLogger(LOGGER_NAME)
+        handler = logger.handlers[0]
+        for i in range(6):
+            logger.info(str(i) * 60)          # one record per file
+            handler.wait_for_compression()
+
+        self.assertEqual(sorted(glob.glob(self.filename + '*')),
+                         [self.filename,
+                          self.filename + '.1.gz',
+                          self.filename + '.2.gz',
+                          self.filename + '.3.gz'])
+        with open(self.filename) as f:
+            self.assertEqual(f.read(), "5" * 60 + "\n")
+        for n in (1, 2, 3):
+            with gzip.open(self.filename + '.%d.gz' % n, 'rt') as f:
+                self.assertEqual(f.read(), str(5 - n) * 60 + "\n")
+
+    def test_multiprocessing(self):
+        num_procs, num_records = 4, 200
+        self.config_logging(compress='gzip', max_bytes=2000,
+                            backup_count=1000)
+        procs = [Process(target=_worker, args=(num_records,))
+                 for _ in range(num_procs)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+
+        self.assertEqual(glob.glob(self.filename + '*.pending*'), [])
+        self.assertGreater(len(glob.glob(self.filename + '.*.gz')), 1)
+        lines = self.read_all()
+        self.assertEqual(len(lines), num_procs * num_records)
+        for line in lines:
+            self.assertRegex(line, r'^pid \d+ record \d+$')
@@ -0,0 +1,108 @@
+__author__ = 'brianoneill'
+
+import glob
+import logging
+import os
+from multiprocessing import Process
+from unittest import TestCase
+
+try:
+    import prelogging
+except ImportError:
+    import sys
+    sys.path[0:0] = ['../..']
+from prelogging import LCDict, LockingRotatingFileHandler
+
+
+LOG_PATH = '_testlogs/rot_fh/'      # NOTE: directory must exist
+LOGFILENAME = 'test_rot_fh_keep_open.log'
+
+LOGGER_NAME = 'test_rot_fh_keep_open'
+
+#############################################################################
+
+def _worker(num):
+    logger = logging.getLogger(LOGGER_NAME)
+    for i in range(num):
+        logger.info("pid %d record %d", os.getpid(), i)
+
+
+class TestLockingRotatingFileHandlerKeepOpen(TestCase):
+
+    def setUp(self):
+        self.filename = os.path.join(LOG_PATH, LOGFILENAME)
+        for fn in glob.glob(self.filename + '*'):
+            os.remove(fn)
+
+    def tearDown(self):
+        logger = logging.getLogger(LOGGER_NAME)
+        for handler in logger.handlers:
+            handler.close()
+        logger.handlers = []
+
+    def config_logging(self, max_bytes, backup_count):
+        lcd = LCDict(log_path=LOG_PATH, locking=True)
+        lcd.add_rotating_file_handler('rot_fh',
+                                      filename=LOGFILENAME,
+                                      formatter='msg',
+                                      max_bytes=max_bytes,
+                                      backup_count=backup_count,
+                                      keep_open=True)
+        lcd.add_logger(LOGGER_NAME,
+                       handlers='rot_fh',
+                       level='DEBUG',
+                       propagate=False)
+        lcd.config()
+        return lcd
+
+    def test_lcdict_handler_dict(self):
+        lcd = self.config_logging(max_bytes=1000, backup_count=2)
+        self.assertEqual(
+            lcd.handlers['rot_fh']['()'],
+            'ext://prelogging.LockingRotatingFileHandler')
+        self.assertEqual(lcd.handlers['rot_fh']['keep_open'], True)
+        handler = logging.getLogger(LOGGER_NAME).handlers[0]
+        self.assertIsInstance(handler, LockingRotatingFileHandler)
+        self.assertTrue(handler.keep_open)
+
+    def test_stays_open(self):
+        self.config_logging(max_bytes=0, backup_count=0)
+        logger = logging.getLogger(LOGGER_NAME)
+        handler = logger.handlers[0]
+        logger.info("one")
+        stream = handler.stream
+        self.assertIsNotNone(stream)
+        logger.info("two")
+        self.assertIs(handler.stream, stream)
+
+    def test_reopens_after_external_rotation(self):
+        self.config_logging(max_bytes=0, backup_count=0)
+        logger = logging.getLogger(LOGGER_NAME)
+        logger.info("one")
+        # Another process (here, us) rotates the file
+        os.rename(self.filename, self.filename + '.1')
+        logger.info("two")
+        with open(self.filename) as f:
+            self.assertEqual(f.read(), "two\n")
+        with open(self.filename + '.1') as f:
+            self.assertEqual(f.read(), "one\n")
+
+    def test_multiprocessing(self):
+        num_procs, num_records = 4, 200
+        self.config_logging(max_bytes=2000, backup_count=1000)
+        procs = [Process(target=_worker, args=(num_records,))
+                 for _ in range(num_procs)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+
+        lines = []
+        for fn in glob.glob(self.filename + '*'):
+            with open(fn) as f:
+                text = f.read()
+            self.assertNotIn('\0', text)
+            lines.extend(text.splitlines())
+        self.assertEqual(len(lines), num_procs * num_records)
+        for line in lines:
+            self.assertRegex(line, r'^pid \d+ record \d+$')
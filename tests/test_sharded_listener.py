@@ -0,0 +1,132 @@
+__author__ = 'brianoneill'
+
+import logging
+import os
+import threading
+import time
+from multiprocessing import Process
+from unittest import TestCase
+
+try:
+    import prelogging
+except ImportError:
+    import sys
+    sys.path[0:0] = ['../..']
+from prelogging import LCDict, LogListener, OffloadHandler
+
+
+LOG_PATH = '_testlogs'       # NOTE: directory should already exist
+
+LOGGER_NAME = 'test_sharded_listener'
+
+#############################################################################
+
+class SlowHandler(logging.Handler):
+    def __init__(self, delay=0.01):
+        super(SlowHandler, self).__init__()
+        self.delay = delay
+        self.messages = []
+        self.threads = set()
+
+    def emit(self, record):
+        time.sleep(self.delay)
+        self.messages.append(record.getMessage())
+        self.threads.add(threading.current_thread().name)
+
+
+def _worker(listener, num):
+    listener.worker_lcdict().config()
+    logger = logging.getLogger(LOGGER_NAME)
+    for i in range(num):
+        logger.info("record %d", i)
+
+
+class TestShardedListener(TestCase):
+
+    def setUp(self):
+        self.logger = logging.getLogger(LOGGER_NAME)
+
+    def tearDown(self):
+        for handler in self.logger.handlers:
+            handler.close()
+        self.logger.handlers = []
+        self.logger.setLevel(logging.NOTSET)
+        self.logger.propagate = True
+
+    def slow_lcdict(self, num_handlers):
+        handlers = [SlowHandler() for _ in range(num_handlers)]
+        lcd = LCDict()
+        for i, handler in enumerate(handlers):
+            lcd.add_handler('slow%d' % i, **{'()': lambda h=handler: h})
+        lcd.add_logger(LOGGER_NAME, handlers=list(lcd.handlers),
+                       level='DEBUG', propagate=False)
+        return lcd, handlers
+
+    def run_listener(self, num_records, shards):
+        lcd, handlers = self.slow_lcdict(4)
+        start = time.time()
+        with LogListener(lcd, process=False, shards=shards) as listener:
+            for i in range(num_records):
+                listener.queue.put(self.logger.makeRecord(
+                    LOGGER_NAME, logging.INFO, __file__, 1,
+                    "record %d", (i,), None))
+        elapsed = time.time() - start
+        for handler in handlers:
+            self.assertEqual(handler.messages,
+                             ["record %d" % i for i in range(num_records)])
+        return elapsed, handlers
+
+    def test_shard_assignment(self):
+        lcd, handlers = self.slow_lcdict(5)
+        lcd.add_null_handler('null', offload='own', attach_to_root=False)
+        lcd.config()
+        offloaders = prelogging.queue_handlers._shard_handlers(lcd, 2)
+        self.assertEqual(len(offloaders), 5)
+        self.assertEqual([h.thread.name for h in offloaders],
+                         ['OffloadThread(shard %d)' % (i % 2)
+                          for i in range(5)])
+        self.assertIs(offloaders[0].thread, offloaders[2].thread)
+        self.assertTrue(all(isinstance(h, OffloadHandler)
+                            for h in self.logger.handlers))
+
+    def test_shared_thread_stops_with_last_handler(self):
+        lcd, handlers = self.slow_lcdict(2)
+        for name in lcd.handlers:
+            lcd._offloaded[name] = 'both'
+        lcd.config()
+        first, second = self.logger.handlers
+        thread = first.thread._thread
+        self.assertIs(first.thread, second.thread)
+        first.close()
+        self.assertTrue(thread.is_alive())
+        second.close()
+        self.assertFalse(thread.is_alive())
+
+    def test_throughput_scales(self):
+        num_records = 25
+        serial, _ = self.run_listener(num_records, shards=0)
+        sharded, handlers = self.run_listener(num_records, shards=4)
+        self.assertEqual(len(set().union(*[h.threads for h in handlers])), 4)
+        self.assertLess(sharded, serial * 0.6)
+
+    def test_process(self):
+        filenames = [os.path.join(LOG_PATH, 'test_sharded_%d.log' % i)
+                     for i in range(3)]
+        lcd = LCDict(log_path=LOG_PATH)
+        for i, filename in enumerate(filenames):
+            if os.path.exists(filename):
+                os.remove(filename)
+            lcd.add_file_handler('file%d' % i,
+                                 filename=os.path.basename(filename),
+                                 formatter='msg')
+        lcd.add_logger(LOGGER_NAME, handlers=list(lcd.handlers),
+                       level='INFO', propagate=False)
+        listener = lcd.start_listener(shards=2)
+        worker = Process(target=_worker, args=(listener, 100))
+        worker.start()
+        worker.join()
+        listener.stop()
+        for filename in filenames:
+            with open(filename) as f:
+                self.assertEqual(f.read().splitlines(),
+                                 ["record %d" % i for i in range(100)])
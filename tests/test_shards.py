@@ -0,0 +1,128 @@
+__author__ = 'brianoneill'
+
+import io
+import logging
+import os
+import time
+from multiprocessing import Process
+from unittest import TestCase
+
+try:
+    import prelogging
+except ImportError:
+    import sys
+    sys.path[0:0] = ['../..']
+from prelogging import (LCDict, ShardedFileHandler,
+                        shard_filenames, merge_shards)
+from prelogging.shards import main as shards_main
+
+
+LOG_PATH = '_testlogs'       # NOTE: directory should already exist
+LOGFILENAME = 'test_shards.log'
+
+LOGGER_NAME = 'test_shards'
+
+#############################################################################
+
+def _worker(num):
+    logger = logging.getLogger(LOGGER_NAME)
+    for i in range(num):
+        logger.info("record %d", i)
+        time.sleep(0.002)
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        logger.exception("pid %d done", os.getpid())
+
+
+class TestShards(TestCase):
+
+    def setUp(self):
+        self.filename = os.path.join(LOG_PATH, LOGFILENAME)
+        for fn in shard_filenames(self.filename):
+            os.remove(fn)
+
+    def tearDown(self):
+        logger = logging.getLogger(LOGGER_NAME)
+        for handler in logger.handlers:
+            handler.close()
+        logger.handlers = []
+
+    def config_logging(self, **kwargs):
+        lcd = LCDict(log_path=LOG_PATH)
+        lcd.add_sharded_file_handler('shards',
+                                     filename=LOGFILENAME,
+                                     **kwargs)
+        lcd.add_logger(LOGGER_NAME,
+                       handlers='shards',
+                       level='DEBUG',
+                       propagate=False)
+        lcd.config()
+        return lcd
+
+    def test_lcdict_handler_dict(self):
+        lcd = self.config_logging()
+        self.assertEqual(
+            lcd.handlers['shards'],
+            {'class': 'prelogging.ShardedFileHandler',
+             'filename': self.filename,
+             'formatter': 'process_time_logger_level_msg',
+             'mode': 'a',
+             'shard_by': 'pid'}
+        )
+        handler = logging.getLogger(LOGGER_NAME).handlers[0]
+        self.assertIsInstance(handler, ShardedFileHandler)
+        # Nothing logged, so no shards
+        self.assertEqual(shard_filenames(self.filename), [])
+
+    def test_shard_by_process_name(self):
+        self.config_logging(shard_by='process_name')
+        logging.getLogger(LOGGER_NAME).info("hello")
+        self.assertEqual(shard_filenames(self.filename),
+                         [os.path.join(LOG_PATH, 'test_shards.MainProcess.log')])
+
+    def test_bad_shard_by(self):
+        with self.assertRaises(ValueError):
+            ShardedFileHandler(self.filename, shard_by='thread')
+
+    def test_merge(self):
+        self.config_logging()
+        num_procs, num_records = 3, 20
+        procs = [Process(target=_worker, args=(num_records,))
+                 for _ in range(num_procs)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+
+        shards = shard_filenames(self.filename)
+        self.assertEqual(
+            sorted(shards),
+            sorted(os.path.join(LOG_PATH, 'test_shards.%d.log' % p.pid)
+                   for p in procs))
+
+        out = io.StringIO()
+        count = merge_shards(self.filename, out)
+        self.assertEqual(count, num_procs * (num_records + 1))
+
+        text = out.getvalue()
+        lines = text.splitlines()
+        # Every line of each traceback follows its record
+        self.assertEqual(text.count('ZeroDivisionError'), num_procs)
+        for i, line in enumerate(lines):
+            if line.startswith('Traceback'):
+                self.assertIn(' done', lines[i - 1])
+        # Records are in time order
+        timestamps = [line.split(': ')[1] for line in lines
+                      if line.startswith('Process-')]
+        self.assertEqual(len(timestamps), count)
+        self.assertEqual(timestamps, sorted(timestamps))
+
+    def test_main(self):
+        self.config_logging()
+        logging.getLogger(LOGGER_NAME).info("hello")
+        merged = os.path.join(LOG_PATH, 'test_shards_merged.txt')
+        shards_main([merged, self.filename])
+        with open(merged) as f:
+            self.assertTrue(f.read().endswith("hello\n"))
+        os.remove(merged)
@@ -0,0 +1,178 @@
+__author__ = 'brianoneill'
+
+import logging
+import sys
+from multiprocessing import Process
+from unittest import TestCase, skipIf
+
+try:
+    import prelogging
+except ImportError:
+    import sys
+    sys.path[0:0] = ['../..']
+from prelogging import (LCDict, RecordCodec,
+                        ShmRing, ShmRingHandler, ShmRingListener)
+from prelogging.shm_ring import shared_memory
+
+
+LOGGER_NAME = 'test_shm_ring'
+
+#############################################################################
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super(ListHandler, self).__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def _worker(ring, num):
+    lcd = LCDict()
+    lcd.add_shm_ring_handler('ring', ring=ring)
+    lcd.add_logger(LOGGER_NAME, handlers='ring', level='DEBUG', propagate=False)
+    lcd.config()
+    logger = logging.getLogger(LOGGER_NAME)
+    for i in range(num):
+        logger.info("record %d", i)
+
+
+class TestRecordCodec(TestCase):
+
+    def test_round_trip(self):
+        codec = RecordCodec()
+        logger = logging.getLogger(LOGGER_NAME)
+        record = logger.makeRecord(LOGGER_NAME, logging.WARNING, __file__, 42,
+                                   "%s and %d", ('spam', 3), None)
+        decoded = codec.decode(codec.encode(record))
+        self.assertEqual(decoded.getMessage(), "spam and 3")
+        self.assertIsNone(decoded.args)
+        for field in ('name', 'levelno', 'levelname', 'lineno',
+                      'created', 'process', 'processName'):
+            self.assertEqual(getattr(decoded, field), getattr(record, field))
+
+    def test_exception_rendered(self):
+        codec = RecordCodec(fields=('exc_text',))
+        self.assertEqual(codec.fields, ('exc_text', 'levelno', 'name', 'msg'))
+        try:
+            1 / 0
+        except ZeroDivisionError:
+            record = logging.getLogger(LOGGER_NAME).makeRecord(
+                LOGGER_NAME, logging.ERROR, __file__, 1, "oops", None,
+                sys.exc_info())
+        decoded = codec.decode(codec.encode(record))
+        self.assertIsNone(decoded.exc_info)
+        self.assertIn('ZeroDivisionError', decoded.exc_text)
+        self.assertIn('ZeroDivisionError', logging.Formatter().format(decoded))
+
+
+@skipIf(shared_memory is None, "requires Python 3.8+")
+class TestShmRing(TestCase):
+
+    def tearDown(self):
+        logger = logging.getLogger(LOGGER_NAME)
+        for handler in logger.handlers:
+            handler.close()
+        logger.handlers = []
+
+    def test_fifo_and_stats(self):
+        ring = ShmRing(slots=4, slot_size=32)
+        try:
+            for i in range(3):
+                self.assertTrue(ring.put(b'item %d' % i))
+            self.assertEqual(len(ring), 3)
+            self.assertEqual([ring.get(timeout=0) for _ in range(4)],
+                             [b'item 0', b'item 1', b'item 2', None])
+            self.assertFalse(ring.put(b'x' * 29))
+            stats = ring.stats()
+            self.assertEqual(stats['written'], 3)
+            self.assertEqual(stats['oversized'], 1)
+            self.assertEqual(stats['high_water'], 3)
+            self.assertEqual(stats['pending'], 0)
+        finally:
+            ring.close()
+
+    def test_policies(self):
+        ring = ShmRing(slots=2, slot_size=16, policy='drop')
+        try:
+            self.assertEqual([ring.put(b'%d' % i) for i in range(3)],
+                             [True, True, False])
+            self.assertEqual(ring.stats()['dropped'], 1)
+            self.assertEqual(ring.get(timeout=0), b'0')
+        finally:
+            ring.close()
+
+        ring = ShmRing(slots=2, slot_size=16, policy='overwrite')
+        try:
+            for i in range(5):
+                self.assertTrue(ring.put(b'%d' % i))
+            self.assertEqual(ring.stats()['overwritten'], 3)
+            self.assertEqual([ring.get(timeout=0) for _ in range(3)],
+                             [b'3', b'4', None])
+        finally:
+            ring.close()
+
+        ring = ShmRing(slots=1, slot_size=16, block_timeout=0.01)
+        try:
+            self.assertTrue(ring.put(b'0'))
+            self.assertFalse(ring.put(b'1'))
+            self.assertEqual(ring.stats()['dropped'], 1)
+        finally:
+            ring.close()
+
+        with self.assertRaises(ValueError):
+            ShmRing(policy='wait')
+
+    def test_lcdict_handler_dict(self):
+        ring = ShmRing(slots=4, slot_size=256)
+        try:
+            lcd = LCDict()
+            lcd.add_shm_ring_handler('ring', ring=ring, level='INFO')
+            self.assertEqual(lcd.handlers['ring'],
+                             {'class': 'prelogging.ShmRingHandler',
+                              'level': 'INFO',
+                              'ring': ring})
+        finally:
+            ring.close()
+
+    def test_multiprocess(self):
+        ring = ShmRing(slots=16, slot_size=256, policy='block')
+        handler = ListHandler()
+        listener = ShmRingListener(ring, handler)
+        listener.start()
+        num_procs, num_records = 3, 100
+        procs = [Process(target=_worker, args=(ring, num_records))
+                 for _ in range(num_procs)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+        listener.stop()
+        stats = ring.stats()
+        ring.close()
+
+        self.assertEqual(stats['written'], num_procs * num_records)
+        self.assertEqual(stats['dropped'], 0)
+        self.assertEqual(len(handler.records), num_procs * num_records)
+        # Each process's records arrive in order
+        for p in procs:
+            msgs = [r.getMessage() for r in handler.records
+                    if r.process == p.pid]
+            self.assertEqual(msgs, ["record %d" % i
+                                    for i in range(num_records)])
+
+    def test_listener_dispatches_to_loggers(self):
+        ring = ShmRing(slots=8, slot_size=256)
+        handler = ListHandler()
+        logger = logging.getLogger(LOGGER_NAME)
+        logger.addHandler(handler)
+        listener = ShmRingListener(ring)
+        listener.start()
+        ShmRingHandler(ring).handle(
+            logger.makeRecord(LOGGER_NAME, logging.INFO, __file__, 1,
+                              "hi %s", ('there',), None))
+        listener.stop()
+        ring.close()
+        self.assertEqual([r.getMessage() for r in handler.records],
+                         ["hi there"])
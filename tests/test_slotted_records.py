@@ -0,0 +1,162 @@
+__author__ = 'brianoneill'
+
+import copy
+import io
+import logging
+import pickle
+from unittest import TestCase
+
+try:
+    import prelogging
+except ImportError:
+    import sys
+    sys.path[0:0] = ['../..']
+from prelogging import (LCDict, SlottedLogRecord, slotted_record_factory,
+                        restore_record_collection, RecordCodec)
+
+
+LOGGER_NAME = 'test_slotted_records'
+
+#############################################################################
+
+class TestSlottedRecords(TestCase):
+
+    def setUp(self):
+        self.logger = logging.getLogger(LOGGER_NAME)
+
+    def tearDown(self):
+        logging.setLogRecordFactory(logging.LogRecord)
+        restore_record_collection()
+        for handler in self.logger.handlers:
+            handler.close()
+        self.logger.handlers = []
+        self.logger.filters = []
+        self.logger.propagate = True
+
+    def record(self, fields=None, **kwargs):
+        factory = slotted_record_factory(fields)
+        return factory(LOGGER_NAME, logging.WARNING, '/a/b/module.py', 17,
+                       "%s and %s", ('this', 'that'), None, 'func', **kwargs)
+
+    def test_attributes(self):
+        record = self.record()
+        plain = logging.LogRecord(LOGGER_NAME, logging.WARNING,
+                                  '/a/b/module.py', 17, "%s and %s",
+                                  ('this', 'that'), None, 'func')
+        self.assertIsInstance(record, SlottedLogRecord)
+        self.assertFalse(hasattr(record, 'message'))
+        for attr in ('name', 'levelno', 'levelname', 'pathname', 'filename',
+                     'module', 'lineno', 'funcName', 'exc_info', 'exc_text',
+                     'stack_info', 'thread', 'threadName', 'process',
+                     'processName'):
+            self.assertEqual(getattr(record, attr), getattr(plain, attr),
+                             attr)
+        self.assertEqual(record.getMessage(), "this and that")
+        self.assertTrue(0 <= record.msecs < 1000)
+        self.assertGreater(record.relativeCreated, 0)
+        # Derived attributes can be set
+        record.levelname = 'WARN'
+        self.assertEqual(record.levelname, 'WARN')
+
+    def test_context_collected_only_if_needed(self):
+        record = self.record(fields=('levelname', 'message'))
+        self.assertIsNone(record.thread)
+        self.assertIsNone(record.threadName)
+        self.assertIsNone(record.process)
+        self.assertIsNone(record.processName)
+        record = self.record(fields=('threadName', 'process'))
+        self.assertEqual(record.threadName, 'MainThread')
+        self.assertIsNotNone(record.process)
+        self.assertIsNone(record.processName)
+
+    def test_other_attributes(self):
+        record = self.record()
+        record.user = 'alice'
+        self.assertEqual(record.user, 'alice')
+        self.assertEqual(record.__dict__['user'], 'alice')
+        self.assertIn('levelname', record.__dict__)
+        del record.user
+        self.assertFalse(hasattr(record, 'user'))
+        with self.assertRaises(AttributeError):
+            record.nonesuch
+
+    def test_pickle_and_copy(self):
+        record = self.record()
+        record.user = 'bob'
+        for clone in (pickle.loads(pickle.dumps(record)), copy.copy(record)):
+            self.assertIsInstance(clone, SlottedLogRecord)
+            self.assertEqual(clone.getMessage(), "this and that")
+            self.assertEqual(clone.created, record.created)
+            self.assertEqual(clone.user, 'bob')
+        clone.msg = 'changed'
+        self.assertEqual(record.msg, "%s and %s")
+
+    def test_mapping(self):
+        d = self.record().__dict__
+        d.update({'user': 'fred'}, role='admin')
+        self.assertEqual(d.setdefault('user', 'gina'), 'fred')
+        self.assertEqual(d.pop('role'), 'admin')
+        self.assertEqual(d.pop('role', None), None)
+        del d['user']
+        self.assertNotIn('user', d)
+        with self.assertRaises(KeyError):
+            del d['user']
+
+    def test_decode(self):
+        # makeLogRecord updates the __dict__ of a record from the factory
+        codec = RecordCodec()
+        plain = logging.LogRecord(LOGGER_NAME, logging.ERROR,
+                                  '/a/b/module.py', 17, "%s and %s",
+                                  ('this', 'that'), None, 'func')
+        logging.setLogRecordFactory(slotted_record_factory())
+        record = codec.decode(codec.encode(plain))
+        self.assertIsInstance(record, SlottedLogRecord)
+        self.assertEqual(record.getMessage(), "this and that")
+        for attr in ('levelname', 'lineno', 'funcName', 'created'):
+            self.assertEqual(getattr(record, attr), getattr(plain, attr),
+                             attr)
+
+    def test_formatting(self):
+        record = self.record()
+        record.user = 'carol'
+        for fmt, style in (
+                ('%(levelname)s %(module)s:%(lineno)d %(user)s %(message)s',
+                 '%'),
+                ('{levelname} {module}:{lineno} {user} {message}', '{'),
+                ('$levelname $module:$lineno $user $message', '$')):
+            self.assertEqual(
+                logging.Formatter(fmt, style=style).format(record),
+                "WARNING module:17 carol this and that")
+        formatted = logging.Formatter('%(asctime)s %(message)s').format(record)
+        self.assertTrue(formatted.endswith(" this and that"))
+
+    def test_lcdict_config(self):
+        stream = io.StringIO()
+        lcd = LCDict()
+        lcd.add_formatter('fmt', format='%(levelname)s %(funcName)s '
+                                        '%(user)s %(message)s')
+        lcd.add_stream_handler('stream', stream=stream, formatter='fmt')
+        lcd.add_logger(LOGGER_NAME, handlers='stream', level='DEBUG',
+                       propagate=False)
+        lcd.config(slotted_records=['threadName'])
+
+        records = []
+        def capture(record):
+            records.append(record)
+            return True
+        self.logger.addFilter(capture)
+
+        self.logger.info("hello %s", 'there', extra={'user': 'dave'})
+        try:
+            1 / 0
+        except ZeroDivisionError:
+            self.logger.exception("oops", extra={'user': 'erin'})
+
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(lines[0], "INFO test_lcdict_config dave hello there")
+        self.assertEqual(lines[1], "ERROR test_lcdict_config erin oops")
+        self.assertEqual(lines[-1], "ZeroDivisionError: division by zero")
+        self.assertIsInstance(records[0], SlottedLogRecord)
+        # Needed by the filter
+        self.assertEqual(records[0].threadName, 'MainThread')
+        self.assertIsNone(records[0].process)
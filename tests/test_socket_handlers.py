@@ -0,0 +1,165 @@
+__author__ = 'brianoneill'
+
+import logging
+import os
+import socket
+import tempfile
+import threading
+from multiprocessing import Process
+from unittest import TestCase, skipIf
+
+try:
+    import prelogging
+except ImportError:
+    import sys
+    sys.path[0:0] = ['../..']
+from prelogging import LCDict, LogServer, BatchingSocketHandler
+
+
+LOG_PATH = '_testlogs'       # NOTE: directory should already exist
+LOGFILENAME = 'test_socket_handlers.log'
+
+LOGGER_NAME = 'test_socket_handlers'
+
+#############################################################################
+
+def _client(server, num, compact):
+    # No logging.shutdown(): the last partial batch is sent at exit
+    server.client_lcdict(compact=compact, batch_size=20).config()
+    logger = logging.getLogger(LOGGER_NAME)
+    for i in range(num):
+        logger.debug("debug %d", i)         # below the server's level
+        logger.info("record %d", i)
+
+
+class TestSocketHandlers(TestCase):
+
+    def setUp(self):
+        self.filename = os.path.join(LOG_PATH, LOGFILENAME)
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+
+    def tearDown(self):
+        logger = logging.getLogger(LOGGER_NAME)
+        for handler in logger.handlers:
+            handler.close()
+        logger.handlers = []
+        logger.setLevel(logging.NOTSET)
+
+    def server_lcdict(self):
+        lcd = LCDict(log_path=LOG_PATH)
+        lcd.add_formatter('pname_msg', format='%(processName)s %(message)s')
+        lcd.add_file_handler('file', filename=LOGFILENAME,
+                             formatter='pname_msg')
+        lcd.add_logger(LOGGER_NAME, handlers='file', level='INFO',
+                       propagate=False)
+        return lcd
+
+    def run_clients(self, server, compact, num_procs=3, num_records=50):
+        procs = [Process(target=_client,
+                         args=(server, num_records, compact),
+                         name='client %d' % i)
+                 for i in range(num_procs)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+        server.stop()
+        with open(self.filename) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(len(lines), num_procs * num_records)
+        for i in range(num_procs):
+            self.assertEqual(
+                [line for line in lines if line.startswith('client %d ' % i)],
+                ['client %d record %d' % (i, n) for n in range(num_records)])
+
+    def test_client_lcdict(self):
+        server = LogServer(self.server_lcdict(), address=('127.0.0.1', 9999))
+        lcd = server.client_lcdict(compact=True, batch_size=10)
+        self.assertEqual(lcd.handlers['socket'],
+                         {'class': 'prelogging.BatchingSocketHandler',
+                          'address': ('127.0.0.1', 9999),
+                          'fields': server.fields,
+                          'batch_size': 10})
+        self.assertIn('processName', server.fields)
+        self.assertEqual(lcd.root['handlers'], ['socket'])
+        self.assertEqual(lcd.loggers[LOGGER_NAME],
+                         {'level': 'INFO', 'propagate': True})
+
+    def test_tcp_pickled(self):
+        server = self.server_lcdict().start_log_server(
+            address=('127.0.0.1', 0))
+        self.assertNotEqual(server.address[1], 0)
+        self.run_clients(server, compact=False)
+
+    def test_tcp_compact(self):
+        server = self.server_lcdict().start_log_server(
+            address=('127.0.0.1', 0))
+        self.run_clients(server, compact=True)
+
+    @skipIf(not hasattr(socket, 'AF_UNIX'), "requires Unix domain sockets")
+    def test_unix_socket(self):
+        path = os.path.join(tempfile.mkdtemp(), 'log.sock')
+        server = self.server_lcdict().start_log_server(address=path)
+        self.run_clients(server, compact=True, num_procs=2)
+        self.assertFalse(os.path.exists(path))
+
+    def test_exception_text(self):
+        server = self.server_lcdict().start_log_server(
+            address=('127.0.0.1', 0))
+        handler = BatchingSocketHandler(server.address)
+        try:
+            1 / 0
+        except ZeroDivisionError:
+            record = logging.getLogger('client').makeRecord(
+                LOGGER_NAME, logging.ERROR, __file__, 1, "oops %s", ('!',),
+                __import__('sys').exc_info())
+        handler.handle(record)      # ERROR: sent at once
+        handler.close()
+        server.stop()
+        with open(self.filename) as f:
+            text = f.read()
+        self.assertTrue(text.startswith('MainProcess oops !\n'))
+        self.assertIn('ZeroDivisionError', text)
+
+    def test_unpicklable_values(self):
+        class Unprintable(object):
+            def __reduce__(self):
+                raise TypeError("can't pickle")
+            def __str__(self):
+                raise TypeError("can't print")
+
+        server = self.server_lcdict().start_log_server(
+            address=('127.0.0.1', 0))
+        handler = BatchingSocketHandler(server.address, batch_size=10)
+        errors = []
+        handler.handleError = errors.append
+        logger = logging.getLogger('client')
+        for extra in ({'lock': threading.Lock()},     # sent as a string
+                      {'bad': Unprintable()},         # dropped
+                      {}):
+            handler.handle(logger.makeRecord(
+                LOGGER_NAME, logging.INFO, __file__, 1,
+                "msg %d", (len(errors),), None, extra=extra))
+        self.assertEqual(handler.dropped, 1)
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(len(handler._buffer), 2)
+        handler.close()
+        server.stop()
+        with open(self.filename) as f:
+            self.assertEqual(f.read().splitlines(),
+                             ['MainProcess msg 0', 'MainProcess msg 1'])
+
+    def test_server_down(self):
+        sock = socket.socket()
+        sock.bind(('127.0.0.1', 0))
+        address = sock.getsockname()
+        sock.close()                # nothing listens there
+        handler = BatchingSocketHandler(address, batch_size=1,
+                                        max_buffered=3, max_retry_delay=600)
+        for i in range(5):
+            handler.handle(logging.makeLogRecord({'msg': 'm%d' % i,
+                                                  'name': LOGGER_NAME}))
+        self.assertEqual(len(handler._buffer), 3)
+        self.assertEqual(handler.dropped, 2)
+        handler.close()
@@ -0,0 +1,195 @@
+__author__ = 'brianoneill'
+
+import gc
+import logging
+import multiprocessing.util
+import os
+import re
+import socket
+import threading
+import weakref
+from unittest import TestCase
+
+try:
+    import prelogging
+except ImportError:
+    import sys
+    sys.path[0:0] = ['../..']
+from prelogging import LCDict, BatchingSysLogHandler
+
+
+LOGGER_NAME = 'test_tcp_syslog'
+
+#############################################################################
+
+class SyslogListener():
+    """A minimal syslog receiver: accepts connections on a local port,
+    and collects the octet-counted frames sent to it."""
+    def __init__(self, port=0):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(('127.0.0.1', port))
+        self.sock.listen(5)
+        self.address = self.sock.getsockname()
+        self.messages = []
+        self.connections = 0
+        self.received = threading.Event()
+        self._threads = []
+        t = threading.Thread(target=self._accept)
+        t.daemon = True
+        t.start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            self.connections += 1
+            t = threading.Thread(target=self._read, args=(conn,))
+            t.daemon = True
+            t.start()
+            self._threads.append(t)
+
+    def _read(self, conn):
+        data = b''
+        with conn:
+            while True:
+                chunk = conn.recv(65536)
+                if not chunk:
+                    break
+                data += chunk
+                while b' ' in data:
+                    length, rest = data.split(b' ', 1)
+                    length = int(length)
+                    if len(rest) < length:
+                        break
+                    self.messages.append(rest[:length].decode('utf-8'))
+                    data = rest[length:]
+                    self.received.set()
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)    # wakes up accept()
+        except OSError:
+            pass
+        self.sock.close()
+        for t in self._threads:
+            t.join(5)
+
+
+class TestBatchingSysLogHandler(TestCase):
+
+    def setUp(self):
+        self.listener = SyslogListener()
+        self.logger = logging.getLogger(LOGGER_NAME)
+
+    def tearDown(self):
+        for handler in self.logger.handlers:
+            handler.close()
+        self.logger.handlers = []
+        self.listener.close()
+
+    def config_logging(self, **kwargs):
+        lcd = LCDict()
+        lcd.add_syslog_handler('tcp_syslog',
+                               address=self.listener.address,
+                               formatter='msg',
+                               batching=True,
+                               app_name='tests',
+                               **kwargs)
+        lcd.add_logger(LOGGER_NAME, handlers='tcp_syslog', level='DEBUG',
+                       propagate=False)
+        lcd.config()
+        return lcd
+
+    def test_lcdict_handler_dict(self):
+        lcd = self.config_logging(batch_size=10)
+        self.assertEqual(
+            lcd.handlers['tcp_syslog'],
+            {'class': 'prelogging.BatchingSysLogHandler',
+             'address': self.listener.address,
+             'facility': logging.handlers.SysLogHandler.LOG_USER,
+             'formatter': 'msg',
+             'app_name': 'tests',
+             'batch_size': 10})
+        self.assertIsInstance(self.logger.handlers[0], BatchingSysLogHandler)
+
+    def test_rfc5424_batches(self):
+        self.config_logging(batch_size=3, flush_interval=None)
+        self.logger.info("one")
+        self.logger.warning("two")
+        self.assertEqual(self.listener.messages, [])    # still buffered
+        self.logger.debug("three")
+        self.assertTrue(self.listener.received.wait(5))
+        self.logger.handlers[0].close()
+        self.listener.close()
+
+        self.assertEqual(self.listener.connections, 1)
+        msgs = self.listener.messages
+        self.assertEqual(len(msgs), 3)
+        header = (r'^<%d>1 \d{4}-\d\d-\d\dT\d\d:\d\d:\d\d\.\d{6}Z \S+ '
+                  r'tests %d - - %s$')
+        pid = os.getpid()
+        self.assertRegex(msgs[0], header % (8 + 6, pid, 'one'))
+        self.assertRegex(msgs[1], header % (8 + 4, pid, 'two'))
+        self.assertRegex(msgs[2], header % (8 + 7, pid, 'three'))
+
+    def test_flush_level(self):
+        self.config_logging(batch_size=100)
+        self.logger.info("one")
+        self.logger.error("two")
+        self.assertTrue(self.listener.received.wait(5))
+        self.logger.handlers[0].close()
+        self.listener.close()
+        self.assertEqual([m.rsplit(' ', 1)[1] for m in self.listener.messages],
+                         ["one", "two"])
+
+    def test_reconnect_with_backoff(self):
+        # Nothing listens here until the listener is reopened
+        address = self.listener.address
+        self.listener.close()
+        handler = BatchingSysLogHandler(address=address,
+                                        batch_size=2,
+                                        max_buffered=4,
+                                        retry_delay=60,
+                                        max_retry_delay=600)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        self.logger.addHandler(handler)
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.propagate = False
+        for i in range(6):
+            self.logger.info("msg %d", i)
+        # One failed attempt; no retry before the delay has passed
+        self.assertEqual(len(handler._buffer), 4)
+        self.assertEqual(handler.dropped, 2)
+        self.assertEqual(handler._current_delay, 120)
+
+        self.listener = SyslogListener(port=address[1])
+        handler._next_retry = 0         # the delay has passed
+        handler.flush()
+        self.assertEqual(handler._current_delay, 60)
+        self.assertTrue(self.listener.received.wait(5))
+        handler.close()
+        self.listener.close()
+        self.assertEqual([m.rsplit(' ', 2)[-1] for m in self.listener.messages],
+                         ['2', '3', '4', '5'])
+
+    def test_exit_finalizer(self):
+        handler = BatchingSysLogHandler(address=self.listener.address)
+        handler_ref = weakref.ref(handler)
+
+        def finalizers():
+            return [f for f in multiprocessing.util._finalizer_registry.values()
+                    if f._args == (handler_ref,)]
+
+        self.assertEqual(len(finalizers()), 1)
+        handler._pid = None         # as if in a child created by fork
+        handler._check_pid()
+        self.assertEqual(len(finalizers()), 1)
+        # The finalizer doesn't keep the handler alive
+        handler.close()
+        del handler
+        gc.collect()
+        self.assertIsNone(handler_ref())
+        self.assertEqual(finalizers(), [])
@@ -0,0 +1,177 @@
+__author__ = 'brianoneill'
+
+import copy
+import glob
+import logging
+import os
+import time
+from multiprocessing import Process
+from unittest import TestCase
+
+try:
+    import prelogging
+except ImportError:
+    import sys
+    sys.path[0:0] = ['../..']
+from prelogging import LCDict, LockingTimedRotatingFileHandler
+
+
+LOG_PATH = '_testlogs/rot_fh/'      # NOTE: directory must exist
+LOGFILENAME = 'test_timed_rot_fh.log'
+
+LOGGER_NAME = 'test_timed_rot_fh'
+
+#############################################################################
+
+def _worker(num):
+    logger = logging.getLogger(LOGGER_NAME)
+    for i in range(num):
+        logger.info("pid %d record %d", os.getpid(), i)
+        time.sleep(0.05)
+
+
+class TestLockingTimedRotatingFileHandler(TestCase):
+
+    def setUp(self):
+        self.filename = os.path.join(LOG_PATH, LOGFILENAME)
+        for fn in glob.glob(self.filename + '*'):
+            os.remove(fn)
+
+    def tearDown(self):
+        logger = logging.getLogger(LOGGER_NAME)
+        for handler in logger.handlers:
+            handler.close()
+        logger.handlers = []
+
+    def config_logging(self, **kwargs):
+        lcd = LCDict(log_path=LOG_PATH, locking=True)
+        lcd.add_timed_rotating_file_handler('timed_rot_fh',
+                                            filename=LOGFILENAME,
+                                            formatter='msg',
+                                            **kwargs)
+        lcd.add_logger(LOGGER_NAME,
+                       handlers='timed_rot_fh',
+                       level='DEBUG',
+                       propagate=False)
+        lcd.config()
+        return lcd
+
+    def test_lcdict_handler_dict(self):
+        lcd = self.config_logging(when='midnight', backup_count=7)
+        self.assertEqual(
+            lcd.handlers['timed_rot_fh'],
+            {'()': 'ext://prelogging.LockingTimedRotatingFileHandler',
+             'create_lock': True,
+             'filename': self.filename,
+             'formatter': 'msg',
+             'when': 'midnight',
+             'interval': 1,
+             'backupCount': 7,
+             'utc': False,
+             'delay': False}
+        )
+        handler = logging.getLogger(LOGGER_NAME).handlers[0]
+        self.assertIsInstance(handler, LockingTimedRotatingFileHandler)
+        self.assertEqual(handler.when, 'MIDNIGHT')
+        self.assertEqual(handler.backupCount, 7)
+
+        lcd = LCDict(log_path=LOG_PATH)
+        lcd.add_timed_rotating_file_handler('plain', filename=LOGFILENAME)
+        self.assertEqual(lcd.handlers['plain']['class'],
+                         'logging.handlers.TimedRotatingFileHandler')
+
+    def test_one_rollover_per_interval(self):
+        # Two handlers on the same file stand in for two processes.
+        handlers = [LockingTimedRotatingFileHandler(self.filename,
+                                                    create_lock=True,
+                                                    when='S')
+                    for _ in range(2)]
+        logger = logging.getLogger(LOGGER_NAME)
+        logger.setLevel(logging.DEBUG)
+        record = logger.makeRecord(LOGGER_NAME, logging.INFO, __file__, 1,
+                                   "msg", None, None)
+        handlers[0].handle(record)
+
+        # Pretend the file was written long ago, and it's now past
+        # both handlers' rollover time
+        now = time.time()
+        os.utime(self.filename, (now - 100, now - 100))
+        for h in handlers:
+            h.rolloverAt = int(now) - 50
+
+        for h in handlers:
+            h.handle(record)
+            self.assertGreater(h.rolloverAt, now)
+        for h in handlers:
+            h.close()
+
+        backups = glob.glob(self.filename + '.*')
+        self.assertEqual(len(backups), 1)
+        with open(backups[0]) as f:
+            self.assertEqual(f.read(), "msg\n")
+        with open(self.filename) as f:
+            self.assertEqual(f.read(), "msg\nmsg\n")
+
+    def check_staggered(self, handlers):
+        # handlers[1] stands in for a process that started later than the
+        # process of handlers[0], so its rollover time is later
+        logger = logging.getLogger(LOGGER_NAME)
+        logger.setLevel(logging.DEBUG)
+
+        def handle(handler, msg):
+            handler.handle(logger.makeRecord(LOGGER_NAME, logging.INFO,
+                                             __file__, 1, msg, None, None))
+
+        handle(handlers[0], "before")
+        now = time.time()
+        os.utime(self.filename, (now - 100, now - 100))
+        handlers[0].rolloverAt = int(now) - 50
+        handlers[1].rolloverAt = int(now) + 100
+        handle(handlers[0], "after 0")
+        handle(handlers[1], "after 1")
+        for h in handlers:
+            h.close()
+
+        backups = glob.glob(self.filename + '.*')
+        self.assertEqual(len(backups), 1)
+        with open(backups[0]) as f:
+            self.assertEqual(f.read(), "before\n")
+        with open(self.filename) as f:
+            self.assertEqual(f.read(), "after 0\nafter 1\n")
+
+    def test_staggered_rollover_times(self):
+        handler = LockingTimedRotatingFileHandler(self.filename,
+                                                  create_lock=True,
+                                                  when='S')
+        # As if inherited through fork, with its own file descriptor
+        child = copy.copy(handler)
+        child.stream = child._open()
+        self.check_staggered([handler, child])
+
+    def test_staggered_rollover_times_file_lock(self):
+        lock_file = os.path.join(LOG_PATH, 'test_timed_rot_fh.lock')
+        self.check_staggered(
+            [LockingTimedRotatingFileHandler(self.filename,
+                                             create_lock=True,
+                                             lock_file=lock_file,
+                                             when='S')
+             for _ in range(2)])
+
+    def test_multiprocessing(self):
+        num_procs, num_records = 3, 40
+        self.config_logging(when='S', interval=1)
+        procs = [Process(target=_worker, args=(num_records,))
+                 for _ in range(num_procs)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+
+        filenames = glob.glob(self.filename + '*')
+        self.assertGreater(len(filenames), 1)
+        lines = []
+        for fn in filenames:
+            with open(fn) as f:
+                lines.extend(f.read().splitlines())
+        # No rollover clobbered another's backup
+        self.assertEqual(len(lines), num_procs * num_records)